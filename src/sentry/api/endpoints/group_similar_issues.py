@@ -17,9 +17,16 @@ class GroupSimilarIssuesEndpoint(GroupEndpoint):
         if limit is not None:
             limit = int(limit) + 1  # the target group will always be included
 
+        min_score = request.GET.get('min_score', None)
+        if min_score is not None:
+            try:
+                min_score = float(min_score)
+            except ValueError:
+                return Response({'detail': 'Invalid min_score'}, status=400)
+
         results = filter(
             lambda (group_id, scores): group_id != group.id,
-            features.compare(group, limit=limit)
+            features.compare(group, limit=limit, min_score=min_score)
         )
 
         serialized_groups = apply_values(
@@ -11,6 +11,7 @@ from rest_framework import serializers
 from rest_framework.response import Response
 
 from sentry import features, search, tagstore
+from sentry.api import stream_cache
 from sentry.api.base import DocSection
 from sentry.api.bases.project import ProjectEndpoint, ProjectEventPermission
 from sentry.api.fields import UserField
@@ -344,13 +345,29 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
                 response['X-Sentry-Direct-Hit'] = '1'
                 return response
 
+        cache_key = stream_cache.get_response_key(
+            project.id,
+            request.user.id if request.user.is_authenticated() else None,
+            dict(request.GET.lists()),
+        )
+        cached = stream_cache.get_response(cache_key)
+        if cached is not None:
+            context, cursor_result = cached
+            response = Response(context)
+            self.add_cursor_headers(request, response, cursor_result)
+            return response
+
         try:
             query_kwargs = self._build_query_params_from_request(
                 request, project)
         except ValidationError as exc:
             return Response({'detail': six.text_type(exc)}, status=400)
 
-        cursor_result = search.query(count_hits=True, **query_kwargs)
+        cursor_result = search.query(
+            count_hits=True,
+            paginator_options={'keyset': True, 'approximate_hits': True},
+            **query_kwargs
+        )
 
         results = list(cursor_result)
 
@@ -362,6 +379,8 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
         if query_kwargs.get('status') == GroupStatus.UNRESOLVED:
             context = [r for r in context if r['status'] == 'unresolved']
 
+        stream_cache.set_response(cache_key, context, cursor_result)
+
         response = Response(context)
 
         self.add_cursor_headers(request, response, cursor_result)
@@ -372,6 +391,7 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
         return response
 
     @attach_scenarios([bulk_update_issues_scenario])
+    @stream_cache.invalidates_stream
     def put(self, request, project):
         """
         Bulk Mutate a List of Issues
@@ -861,6 +881,7 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
         return Response(result)
 
     @attach_scenarios([bulk_remove_issues_scenario])
+    @stream_cache.invalidates_stream
     def delete(self, request, project):
         """
         Bulk Remove a List of Issues
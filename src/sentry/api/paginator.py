@@ -9,15 +9,21 @@ from __future__ import absolute_import
 
 import math
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.core.cache import cache
 from django.db import connections
 from django.db.models.sql.datastructures import EmptyResultSet
 from django.utils import timezone
 
 from sentry.utils.cursors import build_cursor, Cursor, CursorResult
+from sentry.utils.dates import epoch
+from sentry.utils.hashlib import md5_text
 
 quote_name = connections['default'].ops.quote_name
 
+# How long an approximate hit count is reused for the same query
+HITS_CACHE_TTL = 60
+
 
 class BasePaginator(object):
     def __init__(self, queryset, order_by=None, max_limit=100):
@@ -220,3 +226,140 @@ class OffsetPaginator(BasePaginator):
             next=next_cursor,
             prev=prev_cursor,
         )
+
+
+class KeysetPaginator(BasePaginator):
+    """
+    Paginates on ``(key, id)`` tuples so that no page requires an OFFSET and
+    rows sharing the same key are returned in a stable order.
+
+    The cursor value holds the key of the boundary row and the cursor offset
+    holds its ID. Keys must be exactly representable as integers.
+
+    When ``approximate_hits`` is set, the hit count is computed once per
+    distinct query and reused for ``HITS_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self, queryset, order_by=None, max_limit=100, approximate_hits=False):
+        super(KeysetPaginator, self).__init__(queryset, order_by, max_limit)
+        self.approximate_hits = approximate_hits
+
+    def get_item_key(self, item, for_prev=False):
+        return int(getattr(item, self.key))
+
+    def value_from_cursor(self, cursor):
+        return cursor.value
+
+    def _build_queryset(self, cursor, asc):
+        queryset = self.queryset
+        if asc:
+            queryset = queryset.order_by(self.key, 'id')
+        else:
+            queryset = queryset.order_by('-%s' % self.key, '-id')
+
+        if not (cursor.value or cursor.offset):
+            return queryset
+
+        table = quote_name(queryset.model._meta.db_table)
+        if self.key in queryset.query.extra:
+            col_query, col_params = queryset.query.extra[self.key]
+            col_query, col_params = '(%s)' % col_query, list(col_params)
+        else:
+            col_query = '%s.%s' % (table, quote_name(self.key))
+            col_params = []
+
+        value = self.value_from_cursor(cursor)
+        return queryset.extra(
+            where=[
+                '({col} {op} %s OR ({col} = %s AND {table}.{id} {op} %s))'.format(
+                    col=col_query,
+                    op='>' if asc else '<',
+                    table=table,
+                    id=quote_name('id'),
+                )
+            ],
+            params=col_params + [value] + col_params + [value, cursor.offset],
+        )
+
+    def get_result(self, limit=100, cursor=None, count_hits=False):
+        if cursor is None:
+            cursor = Cursor(0, 0, 0)
+
+        limit = min(limit, self.max_limit)
+
+        queryset = self._build_queryset(cursor, self._is_asc(cursor.is_prev))
+
+        if count_hits:
+            max_hits = 1000
+            if self.approximate_hits:
+                hits = self.count_hits_cached(max_hits)
+            else:
+                hits = self.count_hits(max_hits)
+        else:
+            hits = None
+            max_hits = None
+
+        # The + 1 is needed to know if there is anything past this page.
+        results = list(queryset[:limit + 1])
+        has_more = len(results) > limit
+        results = results[:limit]
+        if cursor.is_prev:
+            results.reverse()
+
+        # We can only have arrived at a boundary by paging away from it, so
+        # there is always something on the other side of it.
+        has_boundary = bool(cursor.value or cursor.offset)
+        if cursor.is_prev:
+            has_next, has_prev = has_boundary, has_more
+        else:
+            has_next, has_prev = has_more, has_boundary
+
+        if results:
+            next_cursor = Cursor(
+                self.get_item_key(results[-1]), results[-1].id, False, has_next)
+            prev_cursor = Cursor(
+                self.get_item_key(results[0], for_prev=True), results[0].id, True, has_prev)
+        else:
+            # Nothing past the boundary (yet), continue from the same place.
+            next_cursor = Cursor(cursor.value, cursor.offset, False, has_next)
+            prev_cursor = Cursor(cursor.value, cursor.offset, True, has_prev)
+
+        return CursorResult(
+            results=results,
+            next=next_cursor,
+            prev=prev_cursor,
+            hits=hits,
+            max_hits=max_hits,
+        )
+
+    def count_hits_cached(self, max_hits):
+        try:
+            h_sql, h_params = self.queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+
+        cache_key = 'api.paginator.hits:{}'.format(
+            md5_text(h_sql, repr(h_params), max_hits).hexdigest(),
+        )
+        hits = cache.get(cache_key)
+        if hits is None:
+            hits = self.count_hits(max_hits)
+            cache.set(cache_key, hits, HITS_CACHE_TTL)
+        return hits
+
+
+class DateTimeKeysetPaginator(KeysetPaginator):
+    """
+    A ``KeysetPaginator`` for datetime keys, with cursor values stored as
+    integer microseconds since the epoch so that no precision is lost.
+    """
+
+    def get_item_key(self, item, for_prev=False):
+        value = getattr(item, self.key)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        delta = value - epoch
+        return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+    def value_from_cursor(self, cursor):
+        return epoch + timedelta(microseconds=cursor.value)
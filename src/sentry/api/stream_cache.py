@@ -0,0 +1,135 @@
+"""
+sentry.api.stream_cache
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Caching of issue stream responses.
+
+Every project has a generation counter which is bumped whenever something
+that can change the contents of its issue stream is written (see
+``sentry.receivers.stream_cache``). Cached responses are keyed by the
+current generation, so bumping it invalidates all of them at once without
+having to know which keys exist.
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import functools
+import six
+
+from django.core.cache import cache
+from time import time
+
+from sentry import options
+from sentry.utils.cursors import CursorResult
+from sentry.utils.hashlib import md5_text
+
+
+def is_enabled():
+    # The cache is disabled with a TTL of zero, in which case there is no
+    # need to keep track of generations either.
+    return bool(options.get('api.stream-cache.ttl'))
+
+
+def _get_generation_key(project_id):
+    return 'api.stream.gen:{}'.format(project_id)
+
+
+def _new_generation():
+    # If the counter is evicted it has to be recreated with a value that
+    # was never used before, or stale responses would become valid again.
+    return int(time() * 1000)
+
+
+def get_generation(project_id):
+    key = _get_generation_key(project_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(key, generation, None):
+            generation = cache.get(key) or generation
+    return generation
+
+
+def bump_generation(project_id):
+    if not is_enabled():
+        return
+
+    key = _get_generation_key(project_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def invalidates_stream(func):
+    """
+    Bumps the project's generation after an endpoint method which may have
+    changed groups without sending model signals (e.g. queryset updates.)
+    """
+    @functools.wraps(func)
+    def wrapped(self, request, project, *args, **kwargs):
+        try:
+            return func(self, request, project, *args, **kwargs)
+        finally:
+            bump_generation(project.id)
+    return wrapped
+
+
+def get_response_key(project_id, user_id, params):
+    """
+    Returns the cache key for a response, or ``None`` if the cache is
+    disabled.
+    """
+    if not is_enabled():
+        return None
+
+    generation = get_generation(project_id)
+    return 'api.stream:{}:{}:{}'.format(
+        project_id,
+        generation,
+        md5_text(
+            user_id,
+            repr(sorted((k, sorted(v)) for k, v in six.iteritems(params))),
+        ).hexdigest(),
+    )
+
+
+def get_response(key):
+    """
+    Returns a ``(context, cursor_result)`` tuple for a cached response, or
+    ``None``. The cursor result only carries the cursors and hit counts.
+    """
+    if key is None or not is_enabled():
+        return None
+
+    value = cache.get(key)
+    if value is None:
+        return None
+
+    context, (next_cursor, prev_cursor, hits, max_hits) = value
+    return context, CursorResult(
+        results=[],
+        next=next_cursor,
+        prev=prev_cursor,
+        hits=hits,
+        max_hits=max_hits,
+    )
+
+
+def set_response(key, context, cursor_result):
+    ttl = options.get('api.stream-cache.ttl')
+    if key is None or not ttl:
+        return
+
+    cache.set(
+        key,
+        (
+            context, (
+                cursor_result.next, cursor_result.prev, cursor_result.hits,
+                cursor_result.max_hits,
+            )
+        ),
+        ttl,
+    )
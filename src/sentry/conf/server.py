@@ -424,11 +424,11 @@ CELERY_IMPORTS = (
     'sentry.tasks.auth', 'sentry.tasks.auto_resolve_issues', 'sentry.tasks.beacon',
     'sentry.tasks.check_auth', 'sentry.tasks.clear_expired_snoozes',
     'sentry.tasks.collect_project_platforms', 'sentry.tasks.commits', 'sentry.tasks.deletion',
-    'sentry.tasks.digests', 'sentry.tasks.email', 'sentry.tasks.merge',
+    'sentry.tasks.digests', 'sentry.tasks.email', 'sentry.tasks.merge', 'sentry.tasks.nodestore',
     'sentry.tasks.options', 'sentry.tasks.ping', 'sentry.tasks.post_process',
     'sentry.tasks.process_buffer', 'sentry.tasks.reports', 'sentry.tasks.reprocessing',
-    'sentry.tasks.scheduler', 'sentry.tasks.store', 'sentry.tasks.unmerge',
-    'sentry.tasks.symcache_update',
+    'sentry.tasks.scheduler', 'sentry.tasks.similarity', 'sentry.tasks.store',
+    'sentry.tasks.unmerge', 'sentry.tasks.symcache_update',
 )
 CELERY_QUEUES = [
     Queue('alerts', routing_key='alerts'),
@@ -452,6 +452,7 @@ CELERY_QUEUES = [
     Queue('reports.deliver', routing_key='reports.deliver'),
     Queue('reports.prepare', routing_key='reports.prepare'),
     Queue('search', routing_key='search'),
+    Queue('similarity', routing_key='similarity'),
     Queue('stats', routing_key='stats'),
     Queue('unmerge', routing_key='unmerge'),
     Queue('update', routing_key='update'),
@@ -516,6 +517,14 @@ CELERYBEAT_SCHEDULE = {
             'queue': 'counters-0',
         }
     },
+    'process-similarity-queue': {
+        'task': 'sentry.tasks.similarity.process_pending',
+        'schedule': timedelta(seconds=10),
+        'options': {
+            'expires': 10,
+            'queue': 'similarity',
+        }
+    },
     'sync-options': {
         'task': 'sentry.tasks.options.sync_options',
         'schedule': timedelta(seconds=10),
@@ -559,6 +568,14 @@ CELERYBEAT_SCHEDULE = {
             'expires': 60 * 25,
         },
     },
+    'migrate-nodes': {
+        'task': 'sentry.tasks.nodestore.migrate_nodes',
+        'schedule': timedelta(minutes=5),
+        'options': {
+            'expires': 300,
+            'queue': 'cleanup',
+        },
+    },
     'schedule-deletions': {
         'task': 'sentry.tasks.deletion.run_scheduled_deletions',
         'schedule': timedelta(minutes=15),
@@ -904,6 +921,27 @@ SENTRY_DEFAULT_MAX_EVENTS_PER_MINUTE = '90%'
 SENTRY_NODESTORE = 'sentry.nodestore.django.DjangoNodeStorage'
 SENTRY_NODESTORE_OPTIONS = {}
 
+# Backends without a native multi-get fetch nodes concurrently on a pool of
+# this many threads, returning nodes not fetched within the timeout (in
+# seconds) as missing.
+SENTRY_NODESTORE_MULTIGET_WORKERS = 8
+SENTRY_NODESTORE_MULTIGET_TIMEOUT = 5
+
+# Node data encoding. Values written by an earlier codec remain readable
+# after this changes.
+SENTRY_NODESTORE_CODEC = 'sentry.nodestore.codecs.CompressedPickleCodec'
+SENTRY_NODESTORE_CODEC_OPTIONS = {}
+# Directory of the zstd dictionaries written by `sentry nodestore
+# train-dictionary`, which are needed to read values written by `ZstdCodec`
+# even when another codec is configured.
+SENTRY_NODESTORE_DICTIONARIES = None
+# Stores each top-level value separately so events can be read without
+# decoding every interface:
+# SENTRY_NODESTORE_CODEC = 'sentry.nodestore.codecs.IndexedJsonCodec'
+# SENTRY_NODESTORE_CODEC = 'sentry.nodestore.codecs.ZstdCodec'
+# SENTRY_NODESTORE_CODEC_OPTIONS = {'level': 3}
+# SENTRY_NODESTORE_DICTIONARIES = '/var/lib/sentry/nodestore-dictionaries'
+
 # Tag storage backend
 SENTRY_TAGSTORE = 'sentry.tagstore.legacy.LegacyTagStorage'
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -915,6 +953,20 @@ SENTRY_SEARCH_OPTIONS = {}
 #     'urls': ['http://localhost:9200/'],
 #     'timeout': 5,
 # }
+# On Postgres, set ``full_text`` to match free text queries against the
+# trigram indexes on the group message and culprit (requires pg_trgm).
+# SENTRY_SEARCH_OPTIONS = {
+#     'full_text': True,
+# }
+# Set ``active_groups_cluster`` to the name of a Redis cluster to answer event
+# date range queries from per-day buckets of active groups (kept for
+# ``active_groups_retention`` days) rather than from the Event table. Ranges
+# with more than ``active_groups_limit`` active groups use the Event table.
+# SENTRY_SEARCH_OPTIONS = {
+#     'active_groups_cluster': 'default',
+#     'active_groups_retention': 90,
+#     'active_groups_limit': 1000,
+# }
 
 # Time-series storage backend
 SENTRY_TSDB = 'sentry.tsdb.dummy.DummyTSDB'
@@ -962,6 +1014,12 @@ SENTRY_MAX_MESSAGE_LENGTH = 1024 * 8
 SENTRY_MAX_STACKTRACE_FRAMES = 50
 SENTRY_MAX_EXCEPTIONS = 25
 
+# Prevent the stored data of an event from exceeding this size in bytes. Stack
+# frame variables, then breadcrumbs, then extra context are discarded from
+# larger events. Can be overridden per project with the
+# ``sentry:max_event_size`` option.
+SENTRY_MAX_EVENT_SIZE = 1024 * 1024  # 1mb
+
 # Gravatar service base url
 SENTRY_GRAVATAR_BASE_URL = 'https://secure.gravatar.com'
 
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 from datetime import timedelta
 from django.db import connections, router
 from django.utils import timezone
+from time import sleep
 
 from sentry.utils import db
 
@@ -16,7 +17,7 @@ class BulkDeleteQuery(object):
         self.order_by = order_by
         self.using = router.db_for_write(model)
 
-    def execute_postgres(self, chunk_size=10000):
+    def execute_postgres(self, chunk_size=10000, pause=0):
         quote_name = connections[self.using].ops.quote_name
 
         where = []
@@ -66,16 +67,21 @@ class BulkDeleteQuery(object):
             order=order_clause,
         )
 
-        return self._continuous_query(query)
+        return self._continuous_query(query, pause)
 
-    def _continuous_query(self, query):
-        results = True
+    def _continuous_query(self, query, pause=0):
+        total = 0
         cursor = connections[self.using].cursor()
-        while results:
+        while True:
             cursor.execute(query)
-            results = cursor.rowcount > 0
-
-    def execute_generic(self, chunk_size=100):
+            if cursor.rowcount <= 0:
+                return total
+            total += cursor.rowcount
+            # give replicas a chance to catch up between chunks
+            if pause:
+                sleep(pause)
+
+    def execute_generic(self, chunk_size=100, pause=0):
         qs = self.model.objects.all()
 
         if self.days:
@@ -87,9 +93,9 @@ class BulkDeleteQuery(object):
             else:
                 qs = qs.filter(project_id=self.project_id)
 
-        return self._continuous_generic_query(qs, chunk_size)
+        return self._continuous_generic_query(qs, chunk_size, pause)
 
-    def execute_sharded(self, total_shards, shard_id, chunk_size=100):
+    def execute_sharded(self, total_shards, shard_id, chunk_size=100, pause=0):
         assert total_shards > 1
         assert shard_id < total_shards
         qs = self.model.objects.all().extra(
@@ -110,20 +116,30 @@ class BulkDeleteQuery(object):
             else:
                 qs = qs.filter(project_id=self.project_id)
 
-        return self._continuous_generic_query(qs, chunk_size)
+        return self._continuous_generic_query(qs, chunk_size, pause)
 
-    def _continuous_generic_query(self, query, chunk_size):
+    def _continuous_generic_query(self, query, chunk_size, pause=0):
         # XXX: we step through because the deletion collector will pull all
         # relations into memory
-        exists = True
-        while exists:
-            exists = False
+        total = 0
+        while True:
+            deleted = 0
             for item in query[:chunk_size].iterator():
                 item.delete()
-                exists = True
-
-    def execute(self, chunk_size=10000):
+                deleted += 1
+            if not deleted:
+                return total
+            total += deleted
+            if pause:
+                sleep(pause)
+
+    def execute(self, chunk_size=10000, pause=0):
+        """
+        Deletes matching rows in chunks of ``chunk_size``, sleeping for
+        ``pause`` seconds between chunks, and returns the number of rows
+        deleted.
+        """
         if db.is_postgres():
-            self.execute_postgres(chunk_size)
+            return self.execute_postgres(chunk_size, pause)
         else:
-            self.execute_generic(chunk_size)
+            return self.execute_generic(chunk_size, pause)
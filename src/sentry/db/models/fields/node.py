@@ -18,6 +18,7 @@ from django.db import models
 from django.db.models.signals import post_delete
 
 from sentry import nodestore
+from sentry.nodestore.codecs import LazyNodeData
 from sentry.utils.cache import memoize
 from sentry.utils.compat import pickle
 from sentry.utils.strings import decompress, compress
@@ -49,7 +50,7 @@ class NodeData(collections.MutableMapping):
         self._node_data = data
 
     def __getitem__(self, key):
-        return self.data[key]
+        return self.source[key]
 
     def __setitem__(self, key, value):
         self.data[key] = value
@@ -58,10 +59,13 @@ class NodeData(collections.MutableMapping):
         del self.data[key]
 
     def __iter__(self):
-        return iter(self.data)
+        return iter(self.source)
 
     def __len__(self):
-        return len(self.data)
+        return len(self.source)
+
+    def __contains__(self, key):
+        return key in self.source
 
     def __repr__(self):
         cls_name = type(self).__name__
@@ -78,8 +82,19 @@ class NodeData(collections.MutableMapping):
     def copy(self):
         return self.data.copy()
 
+    @property
+    def source(self):
+        # Lazily decoded node data can answer reads of individual keys
+        # without decoding the others, until the whole mapping is needed.
+        if 'data' not in self.__dict__ and isinstance(self._node_data, LazyNodeData):
+            return self._node_data
+        return self.data
+
     @memoize
     def data(self):
+        if isinstance(self._node_data, LazyNodeData):
+            self._node_data = self._node_data.materialize()
+
         if self._node_data is not None:
             return self._node_data
 
@@ -89,6 +104,8 @@ class NodeData(collections.MutableMapping):
             else:
                 warnings.warn('You should populate node data before accessing it.')
             self.bind_data(nodestore.get(self.id) or {})
+            if isinstance(self._node_data, LazyNodeData):
+                self._node_data = self._node_data.materialize()
             return self._node_data
 
         return {}
@@ -157,6 +174,9 @@ class NodeField(GzippedDictField):
 
         # TODO(dcramer): we should probably do this more intelligently
         # and manually
+        # The node is written before the row which references it, so a
+        # saved row always has its data. Deferring this write (e.g. to batch
+        # it with other nodes) means deferring the row as well.
         if not value.id:
             value.id = nodestore.create(value.data)
         else:
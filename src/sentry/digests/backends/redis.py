@@ -1,14 +1,18 @@
 from __future__ import absolute_import
 
+import itertools
 import logging
 import six
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from redis.client import ResponseError
 
 from sentry.digests import Record, ScheduleEntry
 from sentry.digests.backends.base import Backend, InvalidState
+from sentry.utils import metrics
+from sentry.utils.iterators import chunked
 from sentry.utils.locking.backends.redis import RedisLockBackend
 from sentry.utils.locking.manager import LockManager
 from sentry.utils.redis import (check_cluster_versions, get_cluster_from_options, load_script)
@@ -67,6 +71,9 @@ class RedisBackend(Backend):
         1) "mail:p:1"
         2) "1444847638"
 
+    Items are moved between the schedule sets at most ``schedule_batch_size``
+    at a time (so that no single script call blocks a host for long), and all
+    hosts are processed concurrently.
     """
 
     def __init__(self, **options):
@@ -84,6 +91,12 @@ class RedisBackend(Backend):
         # too early.
         self.ttl = options.pop('ttl', 60 * 60)
 
+        # The maximum number of items moved between schedule sets by a single
+        # script call, and the maximum number of record values fetched by a
+        # single command when opening a digest.
+        self.schedule_batch_size = options.pop('schedule_batch_size', 1000)
+        self.fetch_batch_size = options.pop('fetch_batch_size', 500)
+
         super(RedisBackend, self).__init__(**options)
 
     def validate(self):
@@ -141,61 +154,98 @@ class RedisBackend(Backend):
         )
 
     def __schedule_partition(self, host, deadline, timestamp):
-        return script(
-            self.cluster.get_local_client(host),
-            ['-'],
-            [
-                'SCHEDULE',
-                self.namespace,
-                self.ttl,
-                timestamp,
-                deadline,
-            ],
-        )
+        client = self.cluster.get_local_client(host)
+        results = []
+        while True:
+            entries = script(
+                client,
+                ['-'],
+                [
+                    'SCHEDULE',
+                    self.namespace,
+                    self.ttl,
+                    timestamp,
+                    deadline,
+                    self.schedule_batch_size,
+                ],
+            )
+            results.extend(entries)
+            if len(entries) < self.schedule_batch_size:
+                return results
+
+    def __map_partitions(self, function, description):
+        hosts = list(self.cluster.hosts)
+        with ThreadPoolExecutor(max_workers=max(len(hosts), 1)) as executor:
+            futures = [(host, executor.submit(function, host)) for host in hosts]
+            for host, future in futures:
+                try:
+                    yield future.result()
+                except Exception as error:
+                    logger.error(
+                        'Failed to perform %s for partition %r due to error: %r',
+                        description,
+                        host,
+                        error,
+                        exc_info=True
+                    )
 
     def schedule(self, deadline, timestamp=None):
         if timestamp is None:
             timestamp = time.time()
 
-        for host in self.cluster.hosts:
-            try:
-                for key, timestamp in self.__schedule_partition(host, deadline, timestamp):
-                    yield ScheduleEntry(key, float(timestamp))
-            except Exception as error:
-                logger.error(
-                    'Failed to perform scheduling for partition %r due to error: %r',
-                    host,
-                    error,
-                    exc_info=True
-                )
+        for entries in self.__map_partitions(
+            lambda host: self.__schedule_partition(host, deadline, timestamp),
+            'scheduling',
+        ):
+            for key, scheduled in entries:
+                scheduled = float(scheduled)
+                # How long the timeline waited past its scheduled time
+                # before it was moved to the ready set.
+                metrics.timing('digests.schedule.lag', max(timestamp - scheduled, 0))
+                yield ScheduleEntry(key, scheduled)
 
     def __maintenance_partition(self, host, deadline, timestamp):
-        return script(
-            self.cluster.get_local_client(host),
-            ['-'],
-            [
-                'MAINTENANCE',
-                self.namespace,
-                self.ttl,
-                timestamp,
-                deadline,
-            ],
-        )
+        client = self.cluster.get_local_client(host)
+        total = 0
+        while True:
+            moved = script(
+                client,
+                ['-'],
+                [
+                    'MAINTENANCE',
+                    self.namespace,
+                    self.ttl,
+                    timestamp,
+                    deadline,
+                    self.schedule_batch_size,
+                ],
+            )
+            total += moved
+            if moved < self.schedule_batch_size:
+                return total
 
     def maintenance(self, deadline, timestamp=None):
         if timestamp is None:
             timestamp = time.time()
 
-        for host in self.cluster.hosts:
-            try:
-                self.__maintenance_partition(host, deadline, timestamp)
-            except Exception as error:
-                logger.error(
-                    'Failed to perform maintenance on digest partition %r due to error: %r',
-                    host,
-                    error,
-                    exc_info=True
-                )
+        for moved in self.__map_partitions(
+            lambda host: self.__maintenance_partition(host, deadline, timestamp),
+            'maintenance',
+        ):
+            if moved:
+                metrics.incr('digests.maintenance.requeued', amount=moved)
+
+    def __get_record_values(self, connection, key, record_ids):
+        if not record_ids:
+            return []
+
+        with connection.pipeline(transaction=False) as pipeline:
+            for chunk in chunked(record_ids, self.fetch_batch_size):
+                pipeline.mget([
+                    '{}:t:{}:r:{}'.format(self.namespace, key, record_id)
+                    for record_id in chunk
+                ])
+            return list(itertools.chain.from_iterable(pipeline.execute()))
 
     @contextmanager
     def digest(self, key, minimum_delay=None, timestamp=None):
@@ -227,13 +277,16 @@ class RedisBackend(Backend):
                 else:
                     raise
 
+            # The response is a flat sequence of record IDs and timestamps.
+            record_ids = response[0::2]
+            values = self.__get_record_values(connection, key, record_ids)
             records = map(
                 lambda (key, value, timestamp): Record(
                     key,
                     self.codec.decode(value) if value is not None else None,
                     float(timestamp),
                 ),
-                response,
+                zip(record_ids, values, response[1::2]),
             )
 
             # If the record value is `None`, this means the record data was
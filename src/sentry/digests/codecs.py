@@ -2,7 +2,14 @@ from __future__ import absolute_import
 
 import zlib
 
+from sentry.digests.notifications import Notification
+from sentry.models import Event
+from sentry.utils import json
 from sentry.utils.compat import pickle
+from sentry.utils.dates import (
+    to_datetime,
+    to_timestamp,
+)
 
 
 class Codec(object):
@@ -19,3 +26,45 @@ class CompressedPickleCodec(Codec):
 
     def decode(self, value):
         return pickle.loads(zlib.decompress(value))
+
+
+class CompactNotificationCodec(CompressedPickleCodec):
+    """
+    Encodes notifications as a JSON array of the event ID, group ID,
+    timestamp and rule IDs, rather than pickling the entire event.
+
+    Decoded notifications contain an unsaved placeholder event without any
+    event data, which must be replaced with the stored event (see
+    ``sentry.digests.notifications.fetch_events``) before it can be
+    rendered. Any other values -- as well as notifications that were written
+    before this codec was enabled -- are stored as compressed pickles (a zlib
+    stream never starts with ``[``.)
+    """
+
+    def encode(self, value):
+        if not isinstance(value, Notification):
+            return super(CompactNotificationCodec, self).encode(value)
+
+        event = value.event
+        return json.dumps(
+            [
+                event.event_id,
+                event.group_id,
+                to_timestamp(event.datetime),
+                list(value.rules),
+            ]
+        )
+
+    def decode(self, value):
+        if not value.startswith(b'['):
+            return super(CompactNotificationCodec, self).decode(value)
+
+        event_id, group_id, timestamp, rules = json.loads(value)
+        return Notification(
+            Event(
+                event_id=event_id,
+                group_id=group_id,
+                datetime=to_datetime(timestamp),
+            ),
+            rules,
+        )
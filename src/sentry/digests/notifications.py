@@ -16,6 +16,7 @@ from sentry.app import tsdb
 from sentry.digests import Record
 from sentry.models import (
     Project,
+    Event,
     Group,
     GroupStatus,
     Rule,
@@ -53,6 +54,41 @@ def event_to_record(event, rules):
     )
 
 
+def fetch_events(project, records):
+    """
+    Replaces the placeholder events of records that were decoded by the
+    ``CompactNotificationCodec`` with the stored events (and their event
+    data), which are fetched in bulk. Records for events that no longer exist
+    are dropped.
+    """
+    event_ids = set(record.value.event.event_id for record in records if record.value.event.id is None)
+    if not event_ids:
+        return records
+
+    events = {
+        event.event_id: event
+        for event in Event.objects.filter(project_id=project.id, event_id__in=event_ids)
+    }
+    Event.objects.bind_nodes(events.values(), 'data')
+
+    results = []
+    for record in records:
+        event = record.value.event
+        if event.id is None:
+            event = events.get(event.event_id)
+            if event is None:
+                logger.debug('%r could not be associated with an event.', record)
+                continue
+            record = Record(
+                record.key,
+                Notification(event, record.value.rules),
+                record.timestamp,
+            )
+        results.append(record)
+
+    return results
+
+
 def fetch_state(project, records):
     # This reads a little strange, but remember that records are returned in
     # reverse chronological order, and we query the database in chronological
@@ -61,7 +97,7 @@ def fetch_state(project, records):
     start = records[-1].datetime
     end = records[0].datetime
 
-    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
+    groups = Group.objects.in_bulk(set(record.value.event.group_id for record in records))
     return {
         'project':
         project,
@@ -210,6 +246,9 @@ def build_digest(project, records, state=None):
     # XXX: This is a hack to allow generating a mock digest without actually
     # doing any real IO!
     if state is None:
+        records = fetch_events(project, records)
+        if not records:
+            return
         state = fetch_state(project, records)
 
     state = attach_state(**state)
@@ -21,7 +21,7 @@ from django.utils.encoding import force_bytes, force_text
 from hashlib import md5
 from uuid import uuid4
 
-from sentry import eventtypes, features, buffer, tagstore
+from sentry import eventtypes, features, buffer, search, tagstore
 # we need a bunch of unexposed functions from tsdb
 from sentry.tsdb import backend as tsdb
 from sentry.constants import (
@@ -29,20 +29,21 @@ from sentry.constants import (
 )
 from sentry.interfaces.base import get_interface
 from sentry.models import (
-    Activity, Environment, Event, EventMapping, EventUser, Group, GroupHash, GroupRelease,
-    GroupResolution, GroupStatus, Project, Release, ReleaseEnvironment, ReleaseProject,
-    UserReport
+    Activity, Environment, Event, EventError, EventMapping, EventUser, Group, GroupHash,
+    GroupRelease, GroupResolution, GroupStatus, Project, Release, ReleaseEnvironment,
+    ReleaseProject, UserReport
 )
 from sentry.plugins import plugins
 from sentry.signals import first_event_received, regression_signal
 from sentry.tasks.merge import merge_group
 from sentry.tasks.post_process import post_process_group
+from sentry.utils import json, metrics
 from sentry.utils.cache import default_cache
 from sentry.utils.db import get_db_engine
 from sentry.utils.safe import safe_execute, trim, trim_dict
 from sentry.utils.strings import truncatechars
 from sentry.utils.validators import validate_ip
-from sentry.stacktraces import normalize_in_app
+from sentry.stacktraces import find_stacktraces_in_data, normalize_in_app
 
 
 DEFAULT_FINGERPRINT_VALUES = frozenset(['{{ default }}', '{{default}}'])
@@ -191,6 +192,79 @@ def generate_culprit(data, platform=None):
     return truncatechars(culprit, MAX_CULPRIT_LENGTH)
 
 
+def _get_size(value):
+    return len(json.dumps(value))
+
+
+def _discard_frame_vars(data):
+    frames = []
+    for info in find_stacktraces_in_data(data, include_raw=True):
+        frames.extend(info.stacktrace.get('frames') or ())
+    # Frames are listed from the outermost call, and variables of in-app
+    # frames are discarded last.
+    frames.sort(key=lambda frame: bool(frame.get('in_app')))
+    for frame in frames:
+        if frame.get('vars'):
+            yield _get_size('vars') + _get_size(frame.pop('vars')) + 2
+
+
+def _discard_breadcrumbs(data):
+    crumbs = (data.get('sentry.interfaces.Breadcrumbs') or {}).get('values') or []
+    while crumbs:
+        yield _get_size(crumbs.pop(0)) + 1
+
+
+def _discard_extra(data):
+    extra = data.get('extra') or {}
+    for key, size in sorted(
+        ((k, _get_size(k) + _get_size(v) + 2) for k, v in six.iteritems(extra)),
+        key=lambda item: item[1],
+        reverse=True,
+    ):
+        del extra[key]
+        yield size
+
+
+EVENT_TRIMMERS = (
+    ('stack frame variables', _discard_frame_vars),
+    ('breadcrumbs', _discard_breadcrumbs),
+    ('extra context', _discard_extra),
+)
+
+
+def trim_event_data(data, max_size):
+    """
+    Discards the least important parts of ``data`` until its serialized size
+    fits into ``max_size`` bytes, recording an error for each part that was
+    trimmed. Returns the number of bytes discarded.
+
+    The event is serialized once, after which its size is reduced by the
+    size of each discarded value rather than serializing it again.
+    """
+    size = _get_size(data)
+    if size <= max_size:
+        return 0
+
+    original_size = size
+    for name, discard in EVENT_TRIMMERS:
+        trimmed = False
+        for discarded in discard(data):
+            size -= discarded
+            trimmed = True
+            if size <= max_size:
+                break
+        if trimmed:
+            data.setdefault('errors', []).append({
+                'type': EventError.EVENT_TOO_LARGE,
+                'name': name,
+                'max_size': max_size,
+            })
+        if size <= max_size:
+            break
+
+    return original_size - size
+
+
 def plugin_is_regression(group, event):
     project = event.project
     for plugin in plugins.for_project(project):
@@ -447,6 +521,14 @@ class EventManager(object):
         date = datetime.fromtimestamp(data.pop('timestamp'))
         date = date.replace(tzinfo=timezone.utc)
 
+        max_event_size = project.get_option(
+            'sentry:max_event_size', settings.SENTRY_MAX_EVENT_SIZE
+        )
+        if max_event_size:
+            trimmed_size = trim_event_data(data, max_event_size)
+            if trimmed_size:
+                metrics.timing('events.size.trimmed', trimmed_size)
+
         kwargs = {
             'platform': platform,
         }
@@ -684,6 +766,8 @@ class EventManager(object):
 
         tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
 
+        search.index_event(event)
+
         UserReport.objects.filter(
             project=project,
             event_id=event_id,
@@ -1054,6 +1138,7 @@ class EventManager(object):
 
         buffer.incr(Group, update_kwargs, {
             'id': group.id,
+            'project_id': group.project_id,
         }, extra)
 
         return is_regression
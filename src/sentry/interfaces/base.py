@@ -38,14 +38,15 @@ def get_interface(name):
 
 def get_interfaces(data):
     result = []
-    for key, data in six.iteritems(data):
+    # Only look up the values of interfaces, node data may decode them lazily
+    for key in data:
         try:
             cls = get_interface(key)
         except ValueError:
             continue
 
         value = safe_execute(
-            cls.to_python, data, _with_transaction=False
+            cls.to_python, data[key], _with_transaction=False
         )
         if not value:
             continue
@@ -22,6 +22,7 @@ class EventError(object):
     INVALID_DATA = 'invalid_data'
     INVALID_ATTRIBUTE = 'invalid_attribute'
     VALUE_TOO_LONG = 'value_too_long'
+    EVENT_TOO_LARGE = 'event_too_large'
     UNKNOWN_ERROR = 'unknown_error'
     SECURITY_VIOLATION = 'security_violation'
     RESTRICTED_IP = 'restricted_ip'
@@ -58,6 +59,7 @@ class EventError(object):
         INVALID_DATA: u'Discarded invalid value for parameter \'{name}\'',
         INVALID_ATTRIBUTE: u'Discarded invalid parameter \'{name}\'',
         VALUE_TOO_LONG: u'Discarded value for \'{name}\' due to exceeding maximum length',
+        EVENT_TOO_LARGE: u'Discarded {name} due to the event exceeding {max_size} bytes',
         UNKNOWN_ERROR: u'Unknown error',
         SECURITY_VIOLATION: u'Cannot fetch resource due to security violation on {url}',
         RESTRICTED_IP: u'Cannot fetch resource due to restricted IP address on {url}',
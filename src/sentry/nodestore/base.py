@@ -8,14 +8,144 @@ sentry.nodestore.base
 
 from __future__ import absolute_import
 
+import logging
+import os
 import six
 
 from base64 import b64encode
-from threading import local
+from django.conf import settings
+from six.moves.queue import Empty, Queue
+from threading import Event, Lock, Thread, local
+from time import time
 from uuid import uuid4
 
+from sentry.utils import metrics
 from sentry.utils.services import Service
 
+logger = logging.getLogger('sentry.nodestore')
+
+
+class WorkerPool(object):
+    """
+    A fixed size pool of daemon threads. The threads are started when the
+    first job is submitted and run until the process exits.
+    """
+
+    def __init__(self, size):
+        assert size > 0, 'pool must have at least one worker thread'
+        self.size = size
+        self.tasks = None
+        self.lock = Lock()
+
+    def start(self):
+        tasks = Queue()
+
+        def consumer():
+            while True:
+                func, args, callback = tasks.get()
+                try:
+                    callback(True, func(*args))
+                except Exception as e:
+                    callback(False, e)
+
+        for _ in range(self.size):
+            t = Thread(target=consumer)
+            t.setDaemon(True)
+            t.start()
+
+        self.tasks = tasks
+
+    def submit(self, func, args, callback):
+        """
+        Call ``func(*args)`` on a worker thread, then ``callback(True,
+        result)``, or ``callback(False, exception)`` if it raised.
+        """
+        if self.tasks is None:
+            with self.lock:
+                if self.tasks is None:
+                    self.start()
+        self.tasks.put((func, args, callback))
+
+
+# The threads of a pool do not survive a fork, so every process creates its
+# own pool when it is first needed.
+_pool = None
+_pool_pid = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pool = WorkerPool(settings.SENTRY_NODESTORE_MULTIGET_WORKERS)
+                _pool_pid = pid
+    return _pool
+
+
+def get_multi_concurrently(fetch, id_list, timeout=None, tags=None):
+    """
+    Calls ``fetch(id)`` for every ID on the shared pool of threads
+    (``SENTRY_NODESTORE_MULTIGET_WORKERS``) and returns a mapping of every
+    ID to its result.
+
+    Nodes which could not be fetched are returned as ``None``, the same as
+    nodes which do not exist: a fetch which fails is logged, and fetches
+    which have not completed by the deadline (``timeout`` seconds,
+    defaulting to ``SENTRY_NODESTORE_MULTIGET_TIMEOUT``) are abandoned.
+    Abandoned fetches which have not started yet are skipped, so a slow
+    backend can tie up at most the threads which were already running.
+    """
+    ids = set(id_list)
+    if timeout is None:
+        timeout = settings.SENTRY_NODESTORE_MULTIGET_TIMEOUT
+
+    metrics.timing('nodestore.get_multi.size', len(ids), tags=tags)
+
+    abandoned = Event()
+
+    def fetch_unless_abandoned(id):
+        if abandoned.is_set():
+            return None
+        return fetch(id)
+
+    completed = Queue()
+    pool = get_pool()
+    for id in ids:
+        pool.submit(
+            fetch_unless_abandoned,
+            (id, ),
+            lambda ok, value, id=id: completed.put((id, ok, value)),
+        )
+
+    results = {}
+    deadline = time() + timeout
+    while len(results) < len(ids):
+        try:
+            id, ok, value = completed.get(timeout=max(deadline - time(), 0))
+        except Empty:
+            abandoned.set()
+            missing = ids.difference(results)
+            metrics.incr('nodestore.get_multi.timeout', amount=len(missing), tags=tags)
+            logger.warning('nodestore.get_multi.timeout', extra={
+                'missing': len(missing),
+                'total': len(ids),
+            })
+            results.update((id, None) for id in missing)
+            break
+        if not ok:
+            metrics.incr('nodestore.get_multi.error', tags=tags)
+            logger.error('nodestore.get_multi.error', extra={
+                'node_id': id,
+                'error': repr(value),
+            })
+            value = None
+        results[id] = value
+
+    return results
+
 
 class NodeStorage(local, Service):
     __all__ = (
@@ -58,11 +188,36 @@ class NodeStorage(local, Service):
 
     def get_multi(self, id_list):
         """
+        Fetches nodes one after another with ``get``, or concurrently with
+        the function returned by ``get_node_fetcher`` if the backend provides
+        one (see ``get_multi_concurrently``.)
+
         >>> data_map = nodestore.get_multi(['key1', 'key2')
         >>> print 'key1', data_map['key1']
         >>> print 'key2', data_map['key2']
         """
-        return dict((id, self.get(id)) for id in id_list)
+        id_list = list(id_list)
+        fetch = self.get_node_fetcher() if len(id_list) > 1 else None
+        if fetch is None:
+            return dict((id, self.get(id)) for id in id_list)
+
+        return get_multi_concurrently(
+            fetch,
+            id_list,
+            tags={'backend': type(self).__name__},
+        )
+
+    def get_node_fetcher(self):
+        """
+        Returns a function which fetches a single node like ``get``, and is
+        safe to call from other threads, or ``None`` if nodes can only be
+        fetched from the calling thread.
+
+        Backend instances are thread local, so the function must not read
+        attributes of the instance when it is called; anything it needs has
+        to be bound when it is created.
+        """
+        return None
 
     def set(self, id, data):
         """
@@ -84,4 +239,10 @@ class NodeStorage(local, Service):
         return b64encode(uuid4().bytes)
 
     def cleanup(self, cutoff_timestamp):
+        """
+        Removes nodes written before ``cutoff_timestamp`` and returns the
+        number of nodes removed, if known.
+
+        >>> nodestore.cleanup(timezone.now() - timedelta(days=30))
+        """
         raise NotImplementedError
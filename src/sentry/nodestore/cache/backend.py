@@ -0,0 +1,211 @@
+"""
+sentry.nodestore.cache.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import six
+import weakref
+import zlib
+
+from collections import OrderedDict
+from threading import Lock
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.codecs import to_dict
+from sentry.utils import json, metrics, redis
+from sentry.utils.imports import import_string
+
+
+class LRUCache(object):
+    """
+    A thread-safe mapping of node IDs to encoded node data, which evicts the
+    least recently used values once their total size exceeds ``max_size``
+    bytes.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.values = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, id):
+        with self.lock:
+            value = self.values.pop(id, None)
+            if value is not None:
+                self.values[id] = value
+            return value
+
+    def set(self, id, value):
+        if len(value) > self.max_size:
+            return
+        with self.lock:
+            previous = self.values.pop(id, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.values[id] = value
+            self.size += len(value)
+            while self.size > self.max_size:
+                _, evicted = self.values.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, id):
+        with self.lock:
+            value = self.values.pop(id, None)
+            if value is not None:
+                self.size -= len(value)
+
+
+# NodeStorage instances are thread local, but the local cache is shared by
+# all threads of the process.
+_local_caches = weakref.WeakKeyDictionary()
+_local_caches_lock = Lock()
+
+
+class CachedNodeStorage(NodeStorage):
+    """
+    A backend which reads through a process local LRU cache and a shared
+    Redis cache in front of another backend.
+
+    Nodes are only cached once they are read, since many are never read
+    after they are written. Setting or deleting a node removes its cached
+    values. Values expire from Redis after ``ttl`` seconds.
+
+    >>> CachedNodeStorage(
+    >>>     backend='sentry.nodestore.riak.backend.RiakNodeStorage',
+    >>>     backend_options={'nodes': [{'host': '127.0.0.1', 'port': 8098}]},
+    >>>     cluster='default',
+    >>> )
+    """
+
+    def __init__(self, backend, backend_options=None, cluster='default',
+                 local_cache_size=32 * 1024 * 1024, ttl=60 * 60, **kwargs):
+        if isinstance(backend, six.string_types):
+            backend = import_string(backend)
+        self.backend = backend(**(backend_options or {}))
+        self.cluster = redis.clusters.get(cluster) if cluster is not None else None
+        self.local_cache_size = local_cache_size
+        self.ttl = ttl
+        super(CachedNodeStorage, self).__init__(**kwargs)
+
+    @property
+    def local_cache(self):
+        if not self.local_cache_size:
+            return None
+        with _local_caches_lock:
+            cache = _local_caches.get(self)
+            if cache is None:
+                cache = _local_caches[self] = LRUCache(self.local_cache_size)
+        return cache
+
+    def make_key(self, id):
+        return 'nodestore:{}'.format(id)
+
+    def encode(self, data):
+        return zlib.compress(json.dumps(to_dict(data)))
+
+    def decode(self, value):
+        return json.loads(zlib.decompress(value))
+
+    def record(self, tier, hits, misses, saved):
+        tags = {'tier': tier}
+        if hits:
+            metrics.incr('nodestore.cache.hit', amount=hits, tags=tags)
+            metrics.incr('nodestore.cache.bytes_saved', amount=saved, tags=tags)
+        if misses:
+            metrics.incr('nodestore.cache.miss', amount=misses, tags=tags)
+
+    def get_cached(self, id_list):
+        results = {}
+
+        local_cache = self.local_cache
+        if local_cache is not None:
+            saved = 0
+            for id in id_list:
+                value = local_cache.get(id)
+                if value is not None:
+                    results[id] = self.decode(value)
+                    saved += len(value)
+            self.record('local', len(results), len(id_list) - len(results), saved)
+
+        missing = [id for id in id_list if id not in results]
+        if missing and self.cluster is not None:
+            with self.cluster.map() as client:
+                promises = [(id, client.get(self.make_key(id))) for id in missing]
+
+            hits = saved = 0
+            for id, promise in promises:
+                value = promise.value
+                if value is None:
+                    continue
+                results[id] = self.decode(value)
+                if local_cache is not None:
+                    local_cache.set(id, value)
+                hits += 1
+                saved += len(value)
+            self.record('redis', hits, len(missing) - hits, saved)
+
+        return results
+
+    def set_cached(self, values):
+        encoded = dict((id, self.encode(data)) for id, data in six.iteritems(values))
+
+        local_cache = self.local_cache
+        if local_cache is not None:
+            for id, value in six.iteritems(encoded):
+                local_cache.set(id, value)
+
+        if self.cluster is not None:
+            with self.cluster.map() as client:
+                for id, value in six.iteritems(encoded):
+                    client.setex(self.make_key(id), self.ttl, value)
+
+    def delete_cached(self, id_list):
+        local_cache = self.local_cache
+        if local_cache is not None:
+            for id in id_list:
+                local_cache.delete(id)
+
+        if self.cluster is not None:
+            with self.cluster.map() as client:
+                for id in id_list:
+                    client.delete(self.make_key(id))
+
+    def get(self, id):
+        return self.get_multi([id]).get(id)
+
+    def get_multi(self, id_list):
+        id_list = list(id_list)
+        results = self.get_cached(id_list)
+
+        missing = [id for id in id_list if id not in results]
+        if missing:
+            fetched = self.backend.get_multi(missing)
+            self.set_cached(
+                dict((id, data) for id, data in six.iteritems(fetched) if data is not None)
+            )
+            results.update(fetched)
+
+        return results
+
+    def set(self, id, data):
+        self.backend.set(id, data)
+        self.delete_cached([id])
+
+    def set_multi(self, values):
+        self.backend.set_multi(values)
+        self.delete_cached(list(values))
+
+    def delete(self, id):
+        self.delete_multi([id])
+
+    def delete_multi(self, id_list):
+        self.backend.delete_multi(id_list)
+        self.delete_cached(id_list)
+
+    def cleanup(self, cutoff_timestamp):
+        return self.backend.cleanup(cutoff_timestamp)
@@ -8,47 +8,145 @@ sentry.nodestore.cassandra.backend
 
 from __future__ import absolute_import, print_function
 
-import casscache
+import six
+
+from cassandra.cluster import Cluster
+from cassandra.policies import DCAwareRoundRobinPolicy, TokenAwarePolicy
 
 from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.codecs import CodecManager, CompressedPickleCodec, to_dict
 from sentry.utils.cache import memoize
+from sentry.utils.compat import pickle
+from sentry.utils.imports import import_string
+
+# Flags stored alongside values. Values written by earlier versions of this
+# backend (through casscache) are pickled. The flags follow the memcached
+# convention used by casscache, which reserves the low bits:
+#
+#   1 << 0  pickled (FLAG_PICKLE)
+#   1 << 1  integer
+#   1 << 2  long
+#   1 << 3  compressed
+#   1 << 8  encoded with the nodestore codec (FLAG_CODEC)
+FLAG_PICKLE = 1 << 0
+FLAG_CODEC = 1 << 8
+
+DEFAULT_PORT = 9042
 
 
 class CassandraNodeStorage(NodeStorage):
     """
     A Cassandra-based backend for storing node data.
 
+    Requests are routed to a replica of the node's partition, and multi-key
+    operations run concurrently with at most ``concurrency`` requests in
+    flight. Values are pickled unless a nodestore ``codec`` is configured.
+
     >>> CassandraNodeStorage(
     ...     servers=['127.0.0.1:9042'],
     ...     keyspace='sentry',
     ...     columnfamily='nodestore',
+    ...     codec='sentry.nodestore.codecs.ZstdCodec',
     ... )
     """
 
-    def __init__(self, servers, keyspace='sentry', columnfamily='nodestore', **kwargs):
+    def __init__(self, servers, keyspace='sentry', columnfamily='nodestore', concurrency=50,
+                 local_dc=None, codec=None, codec_options=None, **kwargs):
         self.servers = servers
         self.keyspace = keyspace
         self.columnfamily = columnfamily
+        self.concurrency = concurrency
+        self.local_dc = local_dc
+        if isinstance(codec, six.string_types):
+            codec = import_string(codec)(**(codec_options or {}))
+        self.codec = codec
+        self.codecs = CodecManager(codec or CompressedPickleCodec())
         self.options = kwargs
         super(CassandraNodeStorage, self).__init__()
 
     @memoize
-    def connection(self):
-        return casscache.Client(
-            servers=self.servers,
-            keyspace=self.keyspace,
-            columnfamily=self.columnfamily,
-            **self.options
+    def session(self):
+        # The driver connects to every host on the same port.
+        hosts, port = set(), DEFAULT_PORT
+        for server in self.servers:
+            host, _, server_port = server.partition(':')
+            hosts.add(host)
+            if server_port:
+                port = int(server_port)
+
+        options = self.options.copy()
+        options.setdefault(
+            'load_balancing_policy',
+            TokenAwarePolicy(DCAwareRoundRobinPolicy(local_dc=self.local_dc)),
+        )
+        return Cluster(list(hosts), port=port, **options).connect(self.keyspace)
+
+    @memoize
+    def select_statement(self):
+        return self.session.prepare(
+            'SELECT value, flags FROM {} WHERE key = ? LIMIT 1'.format(self.columnfamily)
         )
 
+    @memoize
+    def insert_statement(self):
+        return self.session.prepare(
+            'INSERT INTO {} (key, value, flags) VALUES (?, ?, ?)'.format(self.columnfamily)
+        )
+
+    @memoize
+    def delete_statement(self):
+        return self.session.prepare('DELETE FROM {} WHERE key = ?'.format(self.columnfamily))
+
+    def encode(self, data):
+        if self.codec is None:
+            return pickle.dumps(to_dict(data), protocol=pickle.HIGHEST_PROTOCOL), FLAG_PICKLE
+        return self.codecs.encode(data), FLAG_CODEC
+
+    def decode(self, rows):
+        row = next(iter(rows), None)
+        if row is None:
+            return None
+        value, flags = row
+        if flags & FLAG_CODEC:
+            return self.codecs.decode(value)
+        if flags & FLAG_PICKLE:
+            return pickle.loads(value)
+        return None
+
+    def execute_concurrent(self, statement, parameters):
+        """
+        Executes ``statement`` once for every item of ``parameters``, with at
+        most ``concurrency`` requests in flight, and returns the results in
+        order.
+        """
+        results = []
+        for i in range(0, len(parameters), self.concurrency):
+            futures = [
+                self.session.execute_async(statement, params)
+                for params in parameters[i:i + self.concurrency]
+            ]
+            results.extend(future.result() for future in futures)
+        return results
+
     def delete(self, id):
-        self.connection.delete(id)
+        self.session.execute(self.delete_statement, (id, ))
+
+    def delete_multi(self, id_list):
+        self.execute_concurrent(self.delete_statement, [(id, ) for id in id_list])
 
     def get(self, id):
-        return self.connection.get(id)
+        return self.decode(self.session.execute(self.select_statement, (id, )))
 
     def get_multi(self, id_list):
-        return self.connection.get_multi(id_list)
+        id_list = list(id_list)
+        results = self.execute_concurrent(self.select_statement, [(id, ) for id in id_list])
+        return dict((id, self.decode(rows)) for id, rows in zip(id_list, results))
 
     def set(self, id, data):
-        self.connection.set(id, data)
+        self.session.execute(self.insert_statement, (id, ) + self.encode(data))
+
+    def set_multi(self, values):
+        self.execute_concurrent(
+            self.insert_statement,
+            [(id, ) + self.encode(data) for id, data in six.iteritems(values)],
+        )
@@ -0,0 +1,369 @@
+"""
+sentry.nodestore.codecs
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Codecs turn node data into the bytes handed to storage backends and back.
+
+Every value written by a codec starts with a header naming the codec that
+produced it, so values remain readable after the configured codec changes.
+Values without a header were written as zlib compressed pickles, before
+codecs existed (a zlib stream never starts with a null byte.)
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import collections
+import logging
+import os
+import six
+import struct
+import zlib
+
+from django.conf import settings
+
+from sentry.utils import json
+from sentry.utils.compat import pickle
+from sentry.utils.imports import import_string
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+logger = logging.getLogger('sentry.nodestore')
+
+MAGIC = b'\x00'
+
+DICTIONARY_SUFFIX = '.dict'
+
+
+class Codec(object):
+    #: Identifies the codec in the header, ``None`` for headerless values.
+    version = None
+
+    def encode(self, data):
+        raise NotImplementedError
+
+    def decode(self, value):
+        raise NotImplementedError
+
+
+class CompressedPickleCodec(Codec):
+    """
+    The original encoding of node data, which is written without a header.
+    """
+
+    def encode(self, data):
+        return zlib.compress(pickle.dumps(to_dict(data)))
+
+    def decode(self, value):
+        return pickle.loads(zlib.decompress(value))
+
+
+def get_dictionary_key(data):
+    # The platform is not part of node data, but the SDK is and determines
+    # the shape of the payload just as well.
+    sdk = data.get('sdk')
+    if isinstance(sdk, dict) and isinstance(sdk.get('name'), six.string_types):
+        return sdk['name']
+    return None
+
+
+class DictionaryStore(object):
+    """
+    Loads trained compression dictionaries from a directory.
+
+    Dictionaries are stored as ``<key>.<dict_id>.dict``. All of them are
+    available for decoding, while the most recently written dictionary for
+    a key is used for encoding.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.by_id = {}
+        self.by_key = {}
+        if path is not None:
+            self.load()
+
+    def get_path(self, key, dict_id):
+        return os.path.join(self.path, '{}.{}{}'.format(key, dict_id, DICTIONARY_SUFFIX))
+
+    def load(self):
+        if self.path is None:
+            return
+
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            logger.warning('nodestore.dictionaries.missing', extra={'path': self.path})
+            return
+
+        latest = {}
+        for name in names:
+            if not name.endswith(DICTIONARY_SUFFIX):
+                continue
+            key, dict_id = name[:-len(DICTIONARY_SUFFIX)].rsplit('.', 1)
+            path = os.path.join(self.path, name)
+            with open(path, 'rb') as f:
+                dictionary = zstandard.ZstdCompressionDict(f.read())
+            self.by_id[int(dict_id)] = dictionary
+
+            mtime = os.path.getmtime(path)
+            if key not in latest or latest[key][0] < mtime:
+                latest[key] = (mtime, dictionary)
+
+        self.by_key = dict((key, value[1]) for key, value in six.iteritems(latest))
+
+    def save(self, key, dictionary):
+        path = self.get_path(key, dictionary.dict_id())
+        with open(path, 'wb') as f:
+            f.write(dictionary.as_bytes())
+        self.by_id[dictionary.dict_id()] = dictionary
+        self.by_key[key] = dictionary
+        return path
+
+
+class ZstdCodec(Codec):
+    """
+    Encodes node data as zstd compressed JSON, using a trained dictionary
+    for the payload's SDK when one is available (see ``sentry nodestore
+    train-dictionary``.)
+
+    The header is followed by the ID of the dictionary used (0 for none.)
+    Dictionaries are read from ``SENTRY_NODESTORE_DICTIONARIES`` unless
+    another directory is given.
+    """
+    version = 1
+    header = struct.Struct('>cBI')
+
+    def __init__(self, dictionaries=None, level=3):
+        if not HAS_ZSTD:
+            raise ImportError('ZstdCodec requires the zstandard package')
+        if dictionaries is None:
+            dictionaries = settings.SENTRY_NODESTORE_DICTIONARIES
+        self.level = level
+        self.dictionaries = DictionaryStore(dictionaries)
+        self.compressors = {}
+        self.decompressors = {}
+
+    def get_compressor(self, dictionary):
+        key = dictionary.dict_id() if dictionary is not None else 0
+        compressor = self.compressors.get(key)
+        if compressor is None:
+            # Older versions of zstandard don't accept ``dict_data=None``.
+            options = {'dict_data': dictionary} if dictionary is not None else {}
+            compressor = self.compressors[key] = zstandard.ZstdCompressor(
+                level=self.level,
+                write_content_size=True,
+                **options
+            )
+        return compressor
+
+    def get_decompressor(self, dict_id):
+        decompressor = self.decompressors.get(dict_id)
+        if decompressor is None:
+            options = {}
+            if dict_id:
+                dictionary = self.dictionaries.by_id.get(dict_id)
+                if dictionary is None:
+                    # The dictionary may have been trained after the
+                    # dictionaries were loaded.
+                    self.dictionaries.load()
+                    dictionary = self.dictionaries.by_id.get(dict_id)
+                if dictionary is None:
+                    raise ValueError('Unknown compression dictionary: {}'.format(dict_id))
+                options['dict_data'] = dictionary
+            decompressor = self.decompressors[dict_id] = zstandard.ZstdDecompressor(**options)
+        return decompressor
+
+    def encode(self, data, dictionary_key=None):
+        if dictionary_key is None:
+            dictionary_key = get_dictionary_key(data)
+        dictionary = self.dictionaries.by_key.get(dictionary_key)
+        dict_id = dictionary.dict_id() if dictionary is not None else 0
+        return self.header.pack(MAGIC, self.version, dict_id) + \
+            self.get_compressor(dictionary).compress(json.dumps(to_dict(data)))
+
+    def decode(self, value):
+        _, _, dict_id = self.header.unpack_from(value)
+        return json.loads(
+            self.get_decompressor(dict_id).decompress(value[self.header.size:]),
+        )
+
+
+class LazyNodeData(collections.MutableMapping):
+    """
+    Node data whose top-level values are decoded on first access.
+
+    ``offsets`` maps each key to the position of its encoded value in
+    ``payload``.
+    """
+
+    def __init__(self, payload, offsets):
+        self.payload = payload
+        self.offsets = offsets
+        self.values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self.values[key]
+        except KeyError:
+            start, end = self.offsets[key]
+            value = self.values[key] = json.loads(self.payload[start:end])
+            return value
+
+    def __setitem__(self, key, value):
+        if key not in self.offsets:
+            self.offsets[key] = None
+        self.values[key] = value
+
+    def __delitem__(self, key):
+        del self.offsets[key]
+        self.values.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __repr__(self):
+        return '<%s: keys=%r>' % (type(self).__name__, list(self.offsets))
+
+    def materialize(self):
+        return dict((key, self[key]) for key in self.offsets)
+
+    def copy(self):
+        return self.materialize()
+
+
+def to_dict(data):
+    """
+    Returns node data as a ``dict``, decoding all values of ``LazyNodeData``.
+    Data must be converted before it is serialized as a whole.
+    """
+    if isinstance(data, LazyNodeData):
+        return data.materialize()
+    return data
+
+
+class IndexedJsonCodec(Codec):
+    """
+    Encodes each top-level value of node data as JSON separately, preceded
+    by a table of their offsets, so individual values (usually interfaces)
+    can be decoded without decoding the rest. ``decode`` returns
+    ``LazyNodeData``.
+
+    The compressed body consists of the number of keys, followed by the
+    length, name, offset and length of the value for every key, followed by
+    the values.
+    """
+    version = 2
+    header = struct.Struct('>cB')
+    count = struct.Struct('>I')
+    key_length = struct.Struct('>H')
+    entry = struct.Struct('>II')
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def encode(self, data):
+        table = [self.count.pack(len(data))]
+        values = []
+        offset = 0
+        for key, value in six.iteritems(data):
+            if isinstance(key, six.text_type):
+                key = key.encode('utf-8')
+            value = json.dumps(value)
+            if isinstance(value, six.text_type):
+                value = value.encode('utf-8')
+            table.append(self.key_length.pack(len(key)))
+            table.append(key)
+            table.append(self.entry.pack(offset, len(value)))
+            values.append(value)
+            offset += len(value)
+        return self.header.pack(MAGIC, self.version) + \
+            zlib.compress(b''.join(table + values), self.level)
+
+    def decode(self, value):
+        body = zlib.decompress(value[self.header.size:])
+        (count, ) = self.count.unpack_from(body)
+        position = self.count.size
+
+        entries = []
+        for _ in range(count):
+            (length, ) = self.key_length.unpack_from(body, position)
+            position += self.key_length.size
+            key = body[position:position + length].decode('utf-8')
+            position += length
+            entries.append((key, self.entry.unpack_from(body, position)))
+            position += self.entry.size
+
+        offsets = collections.OrderedDict(
+            (key, (position + start, position + start + length))
+            for key, (start, length) in entries
+        )
+        return LazyNodeData(body, offsets)
+
+
+def get_version(value):
+    if value[:1] != MAGIC:
+        return None
+    return six.indexbytes(value, 1)
+
+
+class CodecManager(object):
+    """
+    Encodes with the configured codec and decodes with whichever codec
+    wrote the value. Codecs other than the configured one are created with
+    their default options when a value they wrote is first read.
+    """
+    codec_classes = (CompressedPickleCodec, ZstdCodec, IndexedJsonCodec)
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.codecs = {
+            codec.version: codec,
+        }
+
+    def get_codec(self, version):
+        codec = self.codecs.get(version)
+        if codec is None:
+            for cls in self.codec_classes:
+                if cls.version == version:
+                    codec = self.codecs[version] = cls()
+                    break
+            else:
+                raise ValueError('Unknown node codec version: {}'.format(version))
+        return codec
+
+    def encode(self, data):
+        return self.codec.encode(to_dict(data))
+
+    def decode(self, value):
+        return self.get_codec(get_version(value)).decode(value)
+
+
+_manager = None
+
+
+def get_manager():
+    global _manager
+    if _manager is None:
+        codec = import_string(settings.SENTRY_NODESTORE_CODEC)
+        _manager = CodecManager(codec(**settings.SENTRY_NODESTORE_CODEC_OPTIONS))
+    return _manager
+
+
+def encode(data):
+    return get_manager().encode(data)
+
+
+def decode(value):
+    return get_manager().decode(value)
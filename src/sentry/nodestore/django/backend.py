@@ -10,15 +10,110 @@ from __future__ import absolute_import
 
 import math
 
+from datetime import datetime, timedelta
+from django.db import connections, router, transaction
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
 from sentry.nodestore.base import NodeStorage
+from sentry.utils import db
 
 from .models import Node
 
+PARTITION_FORMAT = '%Y%m%d'
+
 
 class DjangoNodeStorage(NodeStorage):
+    """
+    Stores nodes in the ``nodestore_node`` table.
+
+    With ``partitioned`` (Postgres only), new nodes are written to a table
+    per day which inherits from ``nodestore_node``, so cleanup can drop the
+    tables of expired days instead of deleting their rows. Remaining expired
+    rows are deleted in chunks of ``cleanup_chunk_size``, waiting for
+    ``cleanup_pause`` seconds between chunks.
+
+    >>> DjangoNodeStorage(partitioned=True, cleanup_pause=0.5)
+    """
+
+    def __init__(self, partitioned=False, cleanup_chunk_size=10000, cleanup_pause=0, **kwargs):
+        self.partitioned = partitioned
+        self.cleanup_chunk_size = cleanup_chunk_size
+        self.cleanup_pause = cleanup_pause
+        self.partitions = set()
+        super(DjangoNodeStorage, self).__init__(**kwargs)
+
+    @property
+    def using(self):
+        return router.db_for_write(Node)
+
+    def is_partitioned(self):
+        return self.partitioned and db.is_postgres(self.using)
+
+    def get_partition(self, timestamp):
+        name = '{}_{}'.format(Node._meta.db_table, timestamp.strftime(PARTITION_FORMAT))
+        if name in self.partitions:
+            return name
+
+        start = datetime(timestamp.year, timestamp.month, timestamp.day, tzinfo=timezone.utc)
+        quote_name = connections[self.using].ops.quote_name
+        with transaction.atomic(using=self.using):
+            connections[self.using].cursor().execute(
+                'CREATE TABLE IF NOT EXISTS {name} ('
+                'PRIMARY KEY (id), '
+                'CHECK (timestamp >= %s AND timestamp < %s)'
+                ') INHERITS ({parent})'.format(
+                    name=quote_name(name),
+                    parent=quote_name(Node._meta.db_table),
+                ),
+                [start, start + timedelta(days=1)],
+            )
+        self.partitions.add(name)
+        return name
+
+    def get_partitions(self):
+        """
+        Returns ``(name, day, estimated rows)`` for every partition. The
+        estimate is ``None`` unless the table has been analyzed and is not
+        empty.
+        """
+        cursor = connections[self.using].cursor()
+        cursor.execute(
+            'SELECT c.relname, c.reltuples FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s',
+            [Node._meta.db_table],
+        )
+        prefix = Node._meta.db_table + '_'
+        results = []
+        for name, rows in cursor.fetchall():
+            try:
+                day = datetime.strptime(name[len(prefix):], PARTITION_FORMAT)
+            except ValueError:
+                continue
+            # Tables that were never analyzed are estimated to have no rows
+            # (or -1 rows, since Postgres 14), which can't be told apart from
+            # empty tables, and empty tables are cheap to count anyway.
+            rows = int(rows) if rows > 0 else None
+            results.append((name, day.replace(tzinfo=timezone.utc), rows))
+        return sorted(results, key=lambda x: x[1])
+
+    def set_partitioned(self, id, data):
+        timestamp = timezone.now()
+        # updates apply to rows in every partition
+        if Node.objects.using(self.using).filter(id=id).update(data=data, timestamp=timestamp):
+            return
+
+        partition = self.get_partition(timestamp)
+        field = Node._meta.get_field('data')
+        connections[self.using].cursor().execute(
+            'INSERT INTO {} (id, data, timestamp) VALUES (%s, %s, %s)'.format(
+                connections[self.using].ops.quote_name(partition),
+            ),
+            [id, field.get_prep_value(data), timestamp],
+        )
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
 
@@ -35,6 +130,9 @@ class DjangoNodeStorage(NodeStorage):
         Node.objects.filter(id__in=id_list).delete()
 
     def set(self, id, data):
+        if self.is_partitioned():
+            return self.set_partitioned(id, data)
+
         create_or_update(
             Node,
             id=id,
@@ -47,11 +145,29 @@ class DjangoNodeStorage(NodeStorage):
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
 
+        deleted = 0
+
+        if self.is_partitioned():
+            quote_name = connections[self.using].ops.quote_name
+            for name, day, rows in self.get_partitions():
+                if day + timedelta(days=1) > cutoff_timestamp:
+                    break
+                with transaction.atomic(using=self.using):
+                    cursor = connections[self.using].cursor()
+                    if rows is None:
+                        cursor.execute('SELECT COUNT(*) FROM {}'.format(quote_name(name)))
+                        rows = cursor.fetchone()[0]
+                    cursor.execute('DROP TABLE IF EXISTS {}'.format(quote_name(name)))
+                self.partitions.discard(name)
+                deleted += rows
+
         total_seconds = (timezone.now() - cutoff_timestamp).total_seconds()
         days = math.floor(total_seconds / 86400)
 
-        BulkDeleteQuery(
+        deleted += BulkDeleteQuery(
             model=Node,
             dtfield='timestamp',
             days=days,
-        ).execute()
+        ).execute(chunk_size=self.cleanup_chunk_size, pause=self.cleanup_pause)
+
+        return deleted
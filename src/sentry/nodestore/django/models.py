@@ -8,19 +8,51 @@ sentry.nodestore.django.models
 
 from __future__ import absolute_import
 
+import base64
+import six
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 from sentry.db.models import (BaseModel, GzippedDictField, sane_repr)
+from sentry.nodestore import codecs
+
+
+class NodeDataField(GzippedDictField):
+    """
+    Stores node data encoded with the configured nodestore codec.
+
+    Values written before codecs existed are zlib compressed pickles, which
+    the codec layer still reads.
+    """
+
+    def to_python(self, value):
+        if isinstance(value, six.string_types) and value:
+            # Values which can't be decoded raise rather than being read as
+            # empty data, which could then be written back.
+            value = codecs.decode(base64.b64decode(value))
+        elif not value:
+            return {}
+        return value
+
+    def get_prep_value(self, value):
+        if not value and self.null:
+            return None
+        return base64.b64encode(codecs.encode(value)).decode('utf-8')
+
+
+if 'south' in settings.INSTALLED_APPS:
+    from south.modelsinspector import add_introspection_rules
+
+    add_introspection_rules([], ["^sentry\.nodestore\.django\.models\.NodeDataField"])
 
 
 class Node(BaseModel):
     __core__ = False
 
     id = models.CharField(max_length=40, primary_key=True)
-    # TODO(dcramer): this being pickle and not JSON has the ability to cause
-    # hard errors as it accepts other serialization than native JSON
-    data = GzippedDictField()
+    data = NodeDataField()
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     __repr__ = sane_repr('timestamp')
@@ -8,11 +8,12 @@ sentry.nodestore.riak.backend
 
 from __future__ import absolute_import
 
-import six
+import functools
 
 from simplejson import JSONEncoder, _default_decoder
 
 from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.codecs import to_dict
 from .client import RiakClient
 
 # Cache an instance of the encoder we want to use
@@ -30,6 +31,13 @@ json_dumps = JSONEncoder(
 json_loads = _default_decoder.decode
 
 
+def get_node(conn, bucket, id):
+    rv = conn.get(bucket, id, r=1)
+    if rv.status != 200:
+        return None
+    return json_loads(rv.data)
+
+
 class RiakNodeStorage(NodeStorage):
     """
     A Riak-based backend for storing node data.
@@ -44,7 +52,7 @@ class RiakNodeStorage(NodeStorage):
         timeout=1,
         cooldown=5,
         max_retries=3,
-        multiget_pool_size=5,
+        multiget_pool_size=None,
         tcp_keepalive=True,
         protocol=None
     ):
@@ -55,44 +63,33 @@ class RiakNodeStorage(NodeStorage):
         if protocol is not None:
             import warnings
             warnings.warn("'protocol' has been deprecated", DeprecationWarning)
+        if multiget_pool_size is not None:
+            import warnings
+            warnings.warn(
+                "'multiget_pool_size' has been deprecated, see SENTRY_NODESTORE_MULTIGET_WORKERS",
+                DeprecationWarning
+            )
         self.bucket = bucket
         self.conn = RiakClient(
             hosts=nodes,
             max_retries=max_retries,
-            multiget_pool_size=multiget_pool_size,
             cooldown=cooldown,
             tcp_keepalive=tcp_keepalive,
         )
 
     def set(self, id, data):
-        self.conn.put(self.bucket, id, json_dumps(data), returnbody='false')
+        self.conn.put(self.bucket, id, json_dumps(to_dict(data)), returnbody='false')
 
     def delete(self, id):
         self.conn.delete(self.bucket, id)
 
     def get(self, id):
-        rv = self.conn.get(self.bucket, id, r=1)
-        if rv.status != 200:
-            return None
-        return json_loads(rv.data)
-
-    def get_multi(self, id_list):
-        # shortcut for just one id since this is a common
-        # case for us from EventManager.bind_nodes
-        if len(id_list) == 1:
-            id = id_list[0]
-            return {id: self.get(id)}
-
-        rv = self.conn.multiget(self.bucket, id_list, r=1)
-        results = {}
-        for key, value in six.iteritems(rv):
-            if isinstance(value, Exception):
-                six.reraise(type(value), value)
-            if value.status != 200:
-                results[key] = None
-            else:
-                results[key] = json_loads(value.data)
-        return results
+        return get_node(self.conn, self.bucket, id)
+
+    def get_node_fetcher(self):
+        # The client is thread-safe, so the calling thread's client is
+        # shared with the threads used by ``get_multi``.
+        return functools.partial(get_node, self.conn, self.bucket)
 
     def cleanup(self, cutoff_timestamp):
         # TODO(dcramer): we should either index timestamps or have this run
@@ -8,15 +8,13 @@ sentry.nodestore.riak.client
 
 from __future__ import absolute_import
 
-import functools
 import six
 import sys
 import socket
 from base64 import b64encode
 from random import shuffle
-from six.moves.queue import Queue
 from time import time
-from threading import Lock, Thread, Event
+from threading import Lock
 
 # utilize the ca_certs path from requests since we already depend on it
 # and they bundle a ca cert.
@@ -34,58 +32,14 @@ def encode_basic_auth(auth):
     return 'Basic ' + b64encode(auth).decode('utf-8')
 
 
-class SimpleThreadedWorkerPool(object):
-    """\
-    Manages a simple threaded worker pool. The pool will be started when the
-    first job is submitted, and will run to process completion.
-    """
-
-    def __init__(self, size):
-        assert size > 0, 'pool must have at laest one worker thread'
-
-        self.__started = False
-        self.__size = size
-
-    def __start(self):
-        self.__tasks = tasks = Queue()
-
-        def consumer():
-            while True:
-                func, args, kwargs, cb = tasks.get()
-                try:
-                    rv = func(*args, **kwargs)
-                except Exception as e:
-                    rv = e
-                finally:
-                    cb(rv)
-                    tasks.task_done()
-
-        for _ in range(self.__size):
-            t = Thread(target=consumer)
-            t.setDaemon(True)
-            t.start()
-
-        self.__started = True
-
-    def submit(self, (func, arg, kwargs, cb)):
-        """\
-        Submit a task to the worker pool.
-        """
-        if not self.__started:
-            self.__start()
-
-        self.__tasks.put((func, arg, kwargs, cb))
-
-
 class RiakClient(object):
     """
     A thread-safe simple light-weight riak client that does only
     the bare minimum.
     """
 
-    def __init__(self, multiget_pool_size=5, **kwargs):
+    def __init__(self, **kwargs):
         self.manager = ConnectionManager(**kwargs)
-        self.pool = SimpleThreadedWorkerPool(multiget_pool_size)
 
     def build_url(self, bucket, key, qs):
         url = '/buckets/%s/keys/%s' % tuple(map(quote_plus, (bucket, key)))
@@ -123,43 +77,6 @@ class RiakClient(object):
             headers=headers,
         )
 
-    def multiget(self, bucket, keys, headers=None, **kwargs):
-        """
-        Thread-safe multiget implementation that shares the same thread pool
-        for all requests.
-        """
-        # Each request is paired with a thread.Event to signal when it is finished
-        requests = [(key, self.build_url(bucket, key, kwargs), Event()) for key in keys]
-
-        results = {}
-
-        def callback(key, event, rv):
-            results[key] = rv
-            # Signal that this request is finished
-            event.set()
-
-        for key, url, event in requests:
-            self.pool.submit(
-                (
-                    self.manager.urlopen,  # func
-                    ('GET', url),  # args
-                    {
-                        'headers': headers
-                    },  # kwargs
-                    functools.partial(
-                        callback,
-                        key,
-                        event,
-                    ),  # callback
-                )
-            )
-
-        # Now we wait for all of the callbacks to be finished
-        for _, _, event in requests:
-            event.wait()
-
-        return results
-
     def close(self):
         self.manager.close()
 
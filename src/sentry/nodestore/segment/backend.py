@@ -0,0 +1,205 @@
+"""
+sentry.nodestore.segment.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import errno
+import fcntl
+import mmap
+import os
+import sqlite3
+import zlib
+
+from time import time
+
+from sentry.nodestore import codecs
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import json
+from sentry.utils.cache import memoize
+from sentry.utils.dates import to_timestamp
+
+SEGMENT_SUFFIX = '.seg'
+
+# SQLite limits the number of host parameters in a single statement.
+MAX_QUERY_PARAMS = 500
+
+
+class SegmentNodeStorage(NodeStorage):
+    """
+    A backend which appends node data to time partitioned segment files on
+    the local filesystem.
+
+    Nodes are written to the segment for the period in which they were
+    written (one day by default), and an index in ``path`` maps each node
+    ID to its segment, offset and length. Reads map segments into memory, and
+    ``cleanup`` removes expired nodes by dropping whole segments.
+
+    Deleting or overwriting a node only updates the index, the space is
+    reclaimed once its segment expires.
+
+    >>> SegmentNodeStorage(path='/var/lib/sentry/nodestore')
+    """
+
+    def __init__(self, path, segment_period=60 * 60 * 24, compression_level=6):
+        self.path = path
+        self.segment_period = segment_period
+        self.compression_level = compression_level
+        self.maps = {}
+
+        try:
+            os.makedirs(path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        super(SegmentNodeStorage, self).__init__()
+
+    @memoize
+    def index(self):
+        connection = sqlite3.connect(
+            os.path.join(self.path, 'index.db'),
+            timeout=30,
+        )
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS nodes ('
+                'id TEXT PRIMARY KEY, segment INTEGER NOT NULL, '
+                'offset INTEGER NOT NULL, length INTEGER NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS nodes_segment ON nodes (segment)')
+        return connection
+
+    def encode(self, data):
+        # Headerless values are zlib compressed JSON, unless another codec
+        # has been configured (see ``SENTRY_NODESTORE_CODEC``.)
+        manager = codecs.get_manager()
+        if manager.codec.version is not None:
+            return manager.encode(data)
+        return zlib.compress(json.dumps(codecs.to_dict(data)), self.compression_level)
+
+    def decode(self, value):
+        if codecs.get_version(value) is not None:
+            return codecs.decode(value)
+        return json.loads(zlib.decompress(value))
+
+    def get_segment_path(self, segment):
+        return os.path.join(self.path, '{}{}'.format(segment, SEGMENT_SUFFIX))
+
+    def get_segments(self):
+        for name in os.listdir(self.path):
+            if name.endswith(SEGMENT_SUFFIX):
+                yield int(name[:-len(SEGMENT_SUFFIX)])
+
+    def get_map(self, segment, size):
+        value = self.maps.get(segment)
+        if value is None or len(value) < size:
+            # The segment has been appended to since it was mapped.
+            if value is not None:
+                value.close()
+            try:
+                with open(self.get_segment_path(segment), 'rb') as f:
+                    value = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (IOError, OSError, ValueError):
+                self.maps.pop(segment, None)
+                return None
+            self.maps[segment] = value
+        return value
+
+    def read(self, segment, offset, length):
+        value = self.get_map(segment, offset + length)
+        if value is None or len(value) < offset + length:
+            return None
+        return value[offset:offset + length]
+
+    def append(self, values):
+        segment = int(time() // self.segment_period)
+
+        locations = []
+        with open(self.get_segment_path(segment), 'ab') as f:
+            # Several processes can append to the same segment, the lock
+            # guarantees the offsets we record are the ones we wrote to.
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                for id, data in values:
+                    value = self.encode(data)
+                    f.write(value)
+                    locations.append((id, segment, offset, len(value)))
+                    offset += len(value)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        with self.index:
+            self.index.executemany(
+                'INSERT OR REPLACE INTO nodes (id, segment, offset, length) '
+                'VALUES (?, ?, ?, ?)',
+                locations,
+            )
+
+    def delete(self, id):
+        self.delete_multi([id])
+
+    def delete_multi(self, id_list):
+        with self.index:
+            for i in range(0, len(id_list), MAX_QUERY_PARAMS):
+                chunk = id_list[i:i + MAX_QUERY_PARAMS]
+                self.index.execute(
+                    'DELETE FROM nodes WHERE id IN ({})'.format(', '.join('?' * len(chunk))),
+                    chunk,
+                )
+
+    def get(self, id):
+        return self.get_multi([id])[id]
+
+    def get_multi(self, id_list):
+        id_list = list(id_list)
+        results = dict.fromkeys(id_list)
+        for i in range(0, len(id_list), MAX_QUERY_PARAMS):
+            chunk = id_list[i:i + MAX_QUERY_PARAMS]
+            rows = self.index.execute(
+                'SELECT id, segment, offset, length FROM nodes WHERE id IN ({})'.format(
+                    ', '.join('?' * len(chunk)),
+                ),
+                chunk,
+            ).fetchall()
+            for id, segment, offset, length in rows:
+                value = self.read(segment, offset, length)
+                if value is not None:
+                    results[id] = self.decode(value)
+        return results
+
+    def set(self, id, data):
+        self.append([(id, data)])
+
+    def set_multi(self, values):
+        self.append(values.items())
+
+    def cleanup(self, cutoff_timestamp):
+        cutoff = int(to_timestamp(cutoff_timestamp) // self.segment_period)
+        deleted = 0
+        for segment in sorted(self.get_segments()):
+            if segment >= cutoff:
+                continue
+
+            with self.index:
+                deleted += self.index.execute(
+                    'DELETE FROM nodes WHERE segment = ?', (segment, ),
+                ).rowcount
+
+            value = self.maps.pop(segment, None)
+            if value is not None:
+                value.close()
+
+            try:
+                os.unlink(self.get_segment_path(segment))
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+        return deleted
@@ -0,0 +1,154 @@
+"""
+sentry.nodestore.tiered.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import six
+
+from time import time
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import metrics, redis
+from sentry.utils.dates import to_timestamp
+from sentry.utils.imports import import_string
+
+
+def load_backend(backend, options):
+    if isinstance(backend, six.string_types):
+        backend = import_string(backend)
+    return backend(**(options or {}))
+
+
+class TieredNodeStorage(NodeStorage):
+    """
+    A backend which writes nodes to a hot tier and moves them to a cold tier
+    once they are ``migrate_after`` seconds old, reading from the hot tier
+    first.
+
+    The time each node was written is kept in a Redis sorted set, which
+    ``migrate`` (run periodically by ``sentry.tasks.nodestore.migrate_nodes``)
+    consumes in batches of ``batch_size`` nodes. Backends which append
+    batches to compressed files, such as the segment backend, are well
+    suited as the cold tier.
+
+    >>> TieredNodeStorage(
+    >>>     hot='sentry.nodestore.riak.backend.RiakNodeStorage',
+    >>>     hot_options={'nodes': [{'host': '127.0.0.1', 'port': 8098}]},
+    >>>     cold='sentry.nodestore.segment.backend.SegmentNodeStorage',
+    >>>     cold_options={'path': '/var/lib/sentry/nodestore'},
+    >>>     migrate_after=60 * 60 * 24 * 3,
+    >>> )
+    """
+
+    def __init__(self, hot, cold, hot_options=None, cold_options=None, cluster='default',
+                 migrate_after=60 * 60 * 24 * 3, batch_size=1000, **kwargs):
+        self.hot = load_backend(hot, hot_options)
+        self.cold = load_backend(cold, cold_options)
+        self.cluster = redis.clusters.get(cluster)
+        self.migrate_after = migrate_after
+        self.batch_size = batch_size
+        self.key = 'nodestore:tiered'
+        super(TieredNodeStorage, self).__init__(**kwargs)
+
+    def get(self, id):
+        return self.get_multi([id]).get(id)
+
+    def get_multi(self, id_list):
+        id_list = list(id_list)
+        results = self.hot.get_multi(id_list)
+
+        missing = [id for id in id_list if results.get(id) is None]
+        if missing:
+            metrics.incr('nodestore.tiered.cold_reads', amount=len(missing))
+            results.update(self.cold.get_multi(missing))
+        return results
+
+    def set(self, id, data):
+        self.set_multi({id: data})
+
+    def set_multi(self, values):
+        self.hot.set_multi(values)
+        now = time()
+        with self.cluster.map() as client:
+            for id in values:
+                client.zadd(self.key, now, id)
+
+    def delete(self, id):
+        self.delete_multi([id])
+
+    def delete_multi(self, id_list):
+        self.hot.delete_multi(id_list)
+        self.cold.delete_multi(id_list)
+        with self.cluster.map() as client:
+            client.zrem(self.key, *id_list)
+
+    def get_backlog(self):
+        """
+        Returns the number of nodes in the hot tier, and how many of them
+        are due to be migrated.
+        """
+        cutoff = time() - self.migrate_after
+        with self.cluster.map() as client:
+            total = client.zcard(self.key)
+            pending = client.zcount(self.key, '-inf', cutoff)
+        return {
+            'hot': total.value,
+            'pending': pending.value,
+        }
+
+    def migrate(self, limit=None):
+        """
+        Moves nodes which are due from the hot tier to the cold tier in
+        batches, until none are left or ``limit`` nodes have been moved, and
+        returns the number of nodes moved.
+        """
+        cutoff = time() - self.migrate_after
+        migrated = 0
+        while limit is None or migrated < limit:
+            count = self.batch_size
+            if limit is not None:
+                count = min(count, limit - migrated)
+
+            with self.cluster.map() as client:
+                result = client.zrangebyscore(self.key, '-inf', cutoff, start=0, num=count)
+            id_list = list(result.value)
+            if not id_list:
+                break
+
+            results = self.hot.get_multi(id_list)
+            values = dict((id, data) for id, data in six.iteritems(results) if data is not None)
+            if values:
+                self.cold.set_multi(values)
+
+            # Only nodes which were written to the cold tier, or which are
+            # known to be missing from the hot tier, are removed. Any others
+            # stay queued and are retried by a later run.
+            done = list(values) + [id for id, data in six.iteritems(results) if data is None]
+            if not done:
+                break
+            self.hot.delete_multi(done)
+            with self.cluster.map() as client:
+                client.zrem(self.key, *done)
+
+            migrated += len(values)
+            metrics.incr('nodestore.tiered.migrated', amount=len(values))
+
+        return migrated
+
+    def cleanup(self, cutoff_timestamp):
+        with self.cluster.map() as client:
+            client.zremrangebyscore(self.key, '-inf', to_timestamp(cutoff_timestamp))
+
+        deleted = None
+        for backend in (self.hot, self.cold):
+            try:
+                result = backend.cleanup(cutoff_timestamp)
+            except NotImplementedError:
+                continue
+            if result is not None:
+                deleted = (deleted or 0) + result
+        return deleted
@@ -88,6 +88,9 @@ register(
 )
 
 register('api.rate-limit.org-create', default=5, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
+# Maximum staleness (in seconds) of cached issue stream responses, 0 disables
+# the cache.
+register('api.stream-cache.ttl', default=0, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
 
 # Beacon
 
@@ -10,6 +10,7 @@ from __future__ import absolute_import
 import six
 
 from django.conf import settings
+from time import time
 
 from sentry import options
 from sentry.utils.services import Service
@@ -38,6 +39,45 @@ class RateLimited(RateLimit):
         super(RateLimited, self).__init__(True, **kwargs)
 
 
+class QuotaConfigCache(object):
+    """
+    An in-process cache of compiled quota configuration.
+
+    Entries expire after ``ttl`` seconds. All entries are also discarded when
+    a model which affects quota configuration is changed in this process (see
+    ``sentry.receivers.quotas``), while changes made by other processes are
+    picked up once the entries expire.
+    """
+    generation = 0
+
+    def __init__(self, ttl=10, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.values = {}
+
+    @classmethod
+    def invalidate_all(cls):
+        cls.generation += 1
+
+    def get(self, key, callback):
+        now = time()
+        value = self.values.get(key)
+        if value is not None:
+            expires, generation, result = value
+            if expires > now and generation == self.generation:
+                return result
+
+        # Read the generation first, so that a change made while the
+        # configuration is being compiled still invalidates the result.
+        generation = self.generation
+        result = callback()
+        if self.ttl:
+            if len(self.values) >= self.max_size:
+                self.values.clear()
+            self.values[key] = (now + self.ttl, generation, result)
+        return result
+
+
 class Quota(Service):
     """
     Quotas handle tracking a project's event usage (at a per minute tick) and
@@ -46,7 +86,7 @@ class Quota(Service):
     """
     __all__ = (
         'get_maximum_quota', 'get_organization_quota', 'get_project_quota', 'is_rate_limited',
-        'translate_quota', 'validate',
+        'is_rate_limited_multi', 'translate_quota', 'validate',
     )
 
     def __init__(self, **options):
@@ -55,6 +95,14 @@ class Quota(Service):
     def is_rate_limited(self, project, key=None):
         return NotRateLimited()
 
+    def is_rate_limited_multi(self, items):
+        """
+        Checks a batch of items, each given as a ``(project, key)`` pair, as
+        if ``is_rate_limited`` was called for each of them in order. Returns
+        a list of ``RateLimit`` instances in the same order.
+        """
+        return [self.is_rate_limited(project, key=key) for project, key in items]
+
     def get_time_remaining(self):
         return 0
 
@@ -10,13 +10,18 @@ from __future__ import absolute_import
 import functools
 import six
 
+from threading import Lock
 from time import time
 
+from sentry import options
 from sentry.exceptions import InvalidConfiguration
-from sentry.quotas.base import NotRateLimited, Quota, RateLimited
+from sentry.quotas.base import NotRateLimited, Quota, QuotaConfigCache, RateLimited
+from sentry.utils import metrics
 from sentry.utils.redis import get_cluster_from_options, load_script
 
 is_rate_limited = load_script('quotas/is_rate_limited.lua')
+is_rate_limited_multi = load_script('quotas/is_rate_limited_multi.lua')
+lease = load_script('quotas/lease.lua')
 
 
 class BasicRedisQuota(object):
@@ -34,6 +39,73 @@ class BasicRedisQuota(object):
         self.enforce = enforce
 
 
+def get_quota_signature(quota):
+    return (quota.key, quota.limit, quota.window)
+
+
+class LocalQuotaState(object):
+    """
+    Process local quota state, which allows answering quota checks without a
+    trip to Redis:
+
+    - Once an enforced quota has rejected an item, it keeps rejecting items
+      until its current period ends, so exhausted quotas are remembered
+      until then.
+    - Items can be leased from the quotas of a project (and key), and are
+      then accepted locally until the lease runs out or its period ends.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.exhausted = {}
+        self.leases = {}
+        self.lock = Lock()
+
+    def get_exhausted(self, quotas, timestamp):
+        """
+        Returns a ``(quota, until)`` pair for the quota which is known to be
+        exhausted for the longest time, or ``None``.
+        """
+        result = None
+        for quota in quotas:
+            until = self.exhausted.get(get_quota_signature(quota))
+            if until is not None and until > timestamp and (result is None or until > result[1]):
+                result = (quota, until)
+        return result
+
+    def set_exhausted(self, quota, until, timestamp):
+        with self.lock:
+            if len(self.exhausted) >= self.max_size:
+                for key, value in list(self.exhausted.items()):
+                    if value <= timestamp:
+                        del self.exhausted[key]
+                if len(self.exhausted) >= self.max_size:
+                    self.exhausted.clear()
+            self.exhausted[get_quota_signature(quota)] = until
+
+    def consume_lease(self, key, timestamp):
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is None:
+                return False
+            expires, remaining = lease
+            if expires <= timestamp or remaining < 1:
+                del self.leases[key]
+                return False
+            lease[1] = remaining - 1
+            return True
+
+    def set_lease(self, key, count, expires, timestamp):
+        with self.lock:
+            if len(self.leases) >= self.max_size:
+                for lease_key, (lease_expires, _) in list(self.leases.items()):
+                    if lease_expires <= timestamp:
+                        del self.leases[lease_key]
+                if len(self.leases) >= self.max_size:
+                    self.leases.clear()
+            self.leases[key] = [expires, count]
+
+
 class RedisQuota(Quota):
     #: The ``grace`` period allows accomodating for clock drift in TTL
     #: calculation since the clock on the Redis instance used to store quota
@@ -42,6 +114,14 @@ class RedisQuota(Quota):
 
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_QUOTA_OPTIONS', options)
+        self.config_cache = QuotaConfigCache(ttl=options.pop('config_cache_ttl', 10))
+        #: The fraction of the smallest limit of the quotas of an item that
+        #: may be leased by this process at once. Leased items that are not
+        #: used before the end of a period are lost, so each process may
+        #: accept up to this fraction of a limit fewer items than it allows.
+        #: Zero disables leases.
+        self.lease_fraction = options.pop('lease_fraction', 0)
+        self.local_state = LocalQuotaState()
         super(RedisQuota, self).__init__(**options)
         self.namespace = 'quota'
 
@@ -126,34 +206,40 @@ class RedisQuota(Quota):
             results,
         )
 
-    def is_rate_limited(self, project, key=None, timestamp=None):
-        if timestamp is None:
-            timestamp = time()
+    def get_compiled_quotas(self, project, key=None):
+        """
+        Returns the quotas that need to be checked for an item, which are
+        cached in process (see ``QuotaConfigCache``.)
 
-        quotas = [
-            quota for quota in self.get_quotas(project, key=key)
-            # x = (key, limit, interval)
-            if quota.limit > 0  # a zero limit means "no limit", not "reject all"
-        ]
+        The system rate limit is part of the cache key, so changes to it apply
+        immediately. Changes to the ``projects:rate-limits`` feature are picked
+        up once the cached quotas expire.
+        """
+        return self.config_cache.get(
+            (project.id, key.id if key else None, options.get('system.rate-limit')),
+            lambda: tuple(
+                quota for quota in self.get_quotas(project, key=key)
+                if quota.limit > 0  # a zero limit means "no limit", not "reject all"
+            ),
+        )
 
-        # If there are no quotas to actually check, skip the trip to the database.
-        if not quotas:
-            return NotRateLimited()
+    def __get_next_period_start(self, timestamp, interval, shift):
+        """Return the timestamp when the next rate limit period begins for an interval."""
+        return (((timestamp - shift) // interval) + 1) * interval + shift
 
-        def get_next_period_start(interval, shift):
-            """Return the timestamp when the next rate limit period begins for an interval."""
-            return (((timestamp - shift) // interval) + 1) * interval + shift
+    def __get_local_rate_limit(self, quotas, timestamp):
+        exhausted = self.local_state.get_exhausted(quotas, timestamp)
+        if exhausted is None:
+            return None
 
-        keys = []
-        args = []
-        for quota in quotas:
-            shift = project.organization_id % quota.window
-            keys.append(self.__get_redis_key(quota.key, timestamp, quota.window, shift))
-            expiry = get_next_period_start(quota.window, shift) + self.grace
-            args.extend((quota.limit, int(expiry)))
+        quota, until = exhausted
+        metrics.incr('quotas.local', tags={'result': 'rejected'})
+        return RateLimited(
+            retry_after=until - timestamp,
+            reason_code=quota.reason_code,
+        )
 
-        client = self.cluster.get_local_client_for_key(six.text_type(project.organization.pk))
-        rejections = is_rate_limited(client, keys, args)
+    def __get_rate_limit(self, organization_id, quotas, rejections, timestamp):
         if any(rejections):
             enforce = False
             worst_case = (0, None)
@@ -162,8 +248,10 @@ class RedisQuota(Quota):
                     continue
                 if quota.enforce:
                     enforce = True
-                    shift = project.organization_id % quota.window
-                    delay = get_next_period_start(quota.window, shift) - timestamp
+                    shift = organization_id % quota.window
+                    until = self.__get_next_period_start(timestamp, quota.window, shift)
+                    self.local_state.set_exhausted(quota, until, timestamp)
+                    delay = until - timestamp
                     if delay > worst_case[0]:
                         worst_case = (delay, quota.reason_code)
             if enforce:
@@ -172,3 +260,98 @@ class RedisQuota(Quota):
                     reason_code=worst_case[1],
                 )
         return NotRateLimited()
+
+    def is_rate_limited(self, project, key=None, timestamp=None):
+        if timestamp is None:
+            timestamp = time()
+
+        quotas = self.get_compiled_quotas(project, key=key)
+
+        # If there are no quotas to actually check, skip the trip to the database.
+        if not quotas:
+            return NotRateLimited()
+
+        lease_size = int(min(quota.limit for quota in quotas) * self.lease_fraction)
+        if lease_size > 1:
+            lease_key = (
+                project.id,
+                key.id if key else None,
+                tuple(map(get_quota_signature, quotas)),
+            )
+            if self.local_state.consume_lease(lease_key, timestamp):
+                metrics.incr('quotas.local', tags={'result': 'leased'})
+                return NotRateLimited()
+
+        rate_limit = self.__get_local_rate_limit(quotas, timestamp)
+        if rate_limit is not None:
+            return rate_limit
+
+        keys = []
+        args = []
+        lease_expires = None
+        for quota in quotas:
+            shift = project.organization_id % quota.window
+            keys.append(self.__get_redis_key(quota.key, timestamp, quota.window, shift))
+            period_end = self.__get_next_period_start(timestamp, quota.window, shift)
+            args.extend((quota.limit, int(period_end + self.grace)))
+            if lease_expires is None or period_end < lease_expires:
+                lease_expires = period_end
+
+        client = self.cluster.get_local_client_for_key(six.text_type(project.organization_id))
+        if lease_size > 1:
+            result = lease(client, keys, args + [lease_size])
+            granted, rejections = int(result[0]), result[1:]
+            if granted > 1:
+                self.local_state.set_lease(lease_key, granted - 1, lease_expires, timestamp)
+        else:
+            rejections = is_rate_limited(client, keys, args)
+        return self.__get_rate_limit(project.organization_id, quotas, rejections, timestamp)
+
+    def is_rate_limited_multi(self, items, timestamp=None):
+        """
+        Checks a batch of items, each given as a ``(project, key)`` pair, as
+        if ``is_rate_limited`` was called for each of them in order. The
+        items of each organization are checked with a single script call.
+        """
+        if timestamp is None:
+            timestamp = time()
+
+        results = [None] * len(items)
+
+        batches = {}
+        for position, (project, key) in enumerate(items):
+            quotas = self.get_compiled_quotas(project, key=key)
+            if not quotas:
+                results[position] = NotRateLimited()
+                continue
+            rate_limit = self.__get_local_rate_limit(quotas, timestamp)
+            if rate_limit is not None:
+                results[position] = rate_limit
+                continue
+            batches.setdefault(project.organization_id, []).append((position, quotas))
+
+        for organization_id, batch in six.iteritems(batches):
+            keys = []
+            args = []
+            indices = {}
+            items_args = []
+            for _, quotas in batch:
+                items_args.append(len(quotas))
+                for quota in quotas:
+                    shift = organization_id % quota.window
+                    redis_key = self.__get_redis_key(quota.key, timestamp, quota.window, shift)
+                    if redis_key not in indices:
+                        keys.append(redis_key)
+                        expiry = self.__get_next_period_start(
+                            timestamp, quota.window, shift) + self.grace
+                        args.extend((quota.limit, int(expiry)))
+                        indices[redis_key] = len(keys)
+                    items_args.append(indices[redis_key])
+
+            client = self.cluster.get_local_client_for_key(six.text_type(organization_id))
+            rejections = is_rate_limited_multi(client, keys, args + items_args)
+            for (position, quotas), item_rejections in zip(batch, rejections):
+                results[position] = self.__get_rate_limit(
+                    organization_id, quotas, item_rejections, timestamp)
+
+        return results
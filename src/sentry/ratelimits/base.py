@@ -4,9 +4,17 @@ from sentry.utils.services import Service
 
 
 class RateLimiter(Service):
-    __all__ = ('is_limited', 'validate')
+    __all__ = ('is_limited', 'is_limited_multi', 'validate')
 
     window = 60
 
     def is_limited(self, key, limit, project=None, window=None):
         return False
+
+    def is_limited_multi(self, requests):
+        """
+        Checks a batch of rate limits, each given as a dictionary of keyword
+        arguments to ``is_limited``, and returns a list of the results in the
+        same order.
+        """
+        return [self.is_limited(**request) for request in requests]
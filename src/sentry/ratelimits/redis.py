@@ -2,19 +2,35 @@ from __future__ import absolute_import
 
 import six
 
+from collections import defaultdict
 from time import time
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.base import RateLimiter
 from sentry.utils.hashlib import md5_text
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+gcra = load_script('ratelimits/gcra.lua')
 
 
 class RedisRateLimiter(RateLimiter):
+    """
+    Rate limits are counted in fixed windows by default, which allows up to
+    twice the limit in a period that spans the start of a window. With the
+    ``gcra`` algorithm, requests are instead limited in every period of the
+    window's length, at the cost of running a script for each check.
+    """
     window = 60
 
+    algorithms = frozenset(['fixed', 'gcra'])
+
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_RATELIMITER_OPTIONS', options)
+        self.algorithm = options.pop('algorithm', 'fixed')
+        if self.algorithm not in self.algorithms:
+            raise InvalidConfiguration(
+                'Unknown rate limiting algorithm: {!r}'.format(self.algorithm)
+            )
 
     def validate(self):
         try:
@@ -23,20 +39,73 @@ class RedisRateLimiter(RateLimiter):
         except Exception as e:
             raise InvalidConfiguration(six.text_type(e))
 
-    def is_limited(self, key, limit, project=None, window=None):
-        if window is None:
-            window = self.window
-
+    def __get_key(self, key, project, window, timestamp):
         key_hex = md5_text(key).hexdigest()
-        bucket = int(time() / window)
+
+        if self.algorithm == 'gcra':
+            if project:
+                return 'rl:g:%s:%s' % (key_hex, project.id)
+            return 'rl:g:%s' % (key_hex, )
+
+        bucket = int(timestamp / window)
 
         if project:
-            key = 'rl:%s:%s:%s' % (key_hex, project.id, bucket)
-        else:
-            key = 'rl:%s:%s' % (key_hex, bucket)
+            return 'rl:%s:%s:%s' % (key_hex, project.id, bucket)
+        return 'rl:%s:%s' % (key_hex, bucket)
+
+    def is_limited(self, key, limit, project=None, window=None):
+        return self.is_limited_multi([{
+            'key': key,
+            'limit': limit,
+            'project': project,
+            'window': window,
+        }])[0]
+
+    def is_limited_multi(self, requests):
+        """
+        Checks a batch of rate limits, each given as a dictionary of keyword
+        arguments to ``is_limited``, with a single round trip to each host.
+        """
+        timestamp = time()
+
+        checks = []
+        for request in requests:
+            window = request.get('window') or self.window
+            checks.append((
+                self.__get_key(request['key'], request.get('project'), window, timestamp),
+                request['limit'],
+                window,
+            ))
+
+        if self.algorithm == 'gcra':
+            return self.__check_gcra(checks, timestamp)
 
         with self.cluster.map() as client:
-            result = client.incr(key)
-            client.expire(key, window)
+            results = []
+            for key, limit, window in checks:
+                results.append((client.incr(key), limit))
+                client.expire(key, window)
+
+        return [result.value > limit for result, limit in results]
+
+    def __check_gcra(self, checks, timestamp):
+        router = self.cluster.get_router()
+
+        hosts = defaultdict(list)
+        for position, (key, _, _) in enumerate(checks):
+            hosts[router.get_host_for_key(key)].append(position)
+
+        results = [None] * len(checks)
+        for host, positions in six.iteritems(hosts):
+            keys = []
+            args = [timestamp]
+            for position in positions:
+                key, limit, window = checks[position]
+                keys.append(key)
+                args.extend((limit, window))
+
+            limited = gcra(self.cluster.get_local_client(host), keys, args)
+            for position, value in zip(positions, limited):
+                results[position] = bool(value)
 
-        return result.value > limit
+        return results
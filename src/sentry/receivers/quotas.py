@@ -0,0 +1,20 @@
+from __future__ import absolute_import
+
+from django.db.models.signals import post_delete, post_save
+
+from sentry.models import Organization, OrganizationOption, Project, ProjectKey
+from sentry.quotas.base import QuotaConfigCache
+
+
+def invalidate_quota_config(**kwargs):
+    QuotaConfigCache.invalidate_all()
+
+
+for signal in (post_save, post_delete):
+    for model in (Organization, OrganizationOption, Project, ProjectKey):
+        signal.connect(
+            invalidate_quota_config,
+            sender=model,
+            dispatch_uid='sentry.quotas.invalidate_{}'.format(model.__name__.lower()),
+            weak=False,
+        )
@@ -1,8 +1,10 @@
 from __future__ import absolute_import
 
-from sentry import features as feature_flags
+import random
+
+from sentry import features as feature_flags, similarity
 from sentry.signals import event_processed
-from sentry.similarity import features as similarity_features
+from sentry.utils import metrics
 
 
 @event_processed.connect(weak=False)
@@ -10,4 +12,13 @@ def record(project, group, event, **kwargs):
     if not feature_flags.has('projects:similarity-indexing', project):
         return
 
-    similarity_features.record([event])
+    # Allows shedding indexing work for projects with many events.
+    sample_rate = project.get_option('sentry:similarity_sample_rate', 1.0)
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        metrics.incr('similarity.record.sampled', tags={'project_id': project.id})
+        return
+
+    if similarity.index_queue is None:
+        similarity.features.record([event])
+    else:
+        similarity.index_queue.add(event)
@@ -0,0 +1,78 @@
+from __future__ import absolute_import
+
+from django.db.models.signals import post_delete, post_save
+
+from sentry.api.stream_cache import bump_generation, is_enabled
+from sentry.models import (
+    Group, GroupAssignee, GroupBookmark, GroupResolution, GroupSeen, GroupSnooze,
+    GroupSubscription
+)
+from sentry.signals import buffer_incr_complete, regression_signal
+
+
+def invalidate_group(instance, **kwargs):
+    bump_generation(instance.project_id)
+
+
+def invalidate_group_relation(instance, **kwargs):
+    if not is_enabled():
+        return
+
+    project_id = getattr(instance, 'project_id', None)
+    if project_id is None:
+        try:
+            project_id = Group.objects.get_from_cache(id=instance.group_id).project_id
+        except Group.DoesNotExist:
+            return
+    bump_generation(project_id)
+
+
+def invalidate_buffered_group(filters, **kwargs):
+    if not is_enabled():
+        return
+
+    # Group increments are buffered with the project as part of the filters,
+    # but increments buffered before that was the case may still be pending.
+    project_id = filters.get('project_id')
+    if project_id is None:
+        group_id = filters.get('pk', filters.get('id'))
+        if group_id is None:
+            return
+        try:
+            project_id = Group.objects.get_from_cache(id=group_id).project_id
+        except Group.DoesNotExist:
+            return
+    bump_generation(project_id)
+
+
+for signal in (post_save, post_delete):
+    signal.connect(
+        invalidate_group,
+        sender=Group,
+        dispatch_uid='sentry.stream_cache.invalidate_group',
+        weak=False,
+    )
+
+    for model in (
+        GroupAssignee, GroupBookmark, GroupResolution, GroupSeen, GroupSnooze, GroupSubscription
+    ):
+        signal.connect(
+            invalidate_group_relation,
+            sender=model,
+            dispatch_uid='sentry.stream_cache.invalidate_{}'.format(model.__name__.lower()),
+            weak=False,
+        )
+
+regression_signal.connect(
+    invalidate_group,
+    sender=Group,
+    dispatch_uid='sentry.stream_cache.invalidate_regression',
+    weak=False,
+)
+
+buffer_incr_complete.connect(
+    invalidate_buffered_group,
+    sender=Group,
+    dispatch_uid='sentry.stream_cache.invalidate_buffered_group',
+    weak=False,
+)
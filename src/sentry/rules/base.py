@@ -114,3 +114,6 @@ class EventState(object):
         self.is_new = is_new
         self.is_regression = is_regression
         self.is_sample = is_sample,
+        # Results of queries that are shared by conditions evaluated for the
+        # same event (see ``BaseEventFrequencyCondition.get_rate``.)
+        self.query_results = {}
@@ -57,7 +57,7 @@ class BaseEventFrequencyCondition(EventCondition):
         if not interval:
             return False
 
-        current_value = self.get_rate(event, interval)
+        current_value = self.get_rate(event, interval, state)
 
         return current_value > value
 
@@ -66,14 +66,24 @@ class BaseEventFrequencyCondition(EventCondition):
         """
         raise NotImplementedError  # subclass must implement
 
-    def get_rate(self, event, interval):
+    def get_rate(self, event, interval, state=None):
+        # Rules often check the same frequency for an event with different
+        # thresholds, so the results are shared through the event state.
+        cache_key = (type(self), event.group_id, interval)
+        results = getattr(state, 'query_results', None)
+        if results is not None and cache_key in results:
+            return results[cache_key]
+
         _, duration = intervals[interval]
         end = timezone.now()
-        return self.query(
+        rate = self.query(
             event,
             end - duration,
             end,
         )
+        if results is not None:
+            results[cache_key] = rate
+        return rate
 
 
 class EventFrequencyCondition(BaseEventFrequencyCondition):
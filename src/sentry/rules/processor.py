@@ -3,15 +3,89 @@ from __future__ import absolute_import
 import logging
 
 from collections import defaultdict, namedtuple
+from copy import deepcopy
 from datetime import timedelta
 from django.utils import timezone
 
 from sentry.models import GroupRuleStatus, Rule
 from sentry.rules import EventState, rules
+from sentry.rules.conditions.event_frequency import BaseEventFrequencyCondition
 from sentry.utils.safe import safe_execute
 
+logger = logging.getLogger('sentry.rules')
+
 RuleFuture = namedtuple('RuleFuture', ['rule', 'kwargs'])
 
+RulePlan = namedtuple('RulePlan', ['rule', 'match', 'frequency', 'conditions'])
+
+
+def compile_rule(project, rule):
+    """
+    Instantiates the conditions of a rule, so that they can be reused for
+    every event of the project. Returns ``None`` for rules without any
+    conditions, which are never applied.
+    """
+    condition_list = rule.data.get('conditions', ())
+
+    # XXX(dcramer): if theres no condition should we really skip it,
+    # or should we just apply it blindly?
+    if not condition_list:
+        return None
+
+    conditions = []
+    for condition in condition_list:
+        condition_cls = rules.get(condition['id'])
+        if condition_cls is None:
+            logger.warn('Unregistered condition %r', condition['id'])
+            # Unregistered conditions never pass.
+            conditions.append(None)
+            continue
+        conditions.append(condition_cls(project, data=condition, rule=rule))
+
+    # Conditions don't have side effects, so the ones that need to query
+    # TSDB are evaluated last, when they can't be skipped by short circuiting.
+    conditions.sort(key=lambda condition: isinstance(condition, BaseEventFrequencyCondition))
+
+    return RulePlan(
+        rule=rule,
+        match=rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH,
+        frequency=rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY,
+        conditions=conditions,
+    )
+
+
+class RulePlanCache(object):
+    """
+    An in-process cache of the compiled rules of each project.
+
+    Compiled rules are only reused while the rules they were compiled from
+    have the same IDs and data, so the cache doesn't return rules that are
+    more stale than the ones it is given.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.values = {}
+
+    def get(self, project, rules):
+        signature = [(rule.id, rule.data) for rule in rules]
+        value = self.values.get(project.id)
+        if value is not None and value[0] == signature:
+            plans = value[1]
+        else:
+            plans = [plan for plan in (compile_rule(project, rule) for rule in rules) if plan]
+            if len(self.values) >= self.max_size:
+                self.values.clear()
+            # Rule data is copied, since the instances may be changed later.
+            self.values[project.id] = (deepcopy(signature), plans)
+
+        # Cached plans refer to the instances they were compiled from.
+        rules_by_id = {rule.id: rule for rule in rules}
+        return [plan._replace(rule=rules_by_id[plan.rule.id]) for plan in plans]
+
+
+plan_cache = RulePlanCache()
+
 
 # TODO(dcramer): come up with a clean way to kill this either by renaming
 # the Event.message attribute or updating all plugins (former is better)
@@ -51,25 +125,36 @@ class RuleProcessor(object):
     def get_rules(self):
         return Rule.get_for_project(self.project.id)
 
-    def get_rule_status(self, rule):
-        rule_status, _ = GroupRuleStatus.objects.get_or_create(
-            rule=rule,
-            group=self.group,
-            defaults={
-                'project': self.project,
-            },
-        )
-
-        return rule_status
+    def get_plans(self):
+        return plan_cache.get(self.project, self.get_rules())
 
-    def condition_matches(self, condition, state, rule):
-        condition_cls = rules.get(condition['id'])
-        if condition_cls is None:
-            self.logger.warn('Unregistered condition %r', condition['id'])
+    def get_rule_statuses(self, rules):
+        statuses = {
+            status.rule_id: status
+            for status in GroupRuleStatus.objects.filter(
+                group=self.group,
+                rule__in=[rule.id for rule in rules],
+            )
+        }
+
+        # Statuses are only missing the first time a rule is applied to a
+        # group, so there is no need to create them in bulk.
+        for rule in rules:
+            if rule.id not in statuses:
+                statuses[rule.id], _ = GroupRuleStatus.objects.get_or_create(
+                    rule=rule,
+                    group=self.group,
+                    defaults={
+                        'project': self.project,
+                    },
+                )
+
+        return statuses
+
+    def condition_matches(self, condition, state):
+        if condition is None:
             return
-
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
-        return safe_execute(condition_inst.passes, self.event, state, _with_transaction=False)
+        return safe_execute(condition.passes, self.event, state, _with_transaction=False)
 
     def get_state(self):
         return EventState(
@@ -78,27 +163,17 @@ class RuleProcessor(object):
             is_sample=self.is_sample,
         )
 
-    def apply_rule(self, rule):
-        match = rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH
-        condition_list = rule.data.get('conditions', ())
-        frequency = rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY
-
-        # XXX(dcramer): if theres no condition should we really skip it,
-        # or should we just apply it blindly?
-        if not condition_list:
-            return
-
-        status = self.get_rule_status(rule)
+    def apply_rule(self, plan, status, state):
+        rule = plan.rule
+        match = plan.match
 
         now = timezone.now()
-        freq_offset = now - timedelta(minutes=frequency)
+        freq_offset = now - timedelta(minutes=plan.frequency)
 
         if status.last_active and status.last_active > freq_offset:
             return
 
-        state = self.get_state()
-
-        condition_iter = (self.condition_matches(c, state, rule) for c in condition_list)
+        condition_iter = (self.condition_matches(c, state) for c in plan.conditions)
 
         if match == 'all':
             passed = all(condition_iter)
@@ -140,6 +215,16 @@ class RuleProcessor(object):
 
     def apply(self):
         self.futures_by_cb = defaultdict(list)
-        for rule in self.get_rules():
-            self.apply_rule(rule)
+
+        plans = self.get_plans()
+        if not plans:
+            return []
+
+        statuses = self.get_rule_statuses([plan.rule for plan in plans])
+
+        # The state is shared by all rules, so that conditions can reuse the
+        # results of queries made for the same event.
+        state = self.get_state()
+        for plan in plans:
+            self.apply_rule(plan, statuses[plan.rule.id], state)
         return list(self.futures_by_cb.items())
@@ -46,6 +46,13 @@ def get_project(value):
 @click.option(
     '--silent', '-q', default=False, is_flag=True, help='Run quietly. No output on success.'
 )
+@click.option(
+    '--pause',
+    type=float,
+    default=0,
+    show_default=True,
+    help='Seconds to wait between bulk delete chunks, to limit replication lag.'
+)
 @click.option('--model', '-m', multiple=True)
 @click.option('--router', '-r', default=None, help='Database router')
 @click.option(
@@ -57,7 +64,7 @@ def get_project(value):
 )
 @log_options()
 @configuration
-def cleanup(days, project, concurrency, silent, model, router, timed):
+def cleanup(days, project, concurrency, pause, silent, model, router, timed):
     """Delete a portion of trailing data based on creation date.
 
     All data that is older than `--days` will be deleted.  The default for
@@ -70,6 +77,7 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
         click.echo('Error: Minimum concurrency is 1', err=True)
         raise click.Abort()
 
+    import time
     from threading import Thread
     from django.db import router as db_router
     from sentry.app import nodestore
@@ -77,12 +85,24 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
     from sentry import deletions
     from sentry import models
     from sentry import similarity
+    from sentry.utils import metrics
 
     if timed:
-        import time
-        from sentry.utils import metrics
         start_time = time.time()
 
+    def report(name, deleted, started):
+        duration = time.time() - started
+        metrics.timing('cleanup.model.duration', duration, tags={'model': name})
+        if deleted is None:
+            return
+        metrics.incr('cleanup.model.deleted', amount=deleted, tags={'model': name})
+        if not silent:
+            click.echo(
+                '>> Removed {} {} in {:.1f} second(s) ({:.0f}/s)'.format(
+                    deleted, name, duration, deleted / max(duration, 0.001),
+                )
+            )
+
     # list of models which this query is restricted to
     model_list = {m.lower() for m in model}
 
@@ -142,13 +162,16 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
     else:
         if not silent:
             click.echo("Removing old NodeStore values")
+
+        cutoff = timezone.now() - timedelta(days=days)
+        started = time.time()
+        try:
+            deleted = nodestore.cleanup(cutoff)
+        except NotImplementedError:
+            click.echo(
+                "NodeStore backend does not support cleanup operation", err=True)
         else:
-            cutoff = timezone.now() - timedelta(days=days)
-            try:
-                nodestore.cleanup(cutoff)
-            except NotImplementedError:
-                click.echo(
-                    "NodeStore backend does not support cleanup operation", err=True)
+            report('NodeStore', deleted, started)
 
     for model, dtfield, order_by in BULK_QUERY_DELETES:
         if not silent:
@@ -163,13 +186,15 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
-            BulkDeleteQuery(
+            started = time.time()
+            deleted = BulkDeleteQuery(
                 model=model,
                 dtfield=dtfield,
                 days=days,
                 project_id=project_id,
                 order_by=order_by,
-            ).execute()
+            ).execute(pause=pause)
+            report(model.__name__, deleted, started)
 
     for model, dtfield, order_by in DELETES:
         if not silent:
@@ -244,13 +269,15 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
         if not silent:
             click.echo('>> Skipping EventMapping')
     else:
-        BulkDeleteQuery(
+        started = time.time()
+        deleted = BulkDeleteQuery(
             model=models.EventMapping,
             dtfield='date_added',
             days=min(days, 7),
             project_id=project_id,
             order_by='-date_added'
-        ).execute()
+        ).execute(pause=pause)
+        report(models.EventMapping.__name__, deleted, started)
 
     # Clean up FileBlob instances which are no longer used and aren't super
     # recent (as there could be a race between blob creation and reference)
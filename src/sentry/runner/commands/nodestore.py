@@ -0,0 +1,147 @@
+from __future__ import absolute_import, print_function
+
+import click
+from sentry.runner.decorators import configuration
+
+
+@click.group()
+def nodestore():
+    "Manage node storage."
+
+
+@nodestore.command('train-dictionary')
+@click.option('--samples', default=5000, show_default=True,
+              help='Number of recent events to sample.')
+@click.option('--size', default=112640, show_default=True,
+              help='Maximum size of each dictionary in bytes.')
+@click.option('--min-samples', default=100, show_default=True,
+              help='Skip SDKs with fewer sampled events than this.')
+@click.option('--sdk', 'sdks', multiple=True,
+              help='Only train dictionaries for these SDKs.')
+@click.option('--output', type=click.Path(file_okay=False, writable=True),
+              help='Directory to write dictionaries to. Defaults to the configured '
+              'dictionary directory.')
+@configuration
+def train_dictionary(samples, size, min_samples, sdks, output):
+    "Train zstd compression dictionaries from recent events."
+    from collections import defaultdict
+    from time import time
+
+    from django.conf import settings
+
+    from sentry.models import Event
+    from sentry.nodestore import codecs
+    from sentry.utils import json
+
+    if not codecs.HAS_ZSTD:
+        raise click.ClickException('The zstandard package is not installed.')
+
+    output = output or settings.SENTRY_NODESTORE_CODEC_OPTIONS.get('dictionaries') or \
+        settings.SENTRY_NODESTORE_DICTIONARIES
+    if not output:
+        raise click.ClickException('No output directory given or configured.')
+
+    events = list(Event.objects.order_by('-id')[:samples])
+    Event.objects.bind_nodes(events, 'data')
+
+    payloads = defaultdict(list)
+    for event in events:
+        data = event.data.data
+        key = codecs.get_dictionary_key(data)
+        if key is None or (sdks and key not in sdks):
+            continue
+        payloads[key].append(data)
+
+    legacy = codecs.CompressedPickleCodec()
+    store = codecs.DictionaryStore(output)
+
+    for key, items in sorted(payloads.items()):
+        if len(items) < min_samples:
+            click.echo('%s: skipped, only %d samples' % (key, len(items)))
+            continue
+
+        # Train on all but a holdout, which is used to compare the results.
+        holdout = items[::10]
+        training = [json.dumps(d) for i, d in enumerate(items) if i % 10]
+        dictionary = codecs.zstandard.train_dictionary(size, training)
+        path = store.save(key, dictionary)
+
+        codec = codecs.ZstdCodec(dictionaries=output)
+        stats = []
+        for c in (legacy, codec):
+            encoded = [c.encode(d) for d in holdout]
+            start = time()
+            for value in encoded:
+                c.decode(value)
+            stats.append((sum(len(v) for v in encoded), (time() - start) * 1000 / len(encoded)))
+
+        (legacy_size, legacy_time), (zstd_size, zstd_time) = stats
+        click.echo(
+            '%s: wrote %s (%d samples), %d -> %d bytes (%.1f%%), '
+            'decode %.3fms -> %.3fms' % (
+                key, path, len(training), legacy_size, zstd_size,
+                100.0 * zstd_size / max(legacy_size, 1), legacy_time, zstd_time,
+            )
+        )
+
+
+@nodestore.command()
+@configuration
+def backlog():
+    "Show how many nodes are waiting to move to the cold tier."
+    from sentry.app import nodestore
+
+    if not hasattr(nodestore, 'get_backlog'):
+        raise click.ClickException('The configured nodestore backend is not tiered.')
+
+    result = nodestore.get_backlog()
+    click.echo('Nodes in hot tier: %d' % result['hot'])
+    click.echo('Nodes due for migration: %d' % result['pending'])
+
+
+@nodestore.command()
+@click.option('--limit', type=int, help='Maximum number of nodes to move.')
+@configuration
+def migrate(limit):
+    "Move nodes which are due from the hot tier to the cold tier."
+    from sentry.app import nodestore
+
+    if not hasattr(nodestore, 'migrate'):
+        raise click.ClickException('The configured nodestore backend is not tiered.')
+
+    click.echo('Moved %d nodes.' % nodestore.migrate(limit=limit))
+
+
+@nodestore.command()
+@click.option('--keys', 'key_counts', type=int, multiple=True, default=(1000, 10000),
+              show_default=True, help='Number of nodes to write and read per run.')
+@click.option('--size', default=4096, show_default=True,
+              help='Approximate size of each node in bytes.')
+@configuration
+def benchmark(key_counts, size):
+    "Measure set_multi and get_multi throughput of the configured backend."
+    from time import time
+    from uuid import uuid4
+
+    from sentry.app import nodestore
+
+    for count in key_counts:
+        values = dict(
+            (nodestore.generate_id(), {'index': i, 'payload': uuid4().hex * (size // 32)})
+            for i in range(count)
+        )
+        id_list = list(values)
+
+        timings = []
+        for func, args in ((nodestore.set_multi, values), (nodestore.get_multi, id_list),
+                           (nodestore.delete_multi, id_list)):
+            start = time()
+            func(args)
+            timings.append(time() - start)
+
+        click.echo(
+            '%d keys: set_multi %.0f keys/s, get_multi %.0f keys/s, '
+            'delete_multi %.0f keys/s' % ((count, ) + tuple(
+                count / max(t, 1e-6) for t in timings
+            ))
+        )
@@ -106,13 +106,19 @@ local function zrange_scored_iterator(result)
     end
 end
 
-local function zrange_move_slice(source, destination, threshold, callback)
+local function zrange_move_slice(source, destination, threshold, limit, callback)
     local callback = callback
     if callback == nil then
         callback = noop
     end
 
-    local keys = redis.call('ZRANGEBYSCORE', source, 0, threshold, 'WITHSCORES')
+    -- A negative limit moves all items below the threshold.
+    local keys = nil
+    if limit < 0 then
+        keys = redis.call('ZRANGEBYSCORE', source, 0, threshold, 'WITHSCORES')
+    else
+        keys = redis.call('ZRANGEBYSCORE', source, 0, threshold, 'WITHSCORES', 'LIMIT', 0, limit)
+    end
     if #keys == 0 then
         return
     end
@@ -164,13 +170,14 @@ end
 
 -- Timeline and Schedule Operations
 
-local function schedule(configuration, deadline)
+local function schedule(configuration, deadline, limit)
     local response = {}
     local i = 0
     zrange_move_slice(
         configuration:get_schedule_waiting_key(),
         configuration:get_schedule_ready_key(),
         deadline,
+        limit,
         function (timeline_id, timestamp)
             i = i + 1
             response[i] = {timeline_id, timestamp}
@@ -179,12 +186,18 @@ local function schedule(configuration, deadline)
     return response
 end
 
-local function maintenance(configuration, deadline)
+local function maintenance(configuration, deadline, limit)
+    local n = 0
     zrange_move_slice(
         configuration:get_schedule_ready_key(),
         configuration:get_schedule_waiting_key(),
-        deadline
+        deadline,
+        limit,
+        function ()
+            n = n + 1
+        end
     )
+    return n
 end
 
 local function add_timeline_to_schedule(configuration, timeline_id, timestamp, increment, maximum)
@@ -294,19 +307,9 @@ local function digest_timeline(configuration, timeline_id, timeline_capacity)
         redis.call('EXPIRE', digest_key, configuration.ttl)
     end
 
-    local results = {}
-    local records = redis.call('ZREVRANGE', digest_key, 0, -1, 'WITHSCORES')
-    local i = 0
-    for key, score in zrange_scored_iterator(records) do
-        i = i + 1
-        results[i] = {
-            key,
-            redis.call('GET', configuration:get_timeline_record_key(timeline_id, key)),
-            score
-        }
-    end
-
-    return results
+    -- The record values are not returned here (they are fetched by the
+    -- client afterwards) to keep the time spent running this script short.
+    return redis.call('ZREVRANGE', digest_key, 0, -1, 'WITHSCORES')
 end
 
 local function close_digest(configuration, timeline_id, delay_minimum, record_ids)
@@ -385,18 +388,20 @@ end)
 
 local commands = {
     SCHEDULE = function (cursor, arguments)
-        local cursor, configuration, deadline = multiple_argument_parser(
+        local cursor, configuration, deadline, limit = multiple_argument_parser(
             configuration_argument_parser,
+            argument_parser(tonumber),
             argument_parser(tonumber)
         )(cursor, arguments)
-        return schedule(configuration, deadline)
+        return schedule(configuration, deadline, limit)
     end,
     MAINTENANCE = function (cursor, arguments)
-        local cursor, configuration, deadline = multiple_argument_parser(
+        local cursor, configuration, deadline, limit = multiple_argument_parser(
             configuration_argument_parser,
+            argument_parser(tonumber),
             argument_parser(tonumber)
         )(cursor, arguments)
-        return maintenance(configuration, deadline)
+        return maintenance(configuration, deadline, limit)
     end,
     ADD = function (cursor, arguments)
         local cursor, configuration, arguments = multiple_argument_parser(
@@ -0,0 +1,67 @@
+-- Check a batch of items against a collection of quota counters, with the
+-- same result as checking each item in turn with ``is_rate_limited.lua``.
+-- Values provided as ``KEYS`` specify the keys of the counters to check. The
+-- first ``#KEYS * 2`` values provided as ``ARGV`` specify the maximum value
+-- (quota limit) and expiration time for each key, and are followed by one
+-- entry for each item: the number of quotas that apply to the item, followed
+-- by the (1-based) indices of the keys of those quotas.
+--
+-- For example, to check two items against a quota ``foo`` that has a limit
+-- of 10 items and expires at the Unix timestamp ``100``, where the second
+-- item is also checked against a quota ``bar`` that has a limit of 20 items
+-- and should expire at the Unix timestamp ``100``, the ``KEYS`` and ``ARGV``
+-- values would be as follows:
+--
+--   KEYS = {"foo", "bar"}
+--   ARGV = {10, 100, 20, 100, 1, 1, 2, 1, 2}
+--
+-- An item is accepted (and the counters of all of its quotas are incremented)
+-- only if all of its checks pass, taking into account the items that were
+-- accepted before it. The result is a Lua table/array (Redis multi bulk reply)
+-- with an entry for each item, which specifies whether or not the item was
+-- *rejected* based on the limit of each of its quotas.
+assert(#ARGV >= #KEYS * 2, "incorrect number of keys and arguments provided")
+
+local counts = {}
+local increments = {}
+for i=1,#KEYS do
+    counts[i] = tonumber(redis.call('GET', KEYS[i]) or 0)
+    increments[i] = 0
+end
+
+local results = {}
+local position = (#KEYS * 2) + 1
+while position <= #ARGV do
+    local n = tonumber(ARGV[position])
+    local rejections = {}
+    local failed = false
+    for j=1,n do
+        local i = tonumber(ARGV[position + j])
+        local limit = tonumber(ARGV[(i * 2) - 1])
+        local rejected = counts[i] + 1 > limit
+        if rejected then
+            failed = true
+        end
+        rejections[j] = rejected
+    end
+
+    if not failed then
+        for j=1,n do
+            local i = tonumber(ARGV[position + j])
+            counts[i] = counts[i] + 1
+            increments[i] = increments[i] + 1
+        end
+    end
+
+    results[#results + 1] = rejections
+    position = position + n + 1
+end
+
+for i=1,#KEYS do
+    if increments[i] > 0 then
+        redis.call('INCRBY', KEYS[i], increments[i])
+        redis.call('EXPIREAT', KEYS[i], ARGV[i * 2])
+    end
+end
+
+return results
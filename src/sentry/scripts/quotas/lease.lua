@@ -0,0 +1,42 @@
+-- Lease a number of items from a collection of quota counters, so that they
+-- can be accepted without checking the counters for each item. Values
+-- provided as ``KEYS`` specify the keys of the counters to check, and values
+-- provided as ``ARGV`` specify the maximum value (quota limit) and expiration
+-- time for each key, followed by the number of items requested.
+--
+-- For example, to lease 5 items from a quota ``foo`` that has a limit of 10
+-- items and expires at the Unix timestamp ``100``, as well as a quota ``bar``
+-- that has a limit of 20 items and should expire at the Unix timestamp
+-- ``100``, the ``KEYS`` and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo", "bar"}
+--   ARGV = {10, 100, 20, 100, 5}
+--
+-- If all quotas have room for at least one more item, as many of the
+-- requested items as all quotas have room for are granted, and the counters
+-- for all quotas are incremented by that number. The result is a Lua
+-- table/array (Redis multi bulk reply) containing the number of items
+-- granted, followed by whether or not a single item would have been
+-- *rejected* based on the limit of each quota (as in ``is_rate_limited.lua``.)
+assert(#KEYS * 2 + 1 == #ARGV, "incorrect number of keys and arguments provided")
+
+local granted = tonumber(ARGV[#ARGV])
+local results = {0}
+for i=1,#KEYS do
+    local limit = tonumber(ARGV[(i * 2) - 1])
+    local available = limit - tonumber(redis.call('GET', KEYS[i]) or 0)
+    if available < granted then
+        granted = math.max(available, 0)
+    end
+    results[i + 1] = available < 1
+end
+
+if granted > 0 then
+    for i=1,#KEYS do
+        redis.call('INCRBY', KEYS[i], granted)
+        redis.call('EXPIREAT', KEYS[i], ARGV[i * 2])
+    end
+    results[1] = granted
+end
+
+return results
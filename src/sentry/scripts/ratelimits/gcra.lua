@@ -0,0 +1,47 @@
+-- Check a collection of rate limits with the generic cell rate algorithm
+-- (GCRA), which allows at most ``limit`` requests in any period of ``window``
+-- seconds (rather than in fixed windows, which allow up to twice that around
+-- the start of a window.) Each key stores the theoretical arrival time of the
+-- next request for the rate limit.
+--
+-- Values provided as ``KEYS`` specify the keys of the rate limits to check.
+-- The first value provided as ``ARGV`` is the current Unix timestamp, which
+-- is followed by the limit and window (in seconds) for each key.
+--
+-- For example, to check a rate limit ``foo`` of 10 requests per minute and a
+-- rate limit ``bar`` of 100 requests per hour at the Unix timestamp ``100``,
+-- the ``KEYS`` and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo", "bar"}
+--   ARGV = {100, 10, 60, 100, 3600}
+--
+-- Keys are checked in order, and the same key may be checked more than once.
+-- The result is a Lua table/array (Redis multi bulk reply) that specifies
+-- whether or not the request was *limited* by each rate limit.
+assert(#KEYS * 2 + 1 == #ARGV, "incorrect number of keys and arguments provided")
+
+local now = tonumber(ARGV[1])
+
+local results = {}
+for i=1,#KEYS do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[(i * 2) + 1])
+    local limited = true
+    if limit > 0 then
+        local tat = math.max(tonumber(redis.call('GET', KEYS[i]) or now), now)
+        local next_tat = tat + (window / limit)
+        if next_tat - now <= window then
+            limited = false
+            redis.call(
+                'SET',
+                KEYS[i],
+                string.format('%.6f', next_tat),
+                'EX',
+                math.ceil(next_tat - now)
+            )
+        end
+    end
+    results[i] = limited
+end
+
+return results
@@ -0,0 +1,11 @@
+-- Returns and removes the members of the sorted set at KEYS[1] with a score
+-- of at most ARGV[1]. Members which are added (or have their score updated)
+-- after this point remain in the set.
+local key = KEYS[1]
+local cutoff = ARGV[1]
+
+local members = redis.call('ZRANGEBYSCORE', key, '-inf', cutoff)
+if #members > 0 then
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', cutoff)
+end
+return members
@@ -0,0 +1,8 @@
+-- Returns and removes all of the values of the list at KEYS[1].
+local key = KEYS[1]
+
+local values = redis.call('LRANGE', key, 0, -1)
+if #values > 0 then
+    redis.call('DEL', key)
+end
+return values
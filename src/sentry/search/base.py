@@ -15,11 +15,17 @@ EMPTY = object()
 
 
 class SearchBackend(Service):
-    __all__ = ('query', 'validate')
+    __all__ = ('query', 'index_event', 'validate')
 
     def __init__(self, **options):
         pass
 
+    def index_event(self, event):
+        """
+        Called for every event saved to a group, allowing the backend to
+        maintain its own indexes.
+        """
+
     def query(
         self,
         project,
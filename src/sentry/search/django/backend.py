@@ -12,16 +12,62 @@ from django.db import router
 from django.db.models import Q
 
 from sentry import tagstore
-from sentry.api.paginator import DateTimePaginator, Paginator
+from sentry.api.paginator import (
+    DateTimeKeysetPaginator, DateTimePaginator, KeysetPaginator, Paginator
+)
 from sentry.search.base import EMPTY, SearchBackend
 from sentry.search.django.constants import (
     MSSQL_ENGINES, MSSQL_SORT_CLAUSES, MYSQL_SORT_CLAUSES, ORACLE_SORT_CLAUSES, SORT_CLAUSES,
-    SQLITE_SORT_CLAUSES
+    SQLITE_SORT_CLAUSES, TRIGRAM_MIN_LENGTH, TRIGRAM_WHERE_CLAUSE
 )
+from sentry.search.django.index import ActiveGroupIndex
+from sentry.utils import redis
 from sentry.utils.db import get_db_engine
 
 
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
 class DjangoSearchBackend(SearchBackend):
+    def __init__(self, full_text=False, active_groups_cluster=None,
+                 active_groups_retention=90, active_groups_limit=1000, **options):
+        # When ``full_text`` is enabled on Postgres, free text queries are
+        # matched with ILIKE so they can be answered by the trigram indexes
+        # on ``message`` and ``culprit`` instead of a sequential scan.
+        self.full_text = full_text
+
+        # When ``active_groups_cluster`` is set, event date range queries are
+        # answered from an index of active groups per day stored in that
+        # Redis cluster instead of from the ``Event`` table. Ranges which
+        # hold more than ``active_groups_limit`` groups are still answered
+        # from the ``Event`` table, rather than by filtering on an unbounded
+        # list of IDs, as are ranges which start before the index was
+        # enabled or outside of ``active_groups_retention``.
+        self.active_groups_limit = active_groups_limit
+        if active_groups_cluster is not None:
+            self.active_groups = ActiveGroupIndex(
+                redis.clusters.get(active_groups_cluster),
+                retention=active_groups_retention,
+            )
+        else:
+            self.active_groups = None
+
+        super(DjangoSearchBackend, self).__init__(**options)
+
+    def index_event(self, event):
+        if self.active_groups is not None:
+            self.active_groups.record(event.project_id, event.group_id, event.datetime)
+
+    def _filter_text(self, queryset, query, engine):
+        if self.full_text and 'postgres' in engine and len(query) >= TRIGRAM_MIN_LENGTH:
+            pattern = u'%{}%'.format(escape_like(query))
+            return queryset.extra(
+                where=[TRIGRAM_WHERE_CLAUSE],
+                params=[pattern, pattern],
+            )
+        return queryset.filter(Q(message__icontains=query) | Q(culprit__icontains=query))
+
     def _build_queryset(
         self,
         project,
@@ -65,12 +111,7 @@ class DjangoSearchBackend(SearchBackend):
         queryset = Group.objects.filter(project=project)
 
         if query:
-            # TODO(dcramer): if we want to continue to support search on SQL
-            # we should at least optimize this in Postgres so that it does
-            # the query filter **after** the index filters, and restricts the
-            # result set
-            queryset = queryset.filter(
-                Q(message__icontains=query) | Q(culprit__icontains=query))
+            queryset = self._filter_text(queryset, query, engine)
 
         if status is None:
             status_in = (
@@ -181,7 +222,38 @@ class DjangoSearchBackend(SearchBackend):
                     params['times_seen__lt'] = times_seen_upper
             queryset = queryset.filter(**params)
 
-        if date_from or date_to:
+        active_group_ids = None
+        if (date_from or date_to) and self.active_groups is not None:
+            active_group_ids = self.active_groups.get_group_ids(
+                project.id,
+                date_from,
+                date_to,
+                limit=self.active_groups_limit,
+            )
+
+        if active_group_ids is not None:
+            group_ids = active_group_ids
+            if not group_ids:
+                return queryset.none()
+            queryset = queryset.filter(id__in=group_ids)
+
+            # The day buckets are coarser than the requested range, but a
+            # group cannot have had events in the range unless it was last
+            # seen after its start and first seen before its end.
+            params = {}
+            if date_from:
+                if date_from_inclusive:
+                    params['last_seen__gte'] = date_from
+                else:
+                    params['last_seen__gt'] = date_from
+            if date_to:
+                if date_to_inclusive:
+                    params['first_seen__lte'] = date_to
+                else:
+                    params['first_seen__lt'] = date_to
+            queryset = queryset.filter(**params)
+
+        elif date_from or date_to:
             params = {
                 'project_id': project.id,
             }
@@ -237,6 +309,12 @@ class DjangoSearchBackend(SearchBackend):
     def query(self, project, count_hits=False, paginator_options=None, **kwargs):
         if paginator_options is None:
             paginator_options = {}
+        else:
+            paginator_options = paginator_options.copy()
+
+        # ``keyset`` selects (sort value, id) cursors instead of value and
+        # offset cursors, see ``KeysetPaginator``.
+        keyset = paginator_options.pop('keyset', False)
 
         queryset = self._build_queryset(project=project, **kwargs)
 
@@ -261,6 +339,14 @@ class DjangoSearchBackend(SearchBackend):
             paginator_cls = Paginator
             sort_clause = '-sort_value'
 
+        if keyset:
+            if paginator_cls is DateTimePaginator:
+                paginator_cls = DateTimeKeysetPaginator
+            else:
+                paginator_cls = KeysetPaginator
+        else:
+            paginator_options.pop('approximate_hits', None)
+
         queryset = queryset.order_by(sort_clause)
         paginator = paginator_cls(queryset, sort_clause, **paginator_options)
         return paginator.get_result(limit, cursor, count_hits=count_hits)
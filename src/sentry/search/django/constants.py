@@ -51,3 +51,11 @@ MSSQL_SORT_CLAUSES.update(
     }
 )
 MSSQL_ENGINES = set(['django_pytds', 'sqlserver_ado', 'sql_server.pyodbc'])
+
+# pg_trgm can only use an index for patterns which contain at least one
+# complete trigram.
+TRIGRAM_MIN_LENGTH = 3
+
+TRIGRAM_WHERE_CLAUSE = (
+    "(sentry_groupedmessage.message ILIKE %s OR sentry_groupedmessage.view ILIKE %s)"
+)
@@ -0,0 +1,99 @@
+"""
+sentry.search.django.index
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import pytz
+
+from datetime import datetime
+from time import time
+
+from sentry.utils.dates import to_timestamp
+
+DAY = 60 * 60 * 24
+
+
+def to_utc_timestamp(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.utc)
+    return to_timestamp(value)
+
+
+def to_day(value):
+    return int(to_utc_timestamp(value) // DAY)
+
+
+class ActiveGroupIndex(object):
+    """
+    Records which groups received events on each (UTC) day for a project.
+
+    Each day bucket is a Redis set of group IDs which expires once the
+    bucket is older than ``retention`` days, so a date range can be resolved
+    to the union of the buckets it overlaps without scanning any events.
+    Buckets are only as precise as a day: a group active on the first or
+    last day of a range may not have been active within the range itself.
+
+    The time of the first event recorded for a project is kept as well,
+    as buckets for earlier days are missing the events which were received
+    before the index was enabled.
+    """
+
+    def __init__(self, cluster, retention=90):
+        self.cluster = cluster
+        self.retention = retention
+
+    def make_key(self, project_id, day):
+        return 'search:ag:{}:{}'.format(project_id, day)
+
+    def make_since_key(self, project_id):
+        return 'search:ag:{}:since'.format(project_id)
+
+    def record(self, project_id, group_id, timestamp):
+        day = to_day(timestamp)
+        key = self.make_key(project_id, day)
+        with self.cluster.map() as client:
+            client.setnx(self.make_since_key(project_id), int(time()))
+            client.sadd(key, group_id)
+            client.expireat(key, (day + 1 + self.retention) * DAY)
+
+    def get_group_ids(self, project_id, start=None, end=None, limit=None):
+        """
+        Returns the IDs of the groups that were active on any day between
+        ``start`` and ``end``, or ``None`` if the index can't answer that
+        range: when it starts before the project's first recorded event or
+        before the retention period (which includes ranges without a
+        ``start``), or when the buckets for those days hold more than
+        ``limit`` IDs (the sizes of the buckets are checked before any
+        members are fetched, so a group active on several days counts more
+        than once.)
+        """
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        if start is None or to_day(start) < to_day(now) - self.retention:
+            return None
+        if end is None:
+            end = now
+
+        days = range(to_day(start), to_day(end) + 1)
+        keys = [self.make_key(project_id, day) for day in days]
+
+        with self.cluster.map() as client:
+            since = client.get(self.make_since_key(project_id))
+            if limit is not None:
+                sizes = [client.scard(key) for key in keys]
+
+        if since.value is None or to_utc_timestamp(start) < int(since.value):
+            return None
+        if limit is not None and sum(size.value for size in sizes) > limit:
+            return None
+
+        with self.cluster.map() as client:
+            results = [client.smembers(key) for key in keys]
+
+        group_ids = set()
+        for result in results:
+            group_ids.update(int(group_id) for group_id in result.value)
+        return group_ids
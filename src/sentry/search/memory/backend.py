@@ -0,0 +1,335 @@
+"""
+sentry.search.memory.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+import math
+import threading
+
+from django.db.models.signals import post_delete, post_save
+from time import time
+
+from sentry.search.base import EMPTY
+from sentry.search.django.backend import DjangoSearchBackend
+from sentry.search.memory.index import GROUP_COLUMNS, ProjectIndex
+from sentry.signals import buffer_incr_complete
+from sentry.utils.cursors import build_cursor, Cursor, CursorResult
+
+logger = logging.getLogger('sentry.search.memory')
+
+# sort_by -> (index column, multiplier applied to build value and offset
+# cursors, multiplier applied to build keyset cursors.) The multipliers match
+# those used by the paginators in the Django backend (milliseconds for
+# ``DateTimePaginator``, microseconds for ``DateTimeKeysetPaginator``) so
+# cursors remain interchangeable between the two backends.
+SORT_COLUMNS = {
+    'date': ('last_seen', 1000, 1000000),
+    'new': ('first_seen', 1000, 1000000),
+    'priority': ('score', 1, 1),
+    'freq': ('times_seen', 1, 1),
+}
+
+MAX_HITS = 1000
+
+
+class MemorySearchBackend(DjangoSearchBackend):
+    """
+    Answers issue stream queries from per-project in-memory indexes.
+
+    An index is built from the database the first time a project is queried
+    and is then kept up to date from model signals and buffer flushes that
+    happen within this process. Writes made elsewhere (other workers, or
+    queryset updates which do not send signals) are picked up by rebuilding
+    an index once it is older than ``max_age`` seconds.
+
+    Free text and event date range queries cannot be answered from the index
+    and fall back to the database.
+    """
+    unsupported_filters = ('query', 'date_from', 'date_to')
+
+    def __init__(self, max_age=60, **options):
+        self.max_age = max_age
+        self.indexes = {}
+        self.lock = threading.Lock()
+        super(MemorySearchBackend, self).__init__(**options)
+
+        from sentry.models import Group, GroupAssignee, GroupBookmark, GroupSubscription
+
+        post_save.connect(self.handle_group_save, sender=Group)
+        post_delete.connect(self.handle_group_delete, sender=Group)
+        post_save.connect(self.handle_assignee_save, sender=GroupAssignee)
+        post_delete.connect(self.handle_assignee_delete, sender=GroupAssignee)
+        post_save.connect(self.handle_bookmark_save, sender=GroupBookmark)
+        post_delete.connect(self.handle_bookmark_delete, sender=GroupBookmark)
+        post_save.connect(self.handle_subscription_save, sender=GroupSubscription)
+        post_delete.connect(self.handle_subscription_delete, sender=GroupSubscription)
+        buffer_incr_complete.connect(self.handle_buffer_incr, sender=Group)
+
+    def get_index(self, project_id):
+        index = self.indexes.get(project_id)
+        if index is not None and index.created_at + self.max_age > time():
+            return index
+
+        # Build outside of the lock; signals received while building may be
+        # lost, but those changes are visible to the query doing the build.
+        index = ProjectIndex.build(project_id)
+        with self.lock:
+            self.indexes[project_id] = index
+        logger.debug('search.memory.index-built', extra={
+            'project_id': project_id,
+            'size': len(index),
+        })
+        return index
+
+    def handle_group_save(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.upsert_group(instance)
+
+    def handle_group_delete(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.remove(instance.id)
+
+    def handle_assignee_save(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.assignees[instance.group_id] = instance.user_id
+
+    def handle_assignee_delete(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.assignees.pop(instance.group_id, None)
+
+    def handle_bookmark_save(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.bookmarks[instance.user_id].add(instance.group_id)
+
+    def handle_bookmark_delete(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.bookmarks[instance.user_id].discard(instance.group_id)
+
+    def handle_subscription_save(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is None:
+            return
+        with self.lock:
+            if instance.is_active:
+                index.subscriptions[instance.user_id].add(instance.group_id)
+            else:
+                index.subscriptions[instance.user_id].discard(instance.group_id)
+
+    def handle_subscription_delete(self, instance, **kwargs):
+        index = self.indexes.get(instance.project_id)
+        if index is not None:
+            with self.lock:
+                index.subscriptions[instance.user_id].discard(instance.group_id)
+
+    def handle_buffer_incr(self, filters, **kwargs):
+        from sentry.models import Group
+
+        group_id = filters.get('pk', filters.get('id'))
+        indexes = [i for i in self.indexes.values() if group_id in i]
+        if not indexes:
+            return
+
+        # The buffer applies its changes with an UPDATE, so the new values
+        # have to be read back.
+        values = Group.objects.filter(id=group_id).values_list(*GROUP_COLUMNS).first()
+        with self.lock:
+            for index in indexes:
+                if values is None:
+                    index.remove(group_id)
+                else:
+                    index.upsert(*values)
+
+    def query(self, project, count_hits=False, paginator_options=None, **kwargs):
+        if any(kwargs.get(name) for name in self.unsupported_filters):
+            return super(MemorySearchBackend, self).query(
+                project,
+                count_hits=count_hits,
+                paginator_options=paginator_options,
+                **kwargs
+            )
+
+        from sentry import tagstore
+        from sentry.models import GroupStatus, Release
+
+        if paginator_options is None:
+            paginator_options = {}
+
+        sort_by = kwargs.pop('sort_by', 'date')
+        limit = kwargs.pop('limit', 100)
+        cursor = kwargs.pop('cursor', None)
+        tags = kwargs.pop('tags', None)
+        first_release = kwargs.pop('first_release', None)
+        for name in self.unsupported_filters:
+            kwargs.pop(name, None)
+
+        for name in ('assigned_to', 'bookmarked_by', 'subscribed_by'):
+            if kwargs.get(name) is not None:
+                kwargs[name] = kwargs[name].id
+
+        group_ids = None
+        if tags:
+            group_ids = tagstore.get_tags_for_search_filter(project.id, tags)
+            if not group_ids:
+                return self.paginate([], limit, cursor, count_hits, **paginator_options)
+
+        if first_release:
+            if first_release is EMPTY:
+                return self.paginate([], limit, cursor, count_hits, **paginator_options)
+            kwargs['first_release_id'] = Release.objects.filter(
+                organization_id=project.organization_id,
+                version=first_release,
+            ).values_list('id', flat=True).first() or 0
+
+        index = self.get_index(project.id)
+        column, multiplier, keyset_multiplier = SORT_COLUMNS[sort_by]
+        with self.lock:
+            rows = index.filter(
+                group_ids=group_ids,
+                exclude_status=(
+                    GroupStatus.PENDING_DELETION, GroupStatus.DELETION_IN_PROGRESS,
+                    GroupStatus.PENDING_MERGE,
+                ),
+                **kwargs
+            )
+            values = getattr(index, column)
+            if paginator_options.get('keyset'):
+                # Keyset cursors hold exact integer keys, timestamps are
+                # rounded to recover microseconds lost to float precision.
+                items = [
+                    (int(round(values[row] * keyset_multiplier)), index.ids[row]) for row in rows
+                ]
+            else:
+                items = [(values[row] * multiplier, index.ids[row]) for row in rows]
+        return self.paginate(items, limit, cursor, count_hits, **paginator_options)
+
+    def paginate(self, items, limit, cursor, count_hits, max_limit=100, keyset=False,
+                 approximate_hits=False):
+        """
+        Paginates a list of ``(sort value, group id)`` pairs in descending
+        order, following the same cursor semantics as ``BasePaginator`` (or
+        ``KeysetPaginator`` when ``keyset`` is set.)
+
+        Counting hits in memory is cheap, so ``approximate_hits`` is ignored.
+        """
+        if keyset:
+            return self.paginate_keyset(items, limit, cursor, count_hits, max_limit)
+
+        from sentry.models import Group
+
+        if cursor is None:
+            cursor = Cursor(0, 0, 0)
+
+        limit = min(limit, max_limit)
+
+        if count_hits:
+            max_hits = MAX_HITS
+            hits = min(len(items), max_hits)
+        else:
+            hits = None
+            max_hits = None
+
+        if cursor.value:
+            if cursor.is_prev:
+                items = [i for i in items if i[0] >= cursor.value]
+            else:
+                items = [i for i in items if i[0] <= cursor.value]
+        items.sort(reverse=not cursor.is_prev)
+
+        offset = cursor.offset
+        if cursor.is_prev and cursor.value:
+            offset += 1
+
+        page = items[offset:offset + limit + 1]
+        if cursor.is_prev:
+            page.reverse()
+
+        keys = dict((group_id, value) for value, group_id in page)
+        group_map = Group.objects.in_bulk(list(keys))
+        results = [group_map[group_id] for _, group_id in page if group_id in group_map]
+
+        def get_item_key(item, for_prev=False):
+            value = keys[item.id]
+            return math.floor(value) if for_prev else math.ceil(value)
+
+        return build_cursor(
+            results=results,
+            limit=limit,
+            hits=hits,
+            max_hits=max_hits,
+            cursor=cursor,
+            is_desc=True,
+            key=get_item_key,
+        )
+
+    def paginate_keyset(self, items, limit, cursor, count_hits, max_limit=100):
+        """
+        Paginates a list of ``(sort key, group id)`` pairs in descending
+        order, with the same cursors as ``KeysetPaginator``: the cursor value
+        holds the key of the boundary row and the cursor offset its ID.
+        """
+        from sentry.models import Group
+
+        if cursor is None:
+            cursor = Cursor(0, 0, 0)
+
+        limit = min(limit, max_limit)
+
+        if count_hits:
+            max_hits = MAX_HITS
+            hits = min(len(items), max_hits)
+        else:
+            hits = None
+            max_hits = None
+
+        has_boundary = bool(cursor.value or cursor.offset)
+        if has_boundary:
+            boundary = (cursor.value, cursor.offset)
+            if cursor.is_prev:
+                items = [i for i in items if i > boundary]
+            else:
+                items = [i for i in items if i < boundary]
+        items.sort(reverse=not cursor.is_prev)
+
+        # The + 1 is needed to know if there is anything past this page.
+        page = items[:limit + 1]
+        has_more = len(page) > limit
+        page = page[:limit]
+        if cursor.is_prev:
+            page.reverse()
+            has_next, has_prev = has_boundary, has_more
+        else:
+            has_next, has_prev = has_more, has_boundary
+
+        if page:
+            next_cursor = Cursor(page[-1][0], page[-1][1], False, has_next)
+            prev_cursor = Cursor(page[0][0], page[0][1], True, has_prev)
+        else:
+            # Nothing past the boundary (yet), continue from the same place.
+            next_cursor = Cursor(cursor.value, cursor.offset, False, has_next)
+            prev_cursor = Cursor(cursor.value, cursor.offset, True, has_prev)
+
+        group_map = Group.objects.in_bulk([group_id for _, group_id in page])
+        return CursorResult(
+            results=[group_map[group_id] for _, group_id in page if group_id in group_map],
+            next=next_cursor,
+            prev=prev_cursor,
+            hits=hits,
+            max_hits=max_hits,
+        )
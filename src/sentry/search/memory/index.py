@@ -0,0 +1,244 @@
+"""
+sentry.search.memory.index
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import pytz
+
+from array import array
+from collections import defaultdict
+from time import time
+
+from sentry.utils.dates import to_timestamp
+
+# Rows are never removed from the columns (that would shift every position
+# in the index), instead they are marked with a status that never matches.
+REMOVED = -1
+
+NULL = float('nan')
+
+GROUP_COLUMNS = (
+    'id', 'status', 'first_seen', 'last_seen', 'active_at', 'times_seen', 'score',
+    'first_release_id',
+)
+
+
+def to_epoch(value):
+    if value is None:
+        return NULL
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.utc)
+    return to_timestamp(value)
+
+
+def make_range_check(column, lower, lower_inclusive, upper, upper_inclusive):
+    """
+    Returns a predicate for a row position which mirrors the SQL semantics of
+    the equivalent range filter (a ``NULL`` value never matches.)
+    """
+    checks = []
+    if lower is not None:
+        if lower_inclusive:
+            checks.append(lambda row: column[row] >= lower)
+        else:
+            checks.append(lambda row: column[row] > lower)
+    if upper is not None:
+        if upper_inclusive:
+            checks.append(lambda row: column[row] <= upper)
+        else:
+            checks.append(lambda row: column[row] < upper)
+    return checks
+
+
+class ProjectIndex(object):
+    """
+    A columnar, in-memory index of the groups which belong to a project.
+
+    Each attribute that can be filtered or sorted on is kept in its own
+    compact ``array``, and a group is addressed by its row position in those
+    arrays. Relations which are usually queried per user (bookmarks and
+    subscriptions) are stored as sets of group IDs keyed by user ID.
+    """
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        self.created_at = time()
+        self.rows = {}
+        self.ids = array('l')
+        self.status = array('l')
+        self.first_seen = array('d')
+        self.last_seen = array('d')
+        self.active_at = array('d')
+        self.times_seen = array('l')
+        self.score = array('l')
+        self.first_release_id = array('l')
+        self.assignees = {}
+        self.bookmarks = defaultdict(set)
+        self.subscriptions = defaultdict(set)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, group_id):
+        return group_id in self.rows
+
+    @classmethod
+    def build(cls, project_id):
+        from sentry.models import Group, GroupAssignee, GroupBookmark, GroupSubscription
+
+        index = cls(project_id)
+
+        for values in Group.objects.filter(
+            project_id=project_id,
+        ).values_list(*GROUP_COLUMNS).iterator():
+            index.upsert(*values)
+
+        index.assignees.update(
+            GroupAssignee.objects.filter(
+                project_id=project_id,
+            ).values_list('group_id', 'user_id')
+        )
+
+        for group_id, user_id in GroupBookmark.objects.filter(
+            project_id=project_id,
+        ).values_list('group_id', 'user_id'):
+            index.bookmarks[user_id].add(group_id)
+
+        for group_id, user_id in GroupSubscription.objects.filter(
+            project_id=project_id,
+            is_active=True,
+        ).values_list('group_id', 'user_id'):
+            index.subscriptions[user_id].add(group_id)
+
+        return index
+
+    def upsert(self, group_id, status, first_seen, last_seen, active_at, times_seen, score,
+               first_release_id):
+        values = (
+            (self.status, status),
+            (self.first_seen, to_epoch(first_seen)),
+            (self.last_seen, to_epoch(last_seen)),
+            (self.active_at, to_epoch(active_at)),
+            (self.times_seen, times_seen or 0),
+            (self.score, score or 0),
+            (self.first_release_id, first_release_id or 0),
+        )
+
+        row = self.rows.get(group_id)
+        if row is None:
+            self.rows[group_id] = len(self.ids)
+            self.ids.append(group_id)
+            for column, value in values:
+                column.append(value)
+        else:
+            for column, value in values:
+                column[row] = value
+
+    def upsert_group(self, group):
+        self.upsert(*[getattr(group, name) for name in GROUP_COLUMNS])
+
+    def remove(self, group_id):
+        row = self.rows.pop(group_id, None)
+        if row is not None:
+            self.status[row] = REMOVED
+        self.assignees.pop(group_id, None)
+
+    def filter(
+        self,
+        status=None,
+        exclude_status=(),
+        group_ids=None,
+        bookmarked_by=None,
+        assigned_to=None,
+        unassigned=None,
+        subscribed_by=None,
+        first_release_id=None,
+        age_from=None,
+        age_from_inclusive=True,
+        age_to=None,
+        age_to_inclusive=True,
+        last_seen_from=None,
+        last_seen_from_inclusive=True,
+        last_seen_to=None,
+        last_seen_to_inclusive=True,
+        active_at_from=None,
+        active_at_from_inclusive=True,
+        active_at_to=None,
+        active_at_to_inclusive=True,
+        times_seen=None,
+        times_seen_lower=None,
+        times_seen_lower_inclusive=True,
+        times_seen_upper=None,
+        times_seen_upper_inclusive=True,
+    ):
+        """
+        Returns the row positions of all groups matching the given filters.
+        """
+        # The most selective filters restrict the set of candidate rows up
+        # front, so that the remaining checks only visit those rows.
+        candidates = None
+        for restriction in (
+            group_ids,
+            self.bookmarks.get(bookmarked_by, ()) if bookmarked_by is not None else None,
+            self.subscriptions.get(subscribed_by, ()) if subscribed_by is not None else None,
+        ):
+            if restriction is None:
+                continue
+            restriction = set(restriction)
+            candidates = restriction if candidates is None else candidates & restriction
+
+        if candidates is None:
+            rows = range(len(self.ids))
+        else:
+            rows = sorted(self.rows[i] for i in candidates if i in self.rows)
+
+        status_column = self.status
+        checks = [lambda row: status_column[row] != REMOVED]
+
+        if status is None:
+            checks.append(lambda row: status_column[row] not in exclude_status)
+        else:
+            checks.append(lambda row: status_column[row] == status)
+
+        ids = self.ids
+        assignees = self.assignees
+        if assigned_to is not None:
+            checks.append(lambda row: assignees.get(ids[row]) == assigned_to)
+        elif unassigned in (True, False):
+            checks.append(lambda row: (ids[row] not in assignees) is unassigned)
+
+        if first_release_id is not None:
+            release_column = self.first_release_id
+            checks.append(lambda row: release_column[row] == first_release_id)
+
+        checks.extend(make_range_check(
+            self.first_seen,
+            to_epoch(age_from) if age_from else None, age_from_inclusive,
+            to_epoch(age_to) if age_to else None, age_to_inclusive,
+        ))
+        checks.extend(make_range_check(
+            self.last_seen,
+            to_epoch(last_seen_from) if last_seen_from else None, last_seen_from_inclusive,
+            to_epoch(last_seen_to) if last_seen_to else None, last_seen_to_inclusive,
+        ))
+        checks.extend(make_range_check(
+            self.active_at,
+            to_epoch(active_at_from) if active_at_from else None, active_at_from_inclusive,
+            to_epoch(active_at_to) if active_at_to else None, active_at_to_inclusive,
+        ))
+
+        if times_seen is not None:
+            times_seen_column = self.times_seen
+            checks.append(lambda row: times_seen_column[row] == times_seen)
+
+        checks.extend(make_range_check(
+            self.times_seen,
+            times_seen_lower, times_seen_lower_inclusive,
+            times_seen_upper, times_seen_upper_inclusive,
+        ))
+
+        return [row for row in rows if all(check(row) for check in checks)]
@@ -6,6 +6,7 @@ import logging
 from django.conf import settings
 
 from sentry.interfaces.stacktrace import Frame
+from sentry.similarity.backends.cache import ComparisonCacheWrapper
 from sentry.similarity.backends.dummy import DummyIndexBackend
 from sentry.similarity.backends.metrics import MetricsWrapper
 from sentry.similarity.backends.redis import RedisScriptMinHashIndexBackend
@@ -17,7 +18,10 @@ from sentry.similarity.features import (
     MessageFeature,
     get_application_chunks,
 )
-from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.similarity.queue import IndexQueue
+from sentry.similarity.signatures import (
+    HAS_NUMPY, MinHashSignatureBuilder, VectorizedMinHashSignatureBuilder
+)
 from sentry.utils import redis
 from sentry.utils.datastructures import BidirectionalMapping
 from sentry.utils.iterators import shingle
@@ -62,35 +66,60 @@ def get_frame_attributes(frame):
     return attributes
 
 
+def _make_signature_builder(columns, rows):
+    # The vectorized builder produces the same signatures, so it can be used
+    # with an existing index.
+    if HAS_NUMPY:
+        return VectorizedMinHashSignatureBuilder(columns, rows)
+    return MinHashSignatureBuilder(columns, rows)
+
+
+def _get_index_cluster():
+    cluster_id = getattr(
+        settings,
+        'SENTRY_SIMILARITY_INDEX_REDIS_CLUSTER',
+        'similarity',
+    )
+
+    try:
+        return redis.redis_clusters.get(cluster_id)
+    except KeyError:
+        return None
+
+
 def _make_index_backend(cluster=None):
     if not cluster:
-        cluster_id = getattr(
-            settings,
-            'SENTRY_SIMILARITY_INDEX_REDIS_CLUSTER',
-            'similarity',
-        )
-
-        try:
-            cluster = redis.redis_clusters.get(cluster_id)
-        except KeyError:
+        cluster = _get_index_cluster()
+        if cluster is None:
             index = DummyIndexBackend()
             logger.info('No redis cluster provided for similarity, using {!r}.'.format(index))
             return index
 
     return MetricsWrapper(
-        RedisScriptMinHashIndexBackend(
-            cluster,
-            'sim:1',
-            MinHashSignatureBuilder(16, 0xFFFF),
-            8,
-            60 * 60 * 24 * 30,
-            3,
-            5000,
+        ComparisonCacheWrapper(
+            RedisScriptMinHashIndexBackend(
+                cluster,
+                'sim:1',
+                _make_signature_builder(16, 0xFFFF),
+                8,
+                60 * 60 * 24 * 30,
+                3,
+                5000,
+            ),
         ),
         scope_tag_name='project_id',
     )
 
 
+def _make_index_queue(cluster=None):
+    if not cluster:
+        cluster = _get_index_cluster()
+        if cluster is None:
+            return None
+
+    return IndexQueue(cluster, 'sim:q:1')
+
+
 features = FeatureSet(
     _make_index_backend(),
     Encoder({
@@ -132,3 +161,5 @@ features = FeatureSet(
         FrameEncodingError,
     ),
 )
+
+index_queue = _make_index_queue()
@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+
+from time import time
+
+from django.core.cache import cache
+
+from sentry.similarity.backends.abstract import AbstractIndexBackend
+from sentry.utils import metrics
+from sentry.utils.hashlib import md5_text
+
+
+def _new_generation():
+    # If a counter is evicted it has to be recreated with a value that was
+    # never used before, or stale results would become valid again.
+    return int(time() * 1000)
+
+
+class ComparisonCacheWrapper(AbstractIndexBackend):
+    """\
+    Caches the results of ``compare`` for ``ttl`` seconds.
+
+    Every key (group) has a version, which is bumped whenever its entries are
+    changed by ``record``, ``merge``, ``delete`` or ``import_``. Cached results
+    are stored along with the versions of the compared key and of the keys in
+    the results, and are discarded when any of those have changed since. Keys
+    which become similar to the compared key without being part of its results
+    only appear once the cached results expire.
+
+    Every scope also has a generation, which is part of the cache key for
+    results and is bumped by ``flush`` to invalidate all results in the scope.
+    """
+
+    def __init__(self, backend, ttl=60 * 5, prefix='sim:c'):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def __get_generation_key(self, scope):
+        return '{}:g:{}'.format(self.prefix, scope)
+
+    def __get_version_key(self, scope, key):
+        return '{}:v:{}:{}'.format(self.prefix, scope, md5_text(key).hexdigest())
+
+    def __get_counters(self, counter_keys):
+        values = cache.get_many(counter_keys)
+        for counter_key in counter_keys:
+            if values.get(counter_key) is None:
+                value = _new_generation()
+                if not cache.add(counter_key, value, None):
+                    value = cache.get(counter_key) or value
+                values[counter_key] = value
+        return [values[counter_key] for counter_key in counter_keys]
+
+    def __bump_counters(self, counter_keys):
+        for counter_key in counter_keys:
+            try:
+                cache.incr(counter_key)
+            except ValueError:
+                cache.set(counter_key, _new_generation(), None)
+
+    def __get_versions(self, scope, keys):
+        return dict(zip(
+            keys,
+            self.__get_counters([self.__get_version_key(scope, key) for key in keys]),
+        ))
+
+    def __bump_versions(self, scope, keys):
+        self.__bump_counters([self.__get_version_key(scope, key) for key in set(keys)])
+
+    def classify(self, scope, items, limit=None, timestamp=None):
+        return self.backend.classify(scope, items, limit=limit, timestamp=timestamp)
+
+    def compare(self, scope, key, items, limit=None, timestamp=None):
+        if timestamp is not None:
+            # Results as of a specific time are not cached.
+            return self.backend.compare(scope, key, items, limit=limit, timestamp=timestamp)
+
+        generation, = self.__get_counters([self.__get_generation_key(scope)])
+        result_key = '{}:r:{}:{}'.format(
+            self.prefix,
+            generation,
+            md5_text(repr((scope, key, list(items), limit))).hexdigest(),
+        )
+        cached = cache.get(result_key)
+        if cached is not None:
+            versions, results = cached
+            if self.__get_versions(scope, list(versions)) == versions:
+                metrics.incr('similarity.compare.cache', tags={'result': 'hit'})
+                return results
+
+        metrics.incr('similarity.compare.cache', tags={'result': 'miss'})
+        # The version of the compared key is read before its entries, so that
+        # concurrent changes to it invalidate the results stored below.
+        versions = self.__get_versions(scope, [key])
+        results = self.backend.compare(scope, key, items, limit=limit)
+        versions.update(
+            self.__get_versions(
+                scope,
+                [other for other, _ in results if other not in versions],
+            )
+        )
+        cache.set(result_key, (versions, results), self.ttl)
+        return results
+
+    def record(self, scope, key, items, timestamp=None):
+        try:
+            return self.backend.record(scope, key, items, timestamp=timestamp)
+        finally:
+            self.__bump_versions(scope, [key])
+
+    def merge(self, scope, destination, items, timestamp=None):
+        try:
+            return self.backend.merge(scope, destination, items, timestamp=timestamp)
+        finally:
+            self.__bump_versions(scope, [destination] + [source for _, source in items])
+
+    def delete(self, scope, items, timestamp=None):
+        try:
+            return self.backend.delete(scope, items, timestamp=timestamp)
+        finally:
+            self.__bump_versions(scope, [key for _, key in items])
+
+    def scan(self, scope, indices, batch=1000, timestamp=None):
+        return self.backend.scan(scope, indices, batch=batch, timestamp=timestamp)
+
+    def flush(self, scope, indices, batch=1000, timestamp=None):
+        try:
+            return self.backend.flush(scope, indices, batch=batch, timestamp=timestamp)
+        finally:
+            self.__bump_counters([self.__get_generation_key(scope)])
+
+    def export(self, scope, items, timestamp=None):
+        return self.backend.export(scope, items, timestamp=timestamp)
+
+    def import_(self, scope, items, timestamp=None):
+        try:
+            return self.backend.import_(scope, items, timestamp=timestamp)
+        finally:
+            self.__bump_versions(scope, [key for _, key, _ in items])
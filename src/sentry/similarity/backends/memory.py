@@ -0,0 +1,396 @@
+from __future__ import absolute_import
+
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import six
+
+from sentry.similarity.backends.abstract import AbstractIndexBackend
+from sentry.similarity.backends.redis import band
+from sentry.utils.compat import pickle
+
+
+def scale_to_total(values):
+    total = float(sum(values.values()))
+    return {key: value / total for key, value in six.iteritems(values)}
+
+
+def get_manhattan_distance(target, other):
+    return sum(
+        abs(target.get(key, 0) - other.get(key, 0))
+        for key in set(target) | set(other)
+    )
+
+
+def calculate_similarity(item_frequencies, candidate_frequencies):
+    if not item_frequencies[0] and not candidate_frequencies[0]:
+        return None  # neither item has the feature (no comparison)
+    elif not item_frequencies[0] or not candidate_frequencies[0]:
+        return 0  # one item doesn't have the feature (totally dissimilar)
+
+    # This is the same measure as used by the Redis index script: how often
+    # the contents of both items exist in the same buckets for each band,
+    # normalized to a [0, 1] scale.
+    scores = [
+        1 - get_manhattan_distance(scale_to_total(a), scale_to_total(b)) / 2.0
+        for a, b in zip(item_frequencies, candidate_frequencies)
+    ]
+    return round(sum(scores) / len(scores), 6)
+
+
+class MinHashIndexBackend(AbstractIndexBackend):
+    """\
+    An in-process implementation of the MinHash index, which keeps the same
+    data structures as ``RedisScriptMinHashIndexBackend`` in memory:
+
+    - the bucket frequencies of each ``(scope, index, key)``, which expire
+      ``interval * retention`` seconds after they were last recorded, and
+    - the keys which have been recorded in each ``(scope, index, band,
+      bucket)`` during each interval, which are retained for ``retention``
+      intervals.
+
+    The index can be written to and restored from a file with ``dump`` and
+    ``load``, and is safe to use from multiple threads.
+    """
+
+    def __init__(self, signature_builder, bands, interval, retention, candidate_set_limit):
+        self.signature_builder = signature_builder
+        self.bands = bands
+        self.interval = interval
+        self.retention = retention
+        self.candidate_set_limit = candidate_set_limit
+        self.lock = threading.RLock()
+        self.frequencies = {}
+        self.memberships = defaultdict(dict)
+
+    def __get_interval(self, timestamp):
+        return int(timestamp // self.interval)
+
+    def __get_intervals(self, timestamp):
+        current = self.__get_interval(timestamp)
+        return range(current - self.retention, current + 1)
+
+    def __get_buckets(self, features):
+        if not features:
+            return [[] for _ in range(self.bands)]
+
+        return [
+            [','.join(map('{}'.format, bucket))]
+            for bucket in band(self.bands, self.signature_builder(features))
+        ]
+
+    def __get_frequencies(self, scope, index, key, timestamp):
+        entry = self.frequencies.get((scope, index, key))
+        if entry is None:
+            return [{} for _ in range(self.bands)]
+
+        expiration, frequencies = entry
+        if expiration <= timestamp:
+            del self.frequencies[(scope, index, key)]
+            return [{} for _ in range(self.bands)]
+
+        return frequencies
+
+    def __set_frequencies(self, scope, index, key, frequencies, expiration, timestamp):
+        current = self.__get_frequencies(scope, index, key, timestamp)
+        for band_index, buckets in enumerate(frequencies):
+            for bucket, count in six.iteritems(buckets):
+                current[band_index][bucket] = current[band_index].get(bucket, 0) + count
+
+        if current[0]:
+            self.frequencies[(scope, index, key)] = [expiration, current]
+
+    def __get_members(self, scope, index, band_index, bucket, timestamp):
+        sets = self.memberships.get((scope, index, band_index, bucket), {})
+
+        results = {}
+        for interval in self.__get_intervals(timestamp):
+            members = sets.get(interval)
+            if members is None:
+                continue
+            for member in members:
+                if member in results:
+                    results[member] += 1
+                else:
+                    results[member] = 1
+                    if len(results) >= self.candidate_set_limit:
+                        return results
+        return results
+
+    def __add_member(self, scope, index, band_index, bucket, interval, key):
+        sets = self.memberships[(scope, index, band_index, bucket)]
+        if interval not in sets:
+            # Drop the sets of intervals which are no longer retained.
+            for expired in [i for i in sets if i < interval - self.retention]:
+                del sets[expired]
+            sets[interval] = set()
+        sets[interval].add(key)
+
+    def __get_member_sets(self, scope, index, frequencies, timestamp):
+        intervals = self.__get_intervals(timestamp)
+        for band_index, buckets in enumerate(frequencies):
+            for bucket in buckets:
+                sets = self.memberships.get((scope, index, band_index, bucket), {})
+                for interval in intervals:
+                    if interval in sets:
+                        yield interval, sets[interval]
+
+    def __fetch_candidates(self, scope, index, frequencies, timestamp):
+        candidates = defaultdict(set)
+        for band_index, buckets in enumerate(frequencies):
+            for bucket in buckets:
+                for member in self.__get_members(scope, index, band_index, bucket, timestamp):
+                    candidates[member].add(band_index)
+        return {candidate: len(bands) for candidate, bands in six.iteritems(candidates)}
+
+    def __search(self, scope, parameters, limit, timestamp):
+        possible_candidates = defaultdict(dict)
+        for i, (index, threshold, frequencies) in enumerate(parameters):
+            candidates = self.__fetch_candidates(scope, index, frequencies, timestamp)
+            for candidate, hits in six.iteritems(candidates):
+                if hits >= threshold:
+                    possible_candidates[candidate][i] = hits
+
+        # Candidates are ranked by their average number of hits across all
+        # indices, so candidates which are missing from some of the indices
+        # rank below those which are present in all of them.
+        candidates = [
+            (
+                -sum(hits.values()) / float(len(parameters)),
+                -len(hits),
+                candidate,
+            ) for candidate, hits in six.iteritems(possible_candidates)
+        ]
+        if limit is not None and len(candidates) > limit:
+            candidates = sorted(candidates)[:limit]
+
+        results = []
+        for _, _, candidate in candidates:
+            results.append((
+                candidate,
+                [
+                    calculate_similarity(
+                        frequencies,
+                        self.__get_frequencies(scope, index, candidate, timestamp),
+                    ) for index, _, frequencies in parameters
+                ],
+            ))
+
+        def get_comparison_key(result):
+            key, scores = result
+            scores = [score for score in scores if score is not None]
+            return (
+                sum(scores) / len(scores) * -1,  # average score, descending
+                len(scores) * -1,  # number of indexes with scores, descending
+                key,  # lexicographical sort on key, ascending
+            )
+
+        return sorted(results, key=get_comparison_key)
+
+    def classify(self, scope, items, limit=None, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        parameters = []
+        for index, threshold, features in items:
+            frequencies = [
+                {bucket: 1 for bucket in buckets}
+                for buckets in self.__get_buckets(features)
+            ]
+            parameters.append((index, threshold, frequencies))
+
+        with self.lock:
+            return self.__search(scope, parameters, limit, timestamp)
+
+    def compare(self, scope, key, items, limit=None, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        with self.lock:
+            parameters = [
+                (index, threshold, self.__get_frequencies(scope, index, key, timestamp))
+                for index, threshold in items
+            ]
+            return self.__search(scope, parameters, limit, timestamp)
+
+    def record(self, scope, key, items, timestamp=None):
+        if not items:
+            return  # nothing to do
+
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        interval = self.__get_interval(timestamp)
+        expiration = timestamp + self.interval * self.retention
+
+        with self.lock:
+            for index, features in items:
+                buckets = self.__get_buckets(features)
+                self.__set_frequencies(
+                    scope,
+                    index,
+                    key,
+                    [{bucket: 1 for bucket in band_buckets} for band_buckets in buckets],
+                    expiration,
+                    timestamp,
+                )
+                for band_index, band_buckets in enumerate(buckets):
+                    for bucket in band_buckets:
+                        self.__add_member(scope, index, band_index, bucket, interval, key)
+
+    def merge(self, scope, destination, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        with self.lock:
+            for index, source in items:
+                assert source != destination, 'cannot merge destination into itself'
+
+                entry = self.frequencies.pop((scope, index, source), None)
+                if entry is None or entry[0] <= timestamp:
+                    continue
+
+                expiration, frequencies = entry
+                destination_entry = self.frequencies.get((scope, index, destination))
+                if destination_entry is not None and destination_entry[0] > timestamp:
+                    expiration = max(expiration, destination_entry[0])
+                self.__set_frequencies(
+                    scope, index, destination, frequencies, expiration, timestamp)
+
+                for _, members in self.__get_member_sets(scope, index, frequencies, timestamp):
+                    if source in members:
+                        members.discard(source)
+                        members.add(destination)
+
+    def delete(self, scope, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        with self.lock:
+            for index, key in items:
+                entry = self.frequencies.pop((scope, index, key), None)
+                if entry is None:
+                    continue
+
+                for _, members in self.__get_member_sets(scope, index, entry[1], timestamp):
+                    members.discard(key)
+
+    def scan(self, scope, indices, batch=1000, timestamp=None):
+        """\
+        Yields ``(index, keys)`` pairs, where ``keys`` is a list of at most
+        ``batch`` frequency and membership entries for that index. If
+        ``scope`` is ``'*'``, entries of all scopes are returned.
+        """
+        with self.lock:
+            entries = list(self.frequencies) + list(self.memberships)
+
+        for index in indices:
+            keys = [
+                key for key in entries
+                if key[1] == index and scope in ('*', key[0])
+            ]
+            for i in range(0, len(keys), batch):
+                yield index, keys[i:i + batch]
+
+    def flush(self, scope, indices, batch=1000, timestamp=None):
+        for index, chunk in self.scan(scope, indices, batch, timestamp):
+            with self.lock:
+                for key in chunk:
+                    self.frequencies.pop(key, None)
+                    self.memberships.pop(key, None)
+
+    def export(self, scope, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        results = []
+        with self.lock:
+            for index, key in items:
+                entry = self.frequencies.get((scope, index, key))
+                if entry is None or entry[0] <= timestamp:
+                    results.append([])
+                    continue
+
+                expiration, frequencies = entry
+                data = []
+                for band_index, buckets in enumerate(frequencies):
+                    result = {}
+                    for bucket, count in six.iteritems(buckets):
+                        sets = self.memberships.get((scope, index, band_index, bucket), {})
+                        result[bucket] = [
+                            count,
+                            [
+                                interval for interval in self.__get_intervals(timestamp)
+                                if key in sets.get(interval, ())
+                            ],
+                        ]
+                    data.append(result)
+                results.append([data, expiration])
+        return results
+
+    def import_(self, scope, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        with self.lock:
+            for index, key, data in items:
+                if not data:
+                    continue
+
+                data, expiration = data
+                frequencies = []
+                for band_index, buckets in enumerate(data):
+                    frequencies.append({})
+                    for bucket, (count, intervals) in six.iteritems(buckets):
+                        frequencies[band_index][bucket] = count
+                        for interval in intervals:
+                            self.__add_member(scope, index, band_index, bucket, interval, key)
+                self.__set_frequencies(scope, index, key, frequencies, expiration, timestamp)
+
+    def expire(self, timestamp=None):
+        """\
+        Removes all data which has expired. (Expired data is otherwise only
+        removed when it is accessed.)
+        """
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        oldest = self.__get_interval(timestamp) - self.retention
+        with self.lock:
+            for key, (expiration, _) in list(self.frequencies.items()):
+                if expiration <= timestamp:
+                    del self.frequencies[key]
+
+            for key, sets in list(self.memberships.items()):
+                for interval in [i for i in sets if i < oldest]:
+                    del sets[interval]
+                if not sets:
+                    del self.memberships[key]
+
+    def dump(self, path):
+        """\
+        Writes a snapshot of the index (without any expired data) to ``path``.
+        """
+        with self.lock:
+            self.expire()
+            state = (self.frequencies, dict(self.memberships))
+            directory, name = os.path.split(os.path.abspath(path))
+            fd, temporary = tempfile.mkstemp(dir=directory, prefix=name)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary, path)
+
+    def load(self, path):
+        """\
+        Replaces the contents of the index with a snapshot written by
+        ``dump``.
+        """
+        with open(path, 'rb') as f:
+            frequencies, memberships = pickle.load(f)
+
+        with self.lock:
+            self.frequencies = frequencies
+            self.memberships = defaultdict(dict, memberships)
@@ -27,6 +27,13 @@ def get_application_chunks(exception):
     )
 
 
+def get_average_score(scores):
+    scores = [score for score in scores if score is not None]
+    if not scores:
+        return 0
+    return sum(scores) / float(len(scores))
+
+
 class InterfaceDoesNotExist(KeyError):
     pass
 
@@ -192,7 +199,13 @@ class FeatureSet(object):
             ),
         )
 
-    def compare(self, group, limit=None, thresholds=None):
+    def compare(self, group, limit=None, thresholds=None, min_score=None):
+        """\
+        Returns the groups which are most similar to ``group``, best match
+        first. If ``min_score`` is provided, groups whose average score
+        (over the features they share with ``group``) is below it are
+        omitted.
+        """
         if thresholds is None:
             thresholds = {}
 
@@ -200,17 +213,27 @@ class FeatureSet(object):
 
         items = [(self.aliases[label], thresholds.get(label, 0), ) for label in features]
 
+        results = self.index.compare(
+            self.__get_scope(group.project),
+            self.__get_key(group),
+            items,
+            limit=limit,
+        )
+
+        if min_score is not None:
+            # Results are ordered by their average score, so every result
+            # after the first one below the minimum is below it as well.
+            results = itertools.takewhile(
+                lambda (key, scores): get_average_score(scores) >= min_score,
+                results,
+            )
+
         return map(
             lambda (key, scores): (
                 int(key),
                 dict(zip(features, scores)),
             ),
-            self.index.compare(
-                self.__get_scope(group.project),
-                self.__get_key(group),
-                items,
-                limit=limit,
-            ),
+            results,
         )
 
     def merge(self, destination, sources, allow_unsafe=False):
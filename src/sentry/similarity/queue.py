@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+import time
+
+from sentry.utils.redis import load_script
+
+pop_events = load_script('similarity/pop.lua')
+pop_pending = load_script('similarity/pending.lua')
+
+
+class IndexQueue(object):
+    """\
+    Collects the IDs of events to be recorded in the similarity index, so that
+    events of the same group can be recorded in batches (with a single script
+    call) rather than one at a time.
+
+    At most ``max_size`` event IDs are kept for each group, and older IDs are
+    discarded once that limit is reached.
+    """
+    def __init__(self, cluster, namespace, max_size=100, ttl=60 * 60):
+        self.cluster = cluster
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+
+    @property
+    def pending_key(self):
+        return '{}:p'.format(self.namespace)
+
+    def __make_key(self, member):
+        return '{}:e:{}'.format(self.namespace, member)
+
+    def __make_member(self, project_id, group_id):
+        return '{}:{}'.format(project_id, group_id)
+
+    def add(self, event):
+        member = self.__make_member(event.project_id, event.group_id)
+        key = self.__make_key(member)
+
+        pipeline = self.cluster.pipeline(transaction=False)
+        pipeline.rpush(key, event.id)
+        pipeline.ltrim(key, -self.max_size, -1)
+        pipeline.expire(key, self.ttl)
+        pipeline.zadd(self.pending_key, time.time(), member)
+        pipeline.execute()
+
+    def get_pending(self):
+        """\
+        Returns the ``(project_id, group_id)`` pairs which have had events
+        added since they were last returned.
+        """
+        # Groups which receive an event after this point remain pending.
+        members = pop_pending(self.cluster, [self.pending_key], [time.time()])
+        return [tuple(map(int, member.split(':'))) for member in members]
+
+    def pop(self, project_id, group_id):
+        """\
+        Returns the IDs of the events queued for the group, oldest first.
+        """
+        key = self.__make_key(self.__make_member(project_id, group_id))
+        # The events are read and removed at once, since ``add`` may trim the
+        # list in the meantime.
+        return [int(value) for value in pop_events(self.cluster, [key], [])]
@@ -14,6 +14,8 @@ from sentry.models import (
     ProjectOption,
 )
 from sentry.tasks.base import instrumented_task
+from sentry.utils import metrics
+from sentry.utils.locking import UnableToAcquireLock
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +37,12 @@ def schedule_digests():
     timeout = 300
     digests.maintenance(deadline - timeout)
 
+    count = 0
     for entry in digests.schedule(deadline):
         deliver_digest.delay(entry.key, entry.timestamp)
+        count += 1
+
+    metrics.timing('digests.schedule.count', count)
 
 
 @instrumented_task(name='sentry.tasks.digests.deliver_digest', queue='digests.delivery')
@@ -54,12 +60,22 @@ def deliver_digest(key, schedule_timestamp=None):
         project, get_option_key(plugin.get_conf_key(), 'minimum_delay')
     )
 
+    if schedule_timestamp is not None:
+        # How long the timeline waited to be delivered after it was ready.
+        metrics.timing('digests.delivery.lag', max(time.time() - schedule_timestamp, 0))
+
     try:
         with digests.digest(key, minimum_delay=minimum_delay) as records:
             digest = build_digest(project, records)
     except InvalidState as error:
         logger.info('Skipped digest delivery: %s', error, exc_info=True)
         return
+    except UnableToAcquireLock as error:
+        # Another task is already delivering this timeline, and will close
+        # the digest once it is done.
+        logger.info('Skipped digest delivery: %s', error)
+        metrics.incr('digests.delivery.locked')
+        return
 
     if digest:
         plugin.notify_digest(project, digest)
@@ -0,0 +1,41 @@
+"""
+sentry.tasks.nodestore
+~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+from sentry.tasks.base import instrumented_task
+from sentry.utils import metrics
+from sentry.utils.locking import UnableToAcquireLock
+
+logger = logging.getLogger(__name__)
+
+
+@instrumented_task(name='sentry.tasks.nodestore.migrate_nodes', queue='cleanup')
+def migrate_nodes(limit=100000):
+    """
+    Moves nodes of a tiered nodestore which are due from the hot tier to
+    the cold tier.
+    """
+    from sentry.app import locks, nodestore
+
+    if not hasattr(nodestore, 'migrate'):
+        return
+
+    lock = locks.get('nodestore:migrate_nodes', duration=60 * 10)
+    try:
+        with lock.acquire():
+            nodestore.migrate(limit=limit)
+    except UnableToAcquireLock as error:
+        logger.warning('migrate_nodes.fail', extra={'error': error})
+        return
+
+    backlog = nodestore.get_backlog()
+    metrics.timing('nodestore.tiered.backlog', backlog['pending'])
+    metrics.timing('nodestore.tiered.hot', backlog['hot'])
@@ -0,0 +1,91 @@
+"""
+sentry.tasks.similarity
+~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import logging
+from collections import OrderedDict
+
+from sentry.tasks.base import instrumented_task
+from sentry.utils import metrics
+from sentry.utils.iterators import chunked
+from sentry.utils.locking import UnableToAcquireLock
+
+logger = logging.getLogger(__name__)
+
+
+@instrumented_task(name='sentry.tasks.similarity.process_pending', queue='similarity')
+def process_pending(batch_size=100):
+    """
+    Schedules recording the events which have been added to the similarity
+    index queue, in batches of ``batch_size`` groups.
+    """
+    from sentry.app import locks
+    from sentry.similarity import index_queue
+
+    if index_queue is None:
+        return
+
+    lock = locks.get('similarity:process_pending', duration=60)
+    try:
+        with lock.acquire():
+            pending = index_queue.get_pending()
+    except UnableToAcquireLock as error:
+        logger.warning('process_pending.fail', extra={'error': error})
+        return
+
+    metrics.timing('similarity.queue.pending', len(pending))
+    for groups in chunked(pending, batch_size):
+        record_events.apply_async(kwargs={'groups': groups})
+
+
+@instrumented_task(name='sentry.tasks.similarity.record_events', queue='similarity')
+def record_events(groups):
+    """
+    Records the queued events of each ``(project_id, group_id)`` pair in the
+    similarity index.
+    """
+    from sentry.models import Event, Group, Project
+    from sentry.similarity import features, index_queue
+
+    event_ids = []
+    for project_id, group_id in groups:
+        event_ids.extend(index_queue.pop(project_id, group_id))
+
+    if not event_ids:
+        return
+
+    # Events are loaded for all groups at once, and recorded in batches by the
+    # group they belong to now (which may have changed since they were queued
+    # if the group was merged.)
+    events = Event.objects.in_bulk(event_ids)
+    Event.objects.bind_nodes(events.values(), 'data')
+    projects = Project.objects.in_bulk(set(e.project_id for e in events.values()))
+    groups = Group.objects.in_bulk(set(e.group_id for e in events.values()))
+
+    batches = OrderedDict()
+    for event_id in event_ids:
+        event = events.get(event_id)
+        if event is None or event.group_id not in groups:
+            continue
+        event.project = projects[event.project_id]
+        event.group = groups[event.group_id]
+        batches.setdefault((event.project_id, event.group_id), []).append(event)
+
+    for (project_id, group_id), events in batches.items():
+        metrics.timing('similarity.queue.batch_size', len(events))
+        try:
+            features.record(events)
+        except Exception:
+            logger.exception(
+                'record_events.fail',
+                extra={
+                    'project_id': project_id,
+                    'group_id': group_id,
+                }
+            )
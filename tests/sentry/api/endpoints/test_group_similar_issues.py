@@ -0,0 +1,36 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.testutils import APITestCase
+
+
+class GroupSimilarIssuesTest(APITestCase):
+    @patch('sentry.similarity.features.compare')
+    def test_min_score(self, compare):
+        self.login_as(user=self.user)
+
+        group = self.create_group()
+        other = self.create_group()
+        compare.return_value = [
+            (group.id, {'index': 1.0}),
+            (other.id, {'index': 0.5}),
+        ]
+
+        url = '/api/0/issues/{}/similar/'.format(group.id)
+        response = self.client.get(url, {'min_score': '0.5'}, format='json')
+
+        assert response.status_code == 200, response.content
+        assert [serialized['id'] for serialized, _ in response.data] == [str(other.id)]
+        assert compare.call_args[1]['min_score'] == 0.5
+
+    def test_invalid_min_score(self):
+        self.login_as(user=self.user)
+
+        group = self.create_group()
+
+        url = '/api/0/issues/{}/similar/'.format(group.id)
+        response = self.client.get(url, {'min_score': 'abc'}, format='json')
+
+        assert response.status_code == 400, response.content
+        assert response.data == {'detail': 'Invalid min_score'}
@@ -93,38 +93,54 @@ class GroupListTest(APITestCase):
         assert links['previous']['results'] == 'true'
         assert links['next']['results'] == 'false'
 
-        # TODO(dcramer): not working correctly
-        # print(links['previous']['cursor'])
-        # response = self.client.get(links['previous']['href'], format='json')
-        # assert response.status_code == 200
-        # assert len(response.data) == 1
-        # assert response.data[0]['id'] == six.text_type(group2.id)
+        response = self.client.get(links['previous']['href'], format='json')
+        assert response.status_code == 200
+        assert len(response.data) == 1
+        assert response.data[0]['id'] == six.text_type(group2.id)
 
-        # links = self._parse_links(response['Link'])
+        links = self._parse_links(response['Link'])
 
-        # assert links['previous']['results'] == 'false'
-        # assert links['next']['results'] == 'true'
+        assert links['previous']['results'] == 'false'
+        assert links['next']['results'] == 'true'
 
-        # print(links['previous']['cursor'])
-        # response = self.client.get(links['previous']['href'], format='json')
-        # assert response.status_code == 200
-        # assert len(response.data) == 0
+        response = self.client.get(links['previous']['href'], format='json')
+        assert response.status_code == 200
+        assert len(response.data) == 0
 
-        # group3 = self.create_group(
-        #     checksum='c' * 32,
-        #     last_seen=now + timedelta(seconds=1),
-        # )
+        group3 = self.create_group(
+            checksum='c' * 32,
+            last_seen=now + timedelta(seconds=1),
+        )
+
+        links = self._parse_links(response['Link'])
 
-        # links = self._parse_links(response['Link'])
+        assert links['previous']['results'] == 'false'
+        assert links['next']['results'] == 'true'
 
-        # assert links['previous']['results'] == 'false'
-        # assert links['next']['results'] == 'true'
+        response = self.client.get(links['previous']['href'], format='json')
+        assert response.status_code == 200
+        assert len(response.data) == 1
+        assert response.data[0]['id'] == six.text_type(group3.id)
+
+    def test_cached_response(self):
+        group = self.create_group(checksum='a' * 32)
+        self.login_as(user=self.user)
 
-        # print(links['previous']['cursor'])
-        # response = self.client.get(links['previous']['href'], format='json')
-        # assert response.status_code == 200
-        # assert len(response.data) == 1
-        # assert response.data[0]['id'] == six.text_type(group3.id)
+        with self.options({'api.stream-cache.ttl': 60}):
+            response = self.client.get(self.path, format='json')
+            assert response.status_code == 200
+            assert [g['id'] for g in response.data] == [six.text_type(group.id)]
+
+            # queryset updates do not invalidate the cache
+            Group.objects.filter(id=group.id).update(status=GroupStatus.RESOLVED)
+            response = self.client.get(self.path, format='json')
+            assert response.status_code == 200
+            assert [g['id'] for g in response.data] == [six.text_type(group.id)]
+
+            group.update(status=GroupStatus.RESOLVED)
+            response = self.client.get(self.path, format='json')
+            assert response.status_code == 200
+            assert response.data == []
 
     def test_stats_period(self):
         # TODO(dcramer): this test really only checks if validation happens
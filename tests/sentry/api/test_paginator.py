@@ -4,7 +4,9 @@ import pytest
 from datetime import timedelta
 from django.utils import timezone
 
-from sentry.api.paginator import (Paginator, DateTimePaginator, OffsetPaginator)
+from sentry.api.paginator import (
+    Paginator, DateTimePaginator, DateTimeKeysetPaginator, KeysetPaginator, OffsetPaginator
+)
 from sentry.models import User
 from sentry.testutils import TestCase
 from sentry.utils.db import is_mysql
@@ -240,3 +242,80 @@ class DateTimePaginatorTest(TestCase):
 
         result5 = paginator.get_result(limit=10, cursor=result4.prev)
         assert len(result5) == 0, list(result5)
+
+
+class KeysetPaginatorTest(TestCase):
+    def test_ties(self):
+        joined = timezone.now()
+
+        res1 = self.create_user('foo@example.com', date_joined=joined)
+        res2 = self.create_user('bar@example.com', date_joined=joined)
+        res3 = self.create_user('baz@example.com', date_joined=joined)
+
+        queryset = User.objects.all()
+
+        paginator = DateTimeKeysetPaginator(queryset, '-date_joined')
+        result1 = paginator.get_result(limit=2, cursor=None)
+        assert list(result1) == [res3, res2]
+        assert result1.next
+        assert not result1.prev
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res1]
+        assert not result2.next
+        assert result2.prev
+
+        result3 = paginator.get_result(limit=2, cursor=result2.prev)
+        assert list(result3) == [res3, res2]
+        assert result3.next
+        assert not result3.prev
+
+    def test_prev_descending_with_new(self):
+        joined = timezone.now()
+
+        res1 = self.create_user('foo@example.com', date_joined=joined)
+        res2 = self.create_user('bar@example.com', date_joined=joined + timedelta(seconds=1))
+
+        queryset = User.objects.all()
+
+        paginator = DateTimeKeysetPaginator(queryset, '-date_joined')
+        result1 = paginator.get_result(limit=10, cursor=None)
+        assert list(result1) == [res2, res1]
+
+        res3 = self.create_user('baz@example.com', date_joined=joined + timedelta(seconds=2))
+
+        result2 = paginator.get_result(limit=10, cursor=result1.prev)
+        assert list(result2) == [res3]
+
+        result3 = paginator.get_result(limit=10, cursor=result2.prev)
+        assert len(result3) == 0
+
+        result4 = paginator.get_result(limit=10, cursor=result1.next)
+        assert len(result4) == 0
+
+    def test_ascending(self):
+        res1 = self.create_user('foo@example.com')
+        res2 = self.create_user('bar@example.com')
+        res3 = self.create_user('baz@example.com')
+
+        queryset = User.objects.all()
+
+        paginator = KeysetPaginator(queryset, 'id')
+        result1 = paginator.get_result(limit=2, cursor=None)
+        assert list(result1) == [res1, res2]
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res3]
+
+    def test_approximate_hits(self):
+        self.create_user('foo@example.com')
+
+        queryset = User.objects.all()
+        paginator = KeysetPaginator(queryset, 'id', approximate_hits=True)
+        result = paginator.get_result(limit=10, count_hits=True)
+        assert result.hits == 1
+
+        # the count is cached for the same query
+        self.create_user('bar@example.com')
+        result = paginator.get_result(limit=10, count_hits=True)
+        assert result.hits == 1
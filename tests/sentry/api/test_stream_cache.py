@@ -0,0 +1,43 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.api import stream_cache
+from sentry.models import Group
+from sentry.receivers.stream_cache import invalidate_buffered_group
+from sentry.testutils import TestCase
+
+
+class StreamCacheTest(TestCase):
+    def test_disabled(self):
+        group = self.create_group()
+
+        with patch.object(stream_cache, 'cache') as cache, \
+                patch.object(Group.objects, 'get_from_cache') as get_from_cache:
+            group.save()
+            invalidate_buffered_group(filters={'id': group.id})
+            assert not get_from_cache.called
+
+            assert stream_cache.get_response_key(group.project_id, None, {}) is None
+            assert stream_cache.get_response(None) is None
+            stream_cache.set_response(None, [], None)
+
+            assert not cache.method_calls
+
+    def test_changes_bump_generation(self):
+        with self.options({'api.stream-cache.ttl': 60}):
+            group = self.create_group()
+
+            key = stream_cache.get_response_key(group.project_id, None, {})
+            assert stream_cache.get_response_key(group.project_id, None, {}) == key
+
+            group.save()
+            assert stream_cache.get_response_key(group.project_id, None, {}) != key
+
+            key = stream_cache.get_response_key(group.project_id, None, {})
+            with patch.object(Group.objects, 'get_from_cache') as get_from_cache:
+                invalidate_buffered_group(
+                    filters={'id': group.id, 'project_id': group.project_id},
+                )
+                assert not get_from_cache.called
+            assert stream_cache.get_response_key(group.project_id, None, {}) != key
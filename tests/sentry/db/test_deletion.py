@@ -33,11 +33,11 @@ class BulkDeleteQueryTest(TestCase):
         group1_1 = self.create_group(project1, last_seen=now - timedelta(days=1))
         group1_2 = self.create_group(project1, last_seen=now - timedelta(days=1))
         group1_3 = self.create_group(project1, last_seen=now)
-        BulkDeleteQuery(
+        assert BulkDeleteQuery(
             model=Group,
             dtfield='last_seen',
             days=1,
-        ).execute()
+        ).execute(chunk_size=1) == 2
         assert not Group.objects.filter(id=group1_1.id).exists()
         assert not Group.objects.filter(id=group1_2.id).exists()
         assert Group.objects.filter(id=group1_3.id).exists()
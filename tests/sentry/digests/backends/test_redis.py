@@ -152,3 +152,24 @@ class RedisBackendTestCase(TestCase):
 
         with backend.digest('timeline', 0) as records:
             assert len(set(records)) == n
+
+    def test_schedule_in_batches(self):
+        backend = RedisBackend(schedule_batch_size=2)
+
+        timelines = ['timeline:{}'.format(i) for i in xrange(5)]
+        for timeline in timelines:
+            backend.add(timeline, Record('record:1', 'value', time.time()))
+            with backend.digest(timeline, 0):
+                pass
+            backend.add(timeline, Record('record:2', 'value', time.time()))
+
+        # Adding a record delays the timeline, so schedule up to a later
+        # deadline.
+        deadline = time.time() + backend.maximum_delay
+        assert set(entry.key for entry in backend.schedule(deadline)) == set(timelines)
+        assert set(backend.schedule(deadline)) == set()
+
+        # Maintenance should move all of the timelines back to the waiting
+        # state, so they can be scheduled again.
+        backend.maintenance(deadline)
+        assert set(entry.key for entry in backend.schedule(deadline)) == set(timelines)
@@ -0,0 +1,29 @@
+from __future__ import absolute_import
+
+from sentry.digests.codecs import (
+    CompactNotificationCodec,
+    CompressedPickleCodec,
+)
+from sentry.digests.notifications import Notification
+from sentry.testutils import TestCase
+
+
+class CompactNotificationCodecTestCase(TestCase):
+    codec = CompactNotificationCodec()
+
+    def test_encodes_identifiers(self):
+        event = self.create_event(group=self.group)
+        value = self.codec.encode(Notification(event, [1, 2]))
+        assert len(value) < 100
+
+        notification = self.codec.decode(value)
+        assert notification.rules == [1, 2]
+        assert notification.event.id is None
+        assert notification.event.event_id == event.event_id
+        assert notification.event.group_id == event.group_id
+        assert abs((notification.event.datetime - event.datetime).total_seconds()) < 0.001
+
+    def test_decodes_pickled_values(self):
+        value = CompressedPickleCodec().encode({'foo': 'bar'})
+        assert self.codec.decode(value) == {'foo': 'bar'}
+        assert self.codec.decode(self.codec.encode('value')) == 'value'
@@ -8,9 +8,11 @@ from exam import fixture
 from six.moves import reduce
 
 from sentry.digests import Record
+from sentry.digests.codecs import CompactNotificationCodec
 from sentry.digests.notifications import (
     Notification,
     event_to_record,
+    fetch_events,
     rewrite_record,
     group_records,
     sort_group_contents,
@@ -75,6 +77,41 @@ class RewriteRecordTestCase(TestCase):
         )
 
 
+class FetchEventsTestCase(TestCase):
+    def test_replaces_placeholder_events(self):
+        codec = CompactNotificationCodec()
+        rule = self.project.rule_set.all()[0]
+        events = [self.create_event(group=self.group) for _ in range(2)]
+        records = [
+            Record(
+                record.key,
+                codec.decode(codec.encode(record.value)),
+                record.timestamp,
+            ) for record in (event_to_record(event, (rule, )) for event in events)
+        ]
+
+        # Records for events that no longer exist are dropped.
+        events[1].delete()
+
+        results = fetch_events(self.project, records)
+
+        assert len(results) == 1
+        assert results[0].key == events[0].event_id
+        assert results[0].value.event.id == events[0].id
+        assert results[0].value.event.data.id == events[0].data.id
+        # the node reference is removed from node data when it is loaded
+        expected = dict(events[0].data)
+        expected.pop('_ref')
+        expected.pop('_ref_version')
+        assert dict(results[0].value.event.data) == expected
+        assert results[0].value.rules == [rule.id]
+
+    def test_keeps_complete_events(self):
+        record = event_to_record(self.create_event(group=self.group), ())
+        with self.assertNumQueries(0):
+            assert fetch_events(self.project, [record]) == [record]
+
+
 class GroupRecordsTestCase(TestCase):
     @fixture
     def rule(self):
@@ -14,6 +14,7 @@ from exam import fixture
 
 from sentry.db.models.fields.node import NodeData, NodeIntegrityFailure
 from sentry.models import ProjectKey, Event, LostPasswordHash
+from sentry.nodestore.codecs import IndexedJsonCodec
 from sentry.testutils import TestCase
 from sentry.utils.compat import pickle
 from sentry.utils.strings import compress
@@ -161,3 +162,22 @@ class EventNodeStoreTest(TestCase):
     def test_basic_ref_binding(self):
         event = self.create_event()
         assert event.data.get_ref(event) == event.project.id
+
+    def test_lazily_decodes_indexed_node_data(self):
+        data = {
+            'message': 'foo',
+            'sentry.interfaces.Message': {'message': 'foo'},
+            'extra': {'bar': [1, 2, 3]},
+        }
+        codec = IndexedJsonCodec()
+        node = NodeData(Event._meta.get_field('data'), 'abc', None)
+        node.bind_data(codec.decode(codec.encode(data)))
+
+        assert 'extra' in node
+        assert node['message'] == 'foo'
+        assert sorted(node) == sorted(data)
+        assert node._node_data.values == {'message': 'foo'}
+
+        node['extra']['bar'].append(4)
+        assert node.data['extra'] == {'bar': [1, 2, 3, 4]}
+        assert type(node.data) == dict
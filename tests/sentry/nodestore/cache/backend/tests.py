@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.cache.backend import CachedNodeStorage, LRUCache
+from sentry.testutils import TestCase
+from sentry.utils.redis import clusters
+
+
+class InMemoryBackend(NodeStorage):
+    def __init__(self, data):
+        self._data = data
+        self.reads = []
+
+    def set(self, id, data):
+        self._data[id] = data
+
+    def get(self, id):
+        self.reads.append(id)
+        return self._data.get(id)
+
+    def delete(self, id):
+        self._data.pop(id, None)
+
+    def cleanup(self, cutoff_timestamp):
+        deleted = len(self._data)
+        self._data.clear()
+        return deleted
+
+
+class LRUCacheTest(TestCase):
+    def test_eviction(self):
+        cache = LRUCache(10)
+        cache.set('a', b'aaaa')
+        cache.set('b', b'bbbb')
+        assert cache.get('a') == b'aaaa'
+        cache.set('c', b'cccc')
+        assert cache.get('b') is None
+        assert cache.get('a') == b'aaaa'
+        assert cache.get('c') == b'cccc'
+        assert cache.size == 8
+
+        cache.set('d', b'd' * 11)
+        assert cache.get('d') is None
+
+        cache.delete('a')
+        assert cache.get('a') is None
+        assert cache.size == 4
+
+
+class CachedNodeStorageTest(TestCase):
+    def setUp(self):
+        self.data = {}
+        self.ns = CachedNodeStorage(InMemoryBackend, {'data': self.data})
+
+    def tearDown(self):
+        with clusters.get('default').all() as client:
+            client.flushdb()
+
+    def test_read_through(self):
+        self.data['a'] = {'foo': 'bar'}
+
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.ns.backend.reads == ['a']
+
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.ns.get_multi(['a', 'b']) == {'a': {'foo': 'bar'}, 'b': None}
+        assert self.ns.backend.reads == ['a', 'b']
+
+    def test_shared_cache(self):
+        self.data['a'] = {'foo': 'bar'}
+        self.ns.get('a')
+
+        other = CachedNodeStorage(InMemoryBackend, {'data': {}})
+        assert other.get('a') == {'foo': 'bar'}
+        assert other.backend.reads == []
+
+    def test_set_does_not_cache(self):
+        self.ns.set('a', {'foo': 'bar'})
+        with clusters.get('default').map() as client:
+            promise = client.get(self.ns.make_key('a'))
+        assert promise.value is None
+
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.ns.backend.reads == ['a']
+
+    def test_set_invalidates(self):
+        self.ns.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+        self.ns.set('a', {'foo': 'baz'})
+        assert self.ns.get('a') == {'foo': 'baz'}
+
+        other = CachedNodeStorage(InMemoryBackend, {'data': self.data})
+        assert other.get('a') == {'foo': 'baz'}
+
+    def test_returns_copies(self):
+        self.ns.set('a', {'foo': 'bar'})
+        self.ns.get('a')['foo'] = 'baz'
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+    def test_delete(self):
+        self.ns.set('a', {'foo': 'bar'})
+        self.ns.delete('a')
+        assert self.ns.get('a') is None
+
+        other = CachedNodeStorage(InMemoryBackend, {'data': {}})
+        assert other.get('a') is None
+
+    def test_cleanup_returns_deleted_count(self):
+        self.data.update({'a': {}, 'b': {}})
+        assert self.ns.cleanup(None) == 2
+        assert self.data == {}
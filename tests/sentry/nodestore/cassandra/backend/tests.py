@@ -2,8 +2,14 @@
 
 from __future__ import absolute_import
 
-from sentry.nodestore.cassandra.backend import CassandraNodeStorage
+from mock import patch
+
+from sentry.nodestore.cassandra.backend import (
+    CassandraNodeStorage, FLAG_CODEC, FLAG_PICKLE
+)
 from sentry.testutils import TestCase, requires_cassandra
+from sentry.utils.cache import memoize
+from sentry.utils.compat import pickle
 
 
 @requires_cassandra
@@ -39,3 +45,101 @@ class CassandraNodeStorageTest(TestCase):
         assert result[node_id2] == {
             'foo': 'bar',
         }
+
+
+class FakeFuture(object):
+    def __init__(self, session, statement, params):
+        self.session = session
+        self.statement = statement
+        self.params = params
+        session.in_flight += 1
+        session.max_in_flight = max(session.max_in_flight, session.in_flight)
+
+    def result(self):
+        self.session.in_flight -= 1
+        return self.session.execute(self.statement, self.params)
+
+
+class FakeSession(object):
+    """
+    Stands in for a ``cassandra.cluster.Session`` connected to the nodestore
+    column family.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def prepare(self, query):
+        return query
+
+    def execute(self, statement, params):
+        key = params[0]
+        if statement.startswith('SELECT'):
+            return [self.rows[key]] if key in self.rows else []
+        if statement.startswith('INSERT'):
+            self.rows[key] = tuple(params[1:])
+        elif statement.startswith('DELETE'):
+            self.rows.pop(key, None)
+        return []
+
+    def execute_async(self, statement, params):
+        return FakeFuture(self, statement, params)
+
+
+class FakeCassandraNodeStorage(CassandraNodeStorage):
+    @memoize
+    def session(self):
+        return FakeSession()
+
+
+class CassandraNodeStorageStandInTest(TestCase):
+    def setUp(self):
+        self.ns = FakeCassandraNodeStorage(servers=['127.0.0.1:9042'], concurrency=10)
+
+    def test_multi(self):
+        values = dict(('node%d' % i, {'index': i}) for i in range(25))
+        self.ns.set_multi(values)
+
+        result = self.ns.get_multi(list(values) + ['missing'])
+        assert result.pop('missing') is None
+        assert result == values
+        assert self.ns.session.max_in_flight == 10
+
+        self.ns.delete_multi(list(values))
+        assert self.ns.session.rows == {}
+
+    def test_writes_pickle_by_default(self):
+        self.ns.set('node1', {'foo': 'bar'})
+        value, flags = self.ns.session.rows['node1']
+        assert flags == FLAG_PICKLE
+        assert pickle.loads(value) == {'foo': 'bar'}
+
+    def test_codec(self):
+        ns = FakeCassandraNodeStorage(
+            servers=['127.0.0.1:9042'],
+            codec='sentry.nodestore.codecs.CompressedPickleCodec',
+        )
+        # Rows written before a codec was configured remain readable.
+        ns.session.rows['legacy'] = (pickle.dumps({'foo': 'bar'}), FLAG_PICKLE)
+        ns.set('node1', {'foo': 'baz'})
+
+        assert ns.session.rows['node1'][1] == FLAG_CODEC
+        assert ns.get_multi(['legacy', 'node1']) == {
+            'legacy': {'foo': 'bar'},
+            'node1': {'foo': 'baz'},
+        }
+
+    @patch('sentry.nodestore.cassandra.backend.Cluster')
+    def test_servers_without_port(self, Cluster):
+        ns = CassandraNodeStorage(servers=['cassandra1', 'cassandra2'])
+        ns.session
+        args, kwargs = Cluster.call_args
+        assert sorted(args[0]) == ['cassandra1', 'cassandra2']
+        assert kwargs['port'] == 9042
+
+        ns = CassandraNodeStorage(servers=['cassandra1', 'cassandra2:9142'])
+        ns.session
+        args, kwargs = Cluster.call_args
+        assert kwargs['port'] == 9142
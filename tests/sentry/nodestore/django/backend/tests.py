@@ -2,12 +2,17 @@
 
 from __future__ import absolute_import
 
+import pytest
+
 from datetime import timedelta
+from django.db import connection
 from django.utils import timezone
+from mock import patch
 
 from sentry.nodestore.django.models import Node
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.testutils import TestCase
+from sentry.utils.db import is_postgres
 
 
 class DjangoNodeStorageTest(TestCase):
@@ -109,7 +114,48 @@ class DjangoNodeStorageTest(TestCase):
             }
         )
 
-        self.ns.cleanup(cutoff)
+        assert self.ns.cleanup(cutoff) == 1
 
         assert Node.objects.filter(id=node.id).exists()
         assert not Node.objects.filter(id=node2.id).exists()
+
+
+@pytest.mark.skipif(not is_postgres(), reason='Partitions require Postgres')
+class PartitionedDjangoNodeStorageTest(TestCase):
+    def setUp(self):
+        self.ns = DjangoNodeStorage(partitioned=True)
+
+    def get_partition_ids(self, name):
+        cursor = connection.cursor()
+        cursor.execute('SELECT id FROM {}'.format(name))
+        return set(row[0] for row in cursor.fetchall())
+
+    def test_set(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'baz'})
+
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'baz'}
+        assert Node.objects.count() == 1
+        name = self.ns.get_partition(timezone.now())
+        assert self.get_partition_ids(name) == set(['d2502ebbd7df41ceba8d3275595cac33'])
+
+    def test_cleanup(self):
+        now = timezone.now()
+        earlier = now - timedelta(days=3)
+        with patch('sentry.nodestore.django.backend.timezone.now', return_value=earlier):
+            self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac34', {'foo': 'baz'})
+        Node.objects.create(
+            id='d2502ebbd7df41ceba8d3275595cac35', timestamp=now - timedelta(days=3), data={
+                'foo': 'bar',
+            }
+        )
+        assert len(self.ns.get_partitions()) == 2
+
+        # The partitions have not been analyzed, so their rows are counted.
+        assert self.ns.cleanup(now - timedelta(days=1)) == 2
+
+        assert [p[1].date() for p in self.ns.get_partitions()] == [now.date()]
+        assert list(Node.objects.values_list('id', flat=True)) == [
+            'd2502ebbd7df41ceba8d3275595cac34'
+        ]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+
+from datetime import timedelta
+from django.utils import timezone
+
+from sentry.nodestore.segment.backend import SegmentNodeStorage
+from sentry.testutils import TestCase
+
+
+class SegmentNodeStorageTest(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.ns = SegmentNodeStorage(path=self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {
+            'foo': 'bar',
+        })
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {
+            'foo': 'bar',
+        }
+        assert self.ns.get('5394aa025b8e401ca6bc3ddee3130edc') is None
+
+    def test_set_multi(self):
+        self.ns.set_multi(
+            {
+                'd2502ebbd7df41ceba8d3275595cac33': {
+                    'foo': 'bar',
+                },
+                '5394aa025b8e401ca6bc3ddee3130edc': {
+                    'foo': 'baz',
+                },
+            }
+        )
+
+        result = self.ns.get_multi(
+            ['d2502ebbd7df41ceba8d3275595cac33', '5394aa025b8e401ca6bc3ddee3130edc']
+        )
+        assert result == {
+            'd2502ebbd7df41ceba8d3275595cac33': {
+                'foo': 'bar',
+            },
+            '5394aa025b8e401ca6bc3ddee3130edc': {
+                'foo': 'baz',
+            },
+        }
+
+    def test_overwrite(self):
+        node_id = self.ns.create({
+            'foo': 'bar',
+        })
+        assert self.ns.get(node_id) == {
+            'foo': 'bar',
+        }
+
+        self.ns.set(node_id, {
+            'foo': 'baz',
+        })
+        assert self.ns.get(node_id) == {
+            'foo': 'baz',
+        }
+
+    def test_delete(self):
+        node_id = self.ns.create({
+            'foo': 'bar',
+        })
+
+        self.ns.delete(node_id)
+        assert self.ns.get(node_id) is None
+
+    def test_cleanup(self):
+        node_id = self.ns.create({
+            'foo': 'bar',
+        })
+
+        assert self.ns.cleanup(timezone.now() - timedelta(days=1)) == 0
+        assert self.ns.get(node_id) == {
+            'foo': 'bar',
+        }
+
+        assert self.ns.cleanup(timezone.now() + timedelta(days=1)) == 1
+        assert self.ns.get(node_id) is None
+        assert not [n for n in os.listdir(self.path) if n.endswith('.seg')]
@@ -2,10 +2,36 @@
 
 from __future__ import absolute_import
 
-from sentry.nodestore.base import NodeStorage
+from mock import patch
+from threading import Event
+
+from sentry.nodestore import base
+from sentry.nodestore.base import NodeStorage, WorkerPool
 from sentry.testutils import TestCase
 
 
+def get_node(nodes, blocked, id):
+    if blocked is not None and id == 'blocked':
+        blocked.wait()
+    value = nodes.get(id)
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+
+class InMemoryNodeStorage(NodeStorage):
+    def __init__(self, nodes, blocked=None):
+        self.nodes = nodes
+        self.blocked = blocked
+
+    def get(self, id):
+        return get_node(self.nodes, self.blocked, id)
+
+    def get_node_fetcher(self):
+        nodes, blocked = self.nodes, self.blocked
+        return lambda id: get_node(nodes, blocked, id)
+
+
 class NodeStorageTest(TestCase):
     def setUp(self):
         self.ns = NodeStorage()
@@ -13,3 +39,69 @@ class NodeStorageTest(TestCase):
     def test_generate_id(self):
         result = self.ns.generate_id()
         assert result
+
+    def test_get_multi(self):
+        ns = InMemoryNodeStorage({'a': {'foo': 'bar'}, 'b': {'foo': 'baz'}})
+        assert ns.get_multi(['a', 'b', 'c', 'a']) == {
+            'a': {'foo': 'bar'},
+            'b': {'foo': 'baz'},
+            'c': None,
+        }
+        assert ns.get_multi(['a']) == {'a': {'foo': 'bar'}}
+        assert ns.get_multi([]) == {}
+
+    @patch('sentry.nodestore.base.metrics')
+    def test_get_multi_error(self, metrics):
+        ns = InMemoryNodeStorage({'a': {'foo': 'bar'}, 'b': ValueError('b')})
+        assert ns.get_multi(['a', 'b']) == {'a': {'foo': 'bar'}, 'b': None}
+        metrics.incr.assert_called_once_with(
+            'nodestore.get_multi.error', tags={'backend': 'InMemoryNodeStorage'},
+        )
+
+    @patch('sentry.nodestore.base.metrics')
+    def test_get_multi_timeout(self, metrics):
+        blocked = Event()
+        ns = InMemoryNodeStorage({'a': {'foo': 'bar'}, 'blocked': {}}, blocked)
+        try:
+            with self.settings(SENTRY_NODESTORE_MULTIGET_TIMEOUT=0.1):
+                assert ns.get_multi(['a', 'blocked']) == {'a': {'foo': 'bar'}, 'blocked': None}
+        finally:
+            blocked.set()
+        metrics.incr.assert_called_once_with(
+            'nodestore.get_multi.timeout', amount=1, tags={'backend': 'InMemoryNodeStorage'},
+        )
+
+    def test_get_multi_skips_abandoned_fetches(self):
+        blocked = Event()
+        fetched = []
+
+        def fetch(id):
+            fetched.append(id)
+            blocked.wait()
+            return {}
+
+        class BlockingNodeStorage(NodeStorage):
+            def get_node_fetcher(self):
+                return fetch
+
+        pool = WorkerPool(1)
+        try:
+            with patch('sentry.nodestore.base.get_pool', return_value=pool), \
+                    self.settings(SENTRY_NODESTORE_MULTIGET_TIMEOUT=0.1):
+                assert BlockingNodeStorage().get_multi(['a', 'b']) == {'a': None, 'b': None}
+        finally:
+            blocked.set()
+
+        # Jobs run in order on the single thread, so once this one is done
+        # the abandoned fetch which was still queued has been skipped.
+        done = Event()
+        pool.submit(lambda: None, (), lambda ok, value: done.set())
+        assert done.wait(5)
+        assert len(fetched) == 1
+
+    def test_pool_is_created_per_process(self):
+        pool = base.get_pool()
+        assert base.get_pool() is pool
+
+        with patch('os.getpid', return_value=-1):
+            assert base.get_pool() is not pool
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import os
+import pytest
+import shutil
+import tempfile
+
+from sentry.nodestore.codecs import (
+    CodecManager, CompressedPickleCodec, DictionaryStore, HAS_ZSTD, IndexedJsonCodec,
+    LazyNodeData, ZstdCodec, get_dictionary_key, get_version
+)
+from sentry.testutils import TestCase
+from sentry.utils.strings import compress, decompress
+
+if HAS_ZSTD:
+    import zstandard
+
+
+def make_event(i):
+    return {
+        'message': 'Something happened %d' % i,
+        'sdk': {'name': 'sentry.python', 'version': '6.0.0'},
+        'sentry.interfaces.Exception': {
+            'values': [{
+                'type': 'ValueError',
+                'value': 'bad value %d' % i,
+                'stacktrace': {
+                    'frames': [{
+                        'filename': 'app/views.py',
+                        'function': 'handler_%d' % (i % 7),
+                        'lineno': i,
+                    }],
+                },
+            }],
+        },
+    }
+
+
+class CompressedPickleCodecTest(TestCase):
+    def test_reads_gzipped_dict_values(self):
+        data = {'foo': 'bar'}
+        value = CompressedPickleCodec().encode(data)
+        assert get_version(value) is None
+        # The legacy codec must stay compatible with ``GzippedDictField``.
+        assert decompress(compress(value)) == value
+        assert CodecManager(CompressedPickleCodec()).decode(value) == data
+
+    def test_get_dictionary_key(self):
+        assert get_dictionary_key({'sdk': {'name': 'sentry.python'}}) == 'sentry.python'
+        assert get_dictionary_key({'sdk': None}) is None
+        assert get_dictionary_key({}) is None
+
+
+@pytest.mark.skipif(not HAS_ZSTD, reason='zstandard is not installed')
+class ZstdCodecTest(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def train(self):
+        from sentry.utils import json
+
+        samples = [json.dumps(make_event(i)) for i in range(500)]
+        store = DictionaryStore(self.path)
+        return store.save('sentry.python', zstandard.train_dictionary(4096, samples))
+
+    def test_without_dictionary(self):
+        codec = ZstdCodec()
+        value = codec.encode(make_event(1))
+        assert get_version(value) == ZstdCodec.version
+        assert codec.decode(value) == make_event(1)
+
+    def test_with_dictionary(self):
+        path = self.train()
+        assert os.path.exists(path)
+
+        codec = ZstdCodec(dictionaries=self.path)
+        value = codec.encode(make_event(1))
+        assert ZstdCodec.header.unpack_from(value)[2] != 0
+        assert len(value) < len(ZstdCodec().encode(make_event(1)))
+        assert codec.decode(value) == make_event(1)
+
+        # Payloads from other SDKs are compressed without a dictionary.
+        other = {'sdk': {'name': 'sentry.java'}}
+        value = codec.encode(other)
+        assert ZstdCodec.header.unpack_from(value)[2] == 0
+        assert codec.decode(value) == other
+
+    def test_unknown_dictionary(self):
+        self.train()
+        value = ZstdCodec(dictionaries=self.path).encode(make_event(1))
+        with pytest.raises(ValueError):
+            ZstdCodec().decode(value)
+
+    def test_reloads_dictionaries(self):
+        # A process which started before the dictionary was trained.
+        codec = ZstdCodec(dictionaries=self.path)
+        self.train()
+        value = ZstdCodec(dictionaries=self.path).encode(make_event(1))
+        assert ZstdCodec.header.unpack_from(value)[2] != 0
+        assert codec.decode(value) == make_event(1)
+
+    def test_manager_reads_values_of_other_codecs(self):
+        self.train()
+        with self.settings(SENTRY_NODESTORE_DICTIONARIES=self.path):
+            value = ZstdCodec().encode(make_event(1))
+            manager = CodecManager(IndexedJsonCodec())
+            assert manager.decode(value) == make_event(1)
+
+    def test_encodes_lazy_node_data(self):
+        data = IndexedJsonCodec().decode(IndexedJsonCodec().encode(make_event(1)))
+        assert isinstance(data, LazyNodeData)
+
+        codec = ZstdCodec()
+        assert codec.decode(codec.encode(data)) == make_event(1)
+
+    def test_manager_reads_legacy_values(self):
+        manager = CodecManager(ZstdCodec())
+        legacy = CompressedPickleCodec().encode({'foo': 'bar'})
+        assert manager.decode(legacy) == {'foo': 'bar'}
+        assert manager.decode(manager.encode({'foo': 'baz'})) == {'foo': 'baz'}
+
+
+class IndexedJsonCodecTest(TestCase):
+    def test_round_trip(self):
+        data = make_event(1)
+        value = IndexedJsonCodec().encode(data)
+        assert get_version(value) == IndexedJsonCodec.version
+
+        result = CodecManager(CompressedPickleCodec()).decode(value)
+        assert isinstance(result, LazyNodeData)
+        assert sorted(result) == sorted(data)
+        assert result.values == {}
+        assert result['sdk'] == data['sdk']
+        assert list(result.values) == ['sdk']
+        assert result.materialize() == data
+
+    def test_mutation(self):
+        result = IndexedJsonCodec().decode(IndexedJsonCodec().encode(make_event(1)))
+        result['foo'] = 'bar'
+        del result['message']
+        assert result.pop('sdk')['name'] == 'sentry.python'
+        assert sorted(result.materialize()) == ['foo', 'sentry.interfaces.Exception']
+
+    def test_other_codecs_encode_lazy_node_data(self):
+        data = IndexedJsonCodec().decode(IndexedJsonCodec().encode(make_event(1)))
+
+        value = CompressedPickleCodec().encode(data)
+        decoded = CompressedPickleCodec().decode(value)
+        assert type(decoded) is dict
+        assert decoded == make_event(1)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pytest
+
+from datetime import timedelta
+from django.utils import timezone
+from mock import patch
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.tiered.backend import TieredNodeStorage
+from sentry.testutils import TestCase
+from sentry.utils.dates import to_timestamp
+from sentry.utils.redis import clusters
+
+
+class InMemoryBackend(NodeStorage):
+    def __init__(self, data):
+        self._data = data
+
+    def set(self, id, data):
+        self._data[id] = data
+
+    def get(self, id):
+        return self._data.get(id)
+
+    def delete(self, id):
+        self._data.pop(id, None)
+
+
+class TieredNodeStorageTest(TestCase):
+    def setUp(self):
+        self.hot = {}
+        self.cold = {}
+        self.ns = TieredNodeStorage(
+            hot=InMemoryBackend,
+            hot_options={'data': self.hot},
+            cold=InMemoryBackend,
+            cold_options={'data': self.cold},
+            migrate_after=60,
+            batch_size=2,
+        )
+
+    def tearDown(self):
+        with clusters.get('default').all() as client:
+            client.flushdb()
+
+    def set_at(self, timestamp, id, data):
+        with patch('sentry.nodestore.tiered.backend.time', return_value=timestamp):
+            self.ns.set(id, data)
+
+    def test_migrate(self):
+        now = to_timestamp(timezone.now())
+        for i in range(3):
+            self.set_at(now - 120, 'old-%d' % i, {'i': i})
+        self.set_at(now, 'new', {'i': 3})
+
+        assert self.ns.get_backlog() == {'hot': 4, 'pending': 3}
+        assert self.ns.migrate() == 3
+        assert self.ns.get_backlog() == {'hot': 1, 'pending': 0}
+
+        assert sorted(self.hot) == ['new']
+        assert sorted(self.cold) == ['old-0', 'old-1', 'old-2']
+        assert self.ns.get_multi(['old-0', 'new']) == {
+            'old-0': {'i': 0},
+            'new': {'i': 3},
+        }
+
+    def test_migrate_keeps_unread_nodes(self):
+        now = to_timestamp(timezone.now())
+        for i in range(2):
+            self.set_at(now - 120, 'old-%d' % i, {'i': i})
+        self.set_at(now - 120, 'gone', {'i': 2})
+        del self.hot['gone']
+
+        def get_multi(id_list):
+            # the read of ``old-1`` failed
+            return dict((id, self.hot.get(id)) for id in id_list if id != 'old-1')
+
+        with patch.object(self.ns.hot, 'get_multi', side_effect=get_multi):
+            assert self.ns.migrate() == 1
+
+        assert sorted(self.hot) == ['old-1']
+        assert sorted(self.cold) == ['old-0']
+        assert self.ns.get_backlog() == {'hot': 1, 'pending': 1}
+
+        with patch.object(self.ns.hot, 'get_multi', side_effect=ValueError):
+            with pytest.raises(ValueError):
+                self.ns.migrate()
+        assert self.ns.get_backlog() == {'hot': 1, 'pending': 1}
+
+        assert self.ns.migrate() == 1
+        assert sorted(self.cold) == ['old-0', 'old-1']
+        assert self.ns.get_backlog() == {'hot': 0, 'pending': 0}
+
+    def test_migrate_limit(self):
+        now = to_timestamp(timezone.now())
+        for i in range(3):
+            self.set_at(now - 120, 'old-%d' % i, {'i': i})
+
+        assert self.ns.migrate(limit=1) == 1
+        assert self.ns.get_backlog() == {'hot': 2, 'pending': 2}
+
+    def test_delete(self):
+        self.set_at(to_timestamp(timezone.now() - timedelta(minutes=2)), 'a', {'foo': 'bar'})
+        self.ns.migrate()
+        self.ns.set('b', {'foo': 'baz'})
+
+        self.ns.delete_multi(['a', 'b'])
+        assert self.ns.get_multi(['a', 'b']) == {'a': None, 'b': None}
+        assert self.ns.get_backlog() == {'hot': 0, 'pending': 0}
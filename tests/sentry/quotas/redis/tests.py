@@ -10,6 +10,8 @@ from exam import fixture, patcher
 
 from sentry.quotas.redis import (
     is_rate_limited,
+    is_rate_limited_multi,
+    lease,
     BasicRedisQuota,
     RedisQuota,
 )
@@ -45,6 +47,32 @@ def test_is_rate_limited_script():
     assert 119 <= client.ttl('bar') <= 120
 
 
+def test_is_rate_limited_multi_script():
+    now = int(time.time())
+
+    cluster = clusters.get('default')
+    client = cluster.get_local_client(six.next(iter(cluster.hosts)))
+
+    # The first and third items are checked against both quotas, the second
+    # item only against the second quota (2).
+    results = is_rate_limited_multi(
+        client,
+        ('multi:foo', 'multi:bar'),
+        (1, now + 60, 2, now + 120, 2, 1, 2, 1, 2, 2, 1, 2),
+    )
+    assert [list(map(bool, result)) for result in results] == [
+        [False, False],
+        [False],
+        [True, True],
+    ]
+
+    assert client.get('multi:foo') == '1'
+    assert 59 <= client.ttl('multi:foo') <= 60
+
+    assert client.get('multi:bar') == '2'
+    assert 119 <= client.ttl('multi:bar') <= 120
+
+
 class RedisQuotaTest(TestCase):
     quota = fixture(RedisQuota)
 
@@ -132,6 +160,97 @@ class RedisQuotaTest(TestCase):
 
         assert self.quota.is_rate_limited(self.project).is_limited
 
+    def test_caches_compiled_quotas(self):
+        self.get_project_quota.return_value = (200, 60)
+        self.get_organization_quota.return_value = (300, 60)
+
+        with mock.patch.object(RedisQuota, 'get_quotas', wraps=self.quota.get_quotas) as get_quotas:
+            self.quota.is_rate_limited(self.project)
+            self.quota.is_rate_limited(self.project)
+            assert get_quotas.call_count == 1
+
+            # Quotas are compiled for each project key separately.
+            key = self.create_project_key(project=self.project)
+            self.quota.is_rate_limited(self.project, key=key)
+            assert get_quotas.call_count == 2
+
+            # Changes to the organization discard the cached quotas.
+            self.organization.save()
+            self.quota.is_rate_limited(self.project)
+            assert get_quotas.call_count == 3
+
+            # So do changes to the system rate limit.
+            with self.options({'system.rate-limit': 1000}):
+                self.quota.is_rate_limited(self.project)
+            assert get_quotas.call_count == 4
+
+    @mock.patch('sentry.quotas.redis.is_rate_limited', return_value=(True, False))
+    def test_remembers_exhausted_quotas(self, is_rate_limited):
+        self.get_organization_quota.return_value = (100, 60)
+        self.get_project_quota.return_value = (200, 60)
+
+        timestamp = int(time.time())
+        first = self.quota.is_rate_limited(self.project, timestamp=timestamp)
+        assert first.is_limited
+        assert is_rate_limited.call_count == 1
+
+        second = self.quota.is_rate_limited(self.project, timestamp=timestamp + 1)
+        assert second.is_limited
+        assert second.reason_code == first.reason_code
+        assert second.retry_after == first.retry_after - 1
+        assert is_rate_limited.call_count == 1
+
+        # Once the period has ended, the quota is checked again.
+        is_rate_limited.return_value = (False, False)
+        assert not self.quota.is_rate_limited(
+            self.project, timestamp=timestamp + first.retry_after).is_limited
+        assert is_rate_limited.call_count == 2
+
+    def test_leases(self):
+        self.get_project_quota.return_value = (100, 60)
+        self.get_organization_quota.return_value = (0, 60)
+
+        quota = RedisQuota(lease_fraction=0.1)
+        timestamp = time.time()
+        with mock.patch('sentry.quotas.redis.lease', wraps=lease) as lease_script:
+            results = [
+                quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+                for _ in xrange(120)
+            ]
+            assert results == [False] * 100 + [True] * 20
+            assert lease_script.call_count == 11
+
+        assert quota.get_usage(
+            self.project.organization_id,
+            quota.get_quotas(self.project),
+            timestamp=timestamp,
+        ) == [100, None]
+
+    def test_is_rate_limited_multi(self):
+        self.get_project_quota.return_value = (2, 60)
+        self.get_organization_quota.return_value = (0, 60)
+
+        other = self.create_project(organization=self.organization)
+        timestamp = time.time()
+
+        results = self.quota.is_rate_limited_multi(
+            [(self.project, None), (other, None), (self.project, None), (self.project, None)],
+            timestamp=timestamp,
+        )
+        assert [result.is_limited for result in results] == [False, False, False, True]
+        assert results[3].reason_code == 'project_quota'
+
+        # Items checked in batches and one at a time share counters.
+        assert not self.quota.is_rate_limited(other, timestamp=timestamp).is_limited
+        assert self.quota.is_rate_limited(other, timestamp=timestamp).is_limited
+
+    @mock.patch('sentry.quotas.redis.is_rate_limited_multi')
+    @mock.patch.object(RedisQuota, 'get_quotas', return_value=[])
+    def test_multi_bails_immediately_without_any_quota(self, get_quotas, is_rate_limited_multi):
+        results = self.quota.is_rate_limited_multi([(self.project, None)] * 2)
+        assert not is_rate_limited_multi.called
+        assert [result.is_limited for result in results] == [False, False]
+
     def test_get_usage(self):
         timestamp = time.time()
 
@@ -2,6 +2,9 @@
 
 from __future__ import absolute_import
 
+import mock
+
+from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.redis import RedisRateLimiter
 from sentry.testutils import TestCase
 
@@ -17,3 +20,56 @@ class RedisRateLimiterTest(TestCase):
     def test_simple_key(self):
         assert not self.backend.is_limited('foo', 1)
         assert self.backend.is_limited('foo', 1)
+
+    def test_is_limited_multi(self):
+        requests = [
+            {'key': 'foo', 'limit': 1, 'project': self.project},
+            {'key': 'foo', 'limit': 2},
+            {'key': 'foo', 'limit': 1, 'project': self.project},
+            {'key': 'foo', 'limit': 2},
+        ]
+        assert self.backend.is_limited_multi(requests) == [False, False, True, False]
+        assert self.backend.is_limited('foo', 2)
+
+
+class GCRARedisRateLimiterTest(TestCase):
+    def setUp(self):
+        self.backend = RedisRateLimiter(algorithm='gcra')
+
+    def test_project_key(self):
+        assert not self.backend.is_limited('foo', 1, self.project)
+        assert self.backend.is_limited('foo', 1, self.project)
+
+    def test_simple_key(self):
+        assert not self.backend.is_limited('foo', 1)
+        assert self.backend.is_limited('foo', 1)
+
+    def test_limit_is_spread_over_window(self):
+        with mock.patch('sentry.ratelimits.redis.time') as time:
+            time.return_value = 1000.0
+            for _ in range(10):
+                assert not self.backend.is_limited('foo', 10, window=60)
+            assert self.backend.is_limited('foo', 10, window=60)
+
+            # The next request is allowed once a tenth of the window has
+            # passed (rather than at the start of the next window.)
+            time.return_value = 1005.0
+            assert self.backend.is_limited('foo', 10, window=60)
+            time.return_value = 1006.0
+            assert not self.backend.is_limited('foo', 10, window=60)
+            assert self.backend.is_limited('foo', 10, window=60)
+
+    def test_is_limited_multi(self):
+        requests = [
+            {'key': 'foo', 'limit': 1, 'project': self.project},
+            {'key': 'foo', 'limit': 2},
+            {'key': 'foo', 'limit': 1, 'project': self.project},
+            {'key': 'foo', 'limit': 2},
+            {'key': 'bar', 'limit': 0},
+        ]
+        assert self.backend.is_limited_multi(requests) == [False, False, True, False, True]
+        assert self.backend.is_limited('foo', 2)
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(InvalidConfiguration):
+            RedisRateLimiter(algorithm='unknown')
@@ -109,6 +109,33 @@ class FrequencyConditionMixin(object):
 
         self.assertPasses(rule, event)
 
+    def test_shares_results_through_state(self):
+        event = self.get_event()
+        self.increment(event, 5)
+
+        state = self.get_state()
+        lower = self.get_rule({
+            'interval': '1h',
+            'value': six.text_type(4),
+        })
+        higher = self.get_rule({
+            'interval': '1h',
+            'value': six.text_type(5),
+        })
+
+        with mock.patch.object(self.rule_cls, 'query', autospec=True, return_value=5) as query:
+            assert lower.passes(event, state) is True
+            assert higher.passes(event, state) is False
+            assert query.call_count == 1
+
+            # Other intervals are queried separately.
+            other = self.get_rule({
+                'interval': '1d',
+                'value': six.text_type(4),
+            })
+            assert other.passes(event, state) is True
+            assert query.call_count == 2
+
 
 class EventFrequencyConditionTestCase(FrequencyConditionMixin, RuleTestCase):
     rule_cls = EventFrequencyCondition
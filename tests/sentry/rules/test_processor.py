@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.utils import timezone
+from mock import patch
 
 from sentry.models import GroupRuleStatus, Rule
 from sentry.plugins import plugins
@@ -54,6 +55,79 @@ class RuleProcessorTest(TestCase):
         results = list(rp.apply())
         assert len(results) == 1
 
+    def test_reuses_compiled_rules(self):
+        event = self.create_event()
+
+        Rule.objects.filter(project=event.project).delete()
+        Rule.objects.create(
+            project=event.project,
+            data={
+                'conditions': [
+                    {
+                        'id': 'sentry.rules.conditions.every_event.EveryEventCondition',
+                    },
+                ],
+                'actions': [
+                    {
+                        'id': 'sentry.rules.actions.notify_event.NotifyEventAction',
+                    },
+                ],
+            }
+        )
+
+        rp = RuleProcessor(event, is_new=True, is_regression=True, is_sample=False)
+        plans = rp.get_plans()
+        assert len(plans) == 1
+
+        with patch('sentry.rules.processor.compile_rule') as compile_rule:
+            assert rp.get_plans() == plans
+            assert not compile_rule.called
+
+        # Changing any rule discards the compiled rules.
+        rule = plans[0].rule
+        rule.data['action_match'] = 'any'
+        rule.save()
+        plans = rp.get_plans()
+        assert [plan.match for plan in plans] == ['any']
+
+        other = Rule.objects.create(
+            project=event.project,
+            data={
+                'conditions': [
+                    {
+                        'id': 'sentry.rules.conditions.every_event.EveryEventCondition',
+                    },
+                ],
+            }
+        )
+        assert set(plan.rule.id for plan in rp.get_plans()) == set([rule.id, other.id])
+
+        # Only the rules that are currently active for the project are applied.
+        with patch.object(RuleProcessor, 'get_rules', return_value=[rule]):
+            assert [plan.rule.id for plan in rp.get_plans()] == [rule.id]
+
+    def test_fetches_rule_statuses_in_bulk(self):
+        event = self.create_event()
+        rules = [
+            Rule.objects.create(
+                project=event.project,
+                data={
+                    'conditions': [
+                        {
+                            'id': 'sentry.rules.conditions.every_event.EveryEventCondition',
+                        },
+                    ],
+                }
+            ) for _ in range(3)
+        ]
+
+        rp = RuleProcessor(event, is_new=True, is_regression=True, is_sample=False)
+        statuses = rp.get_rule_statuses(rules)
+        assert sorted(statuses.keys()) == sorted(rule.id for rule in rules)
+
+        with self.assertNumQueries(1):
+            assert rp.get_rule_statuses(rules) == statuses
+
 
 class EventCompatibilityProxyTest(TestCase):
     def test_simple(self):
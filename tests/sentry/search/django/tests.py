@@ -3,6 +3,7 @@
 from __future__ import absolute_import
 
 from datetime import datetime, timedelta
+from mock import patch
 
 from sentry import tagstore
 from sentry.models import (
@@ -121,6 +122,21 @@ class DjangoSearchBackendTest(TestCase):
         assert len(results) == 1
         assert results[0] == self.group2
 
+    def test_query_full_text(self):
+        backend = DjangoSearchBackend(full_text=True)
+
+        results = backend.query(self.project1, query='foo')
+        assert len(results) == 1
+        assert results[0] == self.group1
+
+        results = backend.query(self.project1, query='f%o')
+        assert len(results) == 0
+
+        self.group2.update(culprit='app.views.barbaz')
+        results = backend.query(self.project1, query='barbaz')
+        assert len(results) == 1
+        assert results[0] == self.group2
+
     def test_sort(self):
         results = self.backend.query(self.project1, sort_by='date')
         assert len(results) == 2
@@ -266,6 +282,118 @@ class DjangoSearchBackendTest(TestCase):
         assert results[0] == self.group1
         assert results[1] == self.group2
 
+    def index_events(self, backend, events):
+        # the fixtures are old, so record them as if the index was enabled
+        # before they were received
+        with patch('sentry.search.django.index.time', return_value=0):
+            for event in events:
+                backend.index_event(event)
+
+    def test_date_filter_active_groups(self):
+        # the fixtures are old, so retain the index buckets for long enough
+        backend = DjangoSearchBackend(
+            active_groups_cluster='default',
+            active_groups_retention=365 * 100,
+        )
+        self.index_events(backend, (self.event1, self.event2, self.event3))
+
+        assert backend.active_groups.get_group_ids(
+            self.project1.id,
+            self.event2.datetime,
+        ) == set([self.group1.id, self.group2.id])
+
+        results = backend.query(
+            self.project1,
+            date_from=self.event2.datetime,
+        )
+        assert len(results) == 2
+        assert results[0] == self.group1
+        assert results[1] == self.group2
+
+        results = backend.query(
+            self.project1,
+            date_from=self.event1.datetime,
+            date_to=self.event1.datetime + timedelta(minutes=1),
+        )
+        assert len(results) == 1
+        assert results[0] == self.group1
+
+        results = backend.query(
+            self.project2,
+            date_from=self.event2.datetime,
+        )
+        assert len(results) == 0
+
+    def test_date_filter_active_groups_before_index(self):
+        backend = DjangoSearchBackend(
+            active_groups_cluster='default',
+            active_groups_retention=365 * 100,
+        )
+        # event2 was received before the index was enabled
+        backend.index_event(self.event3)
+
+        assert backend.active_groups.get_group_ids(
+            self.project1.id,
+            self.event2.datetime,
+        ) is None
+        assert backend.active_groups.get_group_ids(
+            self.project1.id,
+            end=self.event2.datetime,
+        ) is None
+
+        results = backend.query(
+            self.project1,
+            date_from=self.event2.datetime,
+        )
+        assert len(results) == 2
+        assert results[0] == self.group1
+        assert results[1] == self.group2
+
+    def test_date_filter_active_groups_outside_retention(self):
+        backend = DjangoSearchBackend(
+            active_groups_cluster='default',
+            active_groups_retention=1,
+        )
+        self.index_events(backend, (self.event1, self.event2, self.event3))
+
+        assert backend.active_groups.get_group_ids(
+            self.project1.id,
+            self.event2.datetime,
+        ) is None
+
+        results = backend.query(
+            self.project1,
+            date_from=self.event2.datetime,
+        )
+        assert len(results) == 2
+
+    def test_date_filter_active_groups_over_limit(self):
+        backend = DjangoSearchBackend(
+            active_groups_cluster='default',
+            active_groups_retention=365 * 100,
+            active_groups_limit=1,
+        )
+        self.index_events(backend, (self.event1, self.event2, self.event3))
+
+        assert backend.active_groups.get_group_ids(
+            self.project1.id,
+            self.event2.datetime,
+        ) == set([self.group1.id, self.group2.id])
+        assert backend.active_groups.get_group_ids(
+            self.project1.id,
+            self.event2.datetime,
+            limit=1,
+        ) is None
+
+        # Too many groups to filter on, the events are queried instead.
+        results = backend.query(
+            self.project1,
+            date_from=self.event2.datetime,
+        )
+        assert len(results) == 2
+        assert results[0] == self.group1
+        assert results[1] == self.group2
+
     def test_unassigned(self):
         results = self.backend.query(self.project1, unassigned=True)
         assert len(results) == 1
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from datetime import datetime
+
+from sentry.models import Group, GroupAssignee, GroupStatus
+from sentry.search.django.backend import DjangoSearchBackend
+from sentry.search.memory.backend import MemorySearchBackend
+from tests.sentry.search.django import tests as django_tests
+
+
+class MemorySearchBackendTest(django_tests.DjangoSearchBackendTest):
+    def create_backend(self):
+        return MemorySearchBackend()
+
+    def test_group_save_updates_index(self):
+        results = self.backend.query(self.project1, status=GroupStatus.RESOLVED)
+        assert list(results) == [self.group2]
+
+        self.group1.status = GroupStatus.RESOLVED
+        self.group1.save()
+
+        results = self.backend.query(self.project1, status=GroupStatus.RESOLVED)
+        assert len(results) == 2
+
+    def test_group_create_updates_index(self):
+        results = self.backend.query(self.project1)
+        assert len(results) == 2
+
+        group = self.create_group(
+            project=self.project1,
+            checksum='c' * 32,
+            last_seen=datetime(2013, 8, 14, 3, 8, 24, 880386),
+        )
+
+        results = self.backend.query(self.project1)
+        assert len(results) == 3
+        assert results[0] == group
+
+    def test_assignee_delete_updates_index(self):
+        results = self.backend.query(self.project1, unassigned=True)
+        assert list(results) == [self.group1]
+
+        GroupAssignee.objects.filter(group=self.group2).delete()
+
+        results = self.backend.query(self.project1, unassigned=True)
+        assert len(results) == 2
+
+    def test_stale_index_is_rebuilt(self):
+        self.backend.max_age = 0
+        results = self.backend.query(self.project1, status=GroupStatus.RESOLVED)
+        assert list(results) == [self.group2]
+
+        # queryset updates do not send signals
+        Group.objects.filter(id=self.group1.id).update(
+            status=GroupStatus.RESOLVED,
+        )
+
+        results = self.backend.query(self.project1, status=GroupStatus.RESOLVED)
+        assert len(results) == 2
+
+    def test_keyset_cursors_are_interchangeable(self):
+        django_backend = DjangoSearchBackend()
+        paginator_options = {'keyset': True}
+
+        for sort_by in ('date', 'new', 'priority', 'freq'):
+            for first, second in (
+                (self.backend, django_backend),
+                (django_backend, self.backend),
+            ):
+                def query(backend, cursor=None):
+                    return backend.query(
+                        self.project1,
+                        sort_by=sort_by,
+                        limit=1,
+                        cursor=cursor,
+                        paginator_options=paginator_options,
+                    )
+
+                results = query(first)
+                assert len(results) == 1
+
+                # A cursor from one backend continues where it left off
+                # with the other backend, in both directions.
+                expected = query(first, results.next)
+                next_results = query(second, results.next)
+                assert len(expected) == 1
+                assert list(next_results) == list(expected)
+                assert next_results.next.value == expected.next.value
+                assert next_results.next.offset == expected.next.offset
+
+                assert list(query(second, next_results.prev)) == list(results)
@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+
+from exam import fixture
+from mock import patch
+
+from sentry.similarity.backends.cache import ComparisonCacheWrapper
+from sentry.similarity.backends.memory import MinHashIndexBackend
+from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.testutils import TestCase
+
+
+signature_builder = MinHashSignatureBuilder(32, 0xFFFF)
+
+
+class ComparisonCacheWrapperTestCase(TestCase):
+    @fixture
+    def backend(self):
+        return MinHashIndexBackend(signature_builder, 16, 60 * 60, 12, 10)
+
+    @fixture
+    def index(self):
+        return ComparisonCacheWrapper(self.backend)
+
+    def test_compare_is_cached(self):
+        self.index.record('example', '1', [('index', 'hello world')])
+        self.index.record('example', '2', [('index', 'hello world')])
+
+        expected = self.backend.compare('example', '1', [('index', 0)])
+        assert [key for key, _ in expected] == ['1', '2']
+
+        with patch.object(self.backend, 'compare', wraps=self.backend.compare) as compare:
+            assert self.index.compare('example', '1', [('index', 0)]) == expected
+            assert self.index.compare('example', '1', [('index', 0)]) == expected
+            assert compare.call_count == 1
+
+            # Different parameters are cached separately.
+            assert self.index.compare('example', '1', [('index', 0)], limit=1) == expected[:1]
+            assert compare.call_count == 2
+
+            # Scopes are cached separately.
+            assert self.index.compare('other', '1', [('index', 0)]) == []
+            assert compare.call_count == 3
+
+    def test_changes_invalidate_cached_results(self):
+        self.index.record('example', '1', [('index', 'hello world')])
+        self.index.record('example', '2', [('index', 'hello world')])
+        self.index.record('example', '3', [('index', 'hello world')])
+        self.index.record('other', '1', [('index', 'hello world')])
+
+        def get_keys(key='1'):
+            return [k for k, _ in self.index.compare('example', key, [('index', 0)])]
+
+        assert get_keys() == ['1', '2', '3']
+
+        self.index.merge('example', '1', [('index', '2')])
+        assert get_keys() == ['1', '3']
+
+        self.index.delete('example', [('index', '3')])
+        assert get_keys() == ['1']
+
+        assert get_keys('4') == []
+        data = self.index.export('other', [('index', '1')])
+        self.index.import_('example', [('index', '4', data[0])])
+        assert get_keys('4') == ['1', '4']
+
+        self.index.flush('example', ['index'])
+        assert get_keys() == []
+
+    def test_unrelated_changes_keep_cached_results(self):
+        self.index.record('example', '1', [('index', 'hello world')])
+        self.index.record('example', '2', [('index', 'hello world')])
+
+        def get_keys():
+            return [key for key, _ in self.index.compare('example', '1', [('index', 0)])]
+
+        assert get_keys() == ['1', '2']
+
+        with patch.object(self.backend, 'compare', wraps=self.backend.compare) as compare:
+            # Changes to keys which are not part of the results, and changes
+            # in other scopes, don't invalidate results.
+            self.index.record('example', '3', [('index', 'hello world')])
+            self.index.record('other', '2', [('index', 'hello world')])
+            assert get_keys() == ['1', '2']
+            assert compare.call_count == 0
+
+            self.index.record('example', '2', [('index', 'hello world')])
+            assert get_keys() == ['1', '2', '3']
+            assert compare.call_count == 1
@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import time
+
+from exam import fixture
+
+from sentry.similarity.backends.memory import MinHashIndexBackend
+from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.testutils import TestCase
+
+from .base import MinHashIndexBackendTestMixin
+
+
+signature_builder = MinHashSignatureBuilder(32, 0xFFFF)
+
+
+class MinHashIndexBackendTestCase(MinHashIndexBackendTestMixin, TestCase):
+    @fixture
+    def index(self):
+        return MinHashIndexBackend(
+            signature_builder,
+            16,
+            60 * 60,
+            12,
+            10,
+        )
+
+    def test_export_import(self):
+        self.index.record('example', '1', [('index', 'hello world')])
+
+        timestamp = int(time.time())
+        result = self.index.export('example', [('index', '1')], timestamp=timestamp)
+        assert len(result) == 1
+
+        # Copy the data from key 1 to key 2.
+        self.index.import_('example', [('index', '2', result[0])], timestamp=timestamp)
+        assert self.index.export('example', [('index', '2')], timestamp=timestamp) == result
+        assert self.index.compare('example', '2', [('index', 0)]) == [
+            ('1', [1.0]),
+            ('2', [1.0]),
+        ]
+
+        # Copy the data again to key 2 (duplicating all of the data.)
+        self.index.import_('example', [('index', '2', result[0])], timestamp=timestamp)
+        data, expiration = self.index.export('example', [('index', '2')], timestamp=timestamp)[0]
+        assert all(value[0] == 2 for buckets in data for value in buckets.values())
+
+        assert self.index.export('example', [('index', 'missing')]) == [[]]
+
+    def test_expiration(self):
+        timestamp = int(time.time())
+        self.index.record('example', '1', [('index', 'hello world')], timestamp=timestamp)
+
+        expired = timestamp + self.index.interval * (self.index.retention + 1)
+        assert self.index.classify(
+            'example', [('index', 0, 'hello world')], timestamp=timestamp
+        ) == [('1', [1.0])]
+        assert self.index.classify(
+            'example', [('index', 0, 'hello world')], timestamp=expired
+        ) == []
+
+        self.index.expire(expired)
+        assert self.index.frequencies == {}
+        assert self.index.memberships == {}
+
+    def test_dump_load(self):
+        self.index.record('example', '1', [('index', 'hello world')])
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'index')
+        self.index.dump(path)
+
+        index = MinHashIndexBackend(signature_builder, 16, 60 * 60, 12, 10)
+        index.load(path)
+        assert index.classify('example', [('index', 0, 'hello world')]) == [('1', [1.0])]
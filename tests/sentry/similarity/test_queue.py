@@ -0,0 +1,34 @@
+from __future__ import absolute_import
+
+from sentry.similarity.queue import IndexQueue
+from sentry.testutils import TestCase
+from sentry.utils import redis
+
+
+class IndexQueueTestCase(TestCase):
+    def setUp(self):
+        self.queue = IndexQueue(
+            redis.clusters.get('default').get_local_client(0),
+            'sim:q:test',
+            max_size=3,
+        )
+
+    def test_queue(self):
+        group1 = self.create_group()
+        group2 = self.create_group()
+        events = [self.create_event(group=group1) for _ in range(4)]
+        other = self.create_event(group=group2)
+
+        for event in events + [other]:
+            self.queue.add(event)
+
+        assert sorted(self.queue.get_pending()) == sorted([
+            (group1.project_id, group1.id),
+            (group2.project_id, group2.id),
+        ])
+        assert self.queue.get_pending() == []
+
+        # Only the most recent events are kept.
+        assert self.queue.pop(group1.project_id, group1.id) == [e.id for e in events[1:]]
+        assert self.queue.pop(group1.project_id, group1.id) == []
+        assert self.queue.pop(group2.project_id, group2.id) == [other.id]
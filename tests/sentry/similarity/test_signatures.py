@@ -1,9 +1,14 @@
 from __future__ import absolute_import
 
+import pytest
+import random
+
 from collections import Counter
 from unittest import TestCase
 
-from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.similarity.signatures import (
+    HAS_NUMPY, MinHashSignatureBuilder, VectorizedMinHashSignatureBuilder
+)
 
 
 class MinHashSignatureBuilderTestCase(TestCase):
@@ -38,3 +43,38 @@ class MinHashSignatureBuilderTestCase(TestCase):
             estimation,
             delta=0.1,  # totally made up constant, seems reasonable
         )
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason='numpy is not installed')
+class VectorizedMinHashSignatureBuilderTestCase(TestCase):
+    def test_compatible_signatures(self):
+        reference = MinHashSignatureBuilder(16, 0xFFFF)
+        get_signature = VectorizedMinHashSignatureBuilder(16, 0xFFFF)
+        get_vectorized_signature = VectorizedMinHashSignatureBuilder(16, 0xFFFF)
+        get_vectorized_signature.fixed_cost = get_vectorized_signature.block_cost = 0
+
+        generator = random.Random(0)
+        for i in range(100):
+            features = [
+                ''.join(chr(generator.randint(0, 255)) for _ in range(generator.randint(0, 64)))
+                for _ in range(generator.randint(1, 100))
+            ]
+            assert get_signature(features) == reference(features)
+            assert get_vectorized_signature(features) == reference(features)
+
+    def test_fast_signatures(self):
+        n = 128
+        r = 0xFFFF
+        get_signature = VectorizedMinHashSignatureBuilder(n, r, compatible=False)
+        assert get_signature(set(['foo', 'bar'])) == get_signature(set(['bar', 'foo']))
+
+        signature = get_signature('hello world')
+        assert len(signature) == n
+        for value in signature:
+            assert 0 <= value < r
+
+        a = set('the quick grown box jumps over the hazy fog'.split())
+        b = set('the quick brown fox jumps over the lazy dog'.split())
+        similarity = len(a & b) / float(len(a | b))
+        estimation = sum(x == y for x, y in zip(get_signature(a), get_signature(b))) / float(n)
+        self.assertAlmostEqual(similarity, estimation, delta=0.1)
@@ -0,0 +1,58 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.models import Event
+from sentry.similarity.queue import IndexQueue
+from sentry.tasks.similarity import process_pending
+from sentry.testutils import TestCase
+from sentry.utils import redis
+
+queue = IndexQueue(redis.clusters.get('default').get_local_client(0), 'sim:q:test')
+
+
+@patch('sentry.similarity.index_queue', new=queue)
+class ProcessPendingTest(TestCase):
+    @patch('sentry.similarity.features.record')
+    def test_records_events_in_batches(self, record):
+        group1 = self.create_group()
+        group2 = self.create_group()
+        events1 = [self.create_event(group=group1) for _ in range(3)]
+        events2 = [self.create_event(group=group2)]
+        for event in events1 + events2:
+            queue.add(event)
+
+        with self.tasks():
+            process_pending()
+
+        assert sorted([e.id for e in call[0][0]] for call in record.call_args_list) == \
+            sorted([[e.id for e in events1], [e.id for e in events2]])
+
+        record.reset_mock()
+        with self.tasks():
+            process_pending()
+        assert not record.called
+
+    @patch('sentry.similarity.features.record')
+    def test_records_events_by_current_group(self, record):
+        source = self.create_group()
+        destination = self.create_group()
+        events = [self.create_event(group=source) for _ in range(2)]
+        deleted = self.create_event(group=source)
+        for event in events + [deleted]:
+            queue.add(event)
+
+        # Events may be merged into another group or deleted before they are
+        # recorded.
+        Event.objects.filter(id=events[1].id).update(group_id=destination.id)
+        deleted.delete()
+
+        with self.tasks():
+            process_pending()
+
+        assert sorted(
+            [(e.group.id, e.id) for e in call[0][0]] for call in record.call_args_list
+        ) == sorted([
+            [(source.id, events[0].id)],
+            [(destination.id, events[1].id)],
+        ])
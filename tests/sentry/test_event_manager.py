@@ -15,13 +15,14 @@ from sentry.app import tsdb
 from sentry.constants import MAX_CULPRIT_LENGTH, DEFAULT_LOGGER_NAME
 from sentry.event_manager import (
     HashDiscarded, EventManager, EventUser, get_hashes_for_event, get_hashes_from_fingerprint,
-    generate_culprit, md5_from_hash
+    generate_culprit, md5_from_hash, trim_event_data
 )
 from sentry.models import (
-    Activity, Event, Group, GroupHash, GroupRelease, GroupResolution, GroupStatus, GroupTombstone,
-    EventMapping, Release
+    Activity, Event, EventError, Group, GroupHash, GroupRelease, GroupResolution, GroupStatus,
+    GroupTombstone, EventMapping, Release
 )
 from sentry.testutils import TestCase, TransactionTestCase
+from sentry.utils import json
 
 
 class EventManagerTest(TransactionTestCase):
@@ -868,6 +869,77 @@ class EventManagerTest(TransactionTestCase):
             with self.assertRaises(HashDiscarded):
                 event = manager.save(1)
 
+    def test_trims_event_exceeding_project_max_size(self):
+        self.project.update_option('sentry:max_event_size', 2048)
+        manager = EventManager(
+            self.make_event(
+                extra={'big': 'x' * 4096, 'small': 'y'},
+            )
+        )
+        manager.normalize()
+        with patch('sentry.event_manager.metrics.timing') as timing:
+            event = manager.save(self.project.id)
+
+        assert event.data['extra'] == {'small': 'y'}
+        assert event.data['errors'] == [{
+            'type': EventError.EVENT_TOO_LARGE,
+            'name': 'extra context',
+            'max_size': 2048,
+        }]
+        assert [c[0][1] for c in timing.call_args_list if c[0][0] == 'events.size.trimmed'] == [
+            len(json.dumps({'big': 'x' * 4096, 'small': 'y'})) - len(json.dumps({'small': 'y'})),
+        ]
+
+
+class TrimEventDataTest(TestCase):
+    def make_frame(self, in_app):
+        return {'filename': 'foo.py', 'in_app': in_app, 'vars': {'x': 'x' * 1000}}
+
+    def test_within_size(self):
+        data = {'extra': {'foo': 'bar'}}
+        assert trim_event_data(data, 1000) == 0
+        assert data == {'extra': {'foo': 'bar'}}
+
+    def test_discards_frame_vars_first(self):
+        frames = [self.make_frame(True), self.make_frame(False), self.make_frame(True)]
+        data = {
+            'sentry.interfaces.Exception': {
+                'values': [{'stacktrace': {'frames': frames}}],
+            },
+            'sentry.interfaces.Breadcrumbs': {
+                'values': [{'message': 'foo'}],
+            },
+            'extra': {'foo': 'bar'},
+        }
+        assert trim_event_data(data, 1500) > 2000
+
+        # Variables of frames outside of the app go first, then the
+        # outermost in-app frames.
+        assert 'vars' not in frames[0]
+        assert 'vars' not in frames[1]
+        assert 'vars' in frames[2]
+        assert data['sentry.interfaces.Breadcrumbs']['values'] == [{'message': 'foo'}]
+        assert data['extra'] == {'foo': 'bar'}
+        assert data['errors'] == [{
+            'type': EventError.EVENT_TOO_LARGE,
+            'name': 'stack frame variables',
+            'max_size': 1500,
+        }]
+
+    def test_discards_oldest_breadcrumbs_then_extra(self):
+        data = {
+            'sentry.interfaces.Breadcrumbs': {
+                'values': [{'message': 'x' * 1000}, {'message': 'y' * 1000}],
+            },
+            'extra': {'foo': 'x' * 1000, 'bar': 'baz'},
+        }
+        trim_event_data(data, 100)
+
+        assert data['sentry.interfaces.Breadcrumbs']['values'] == []
+        assert data['extra'] == {'bar': 'baz'}
+        assert [e['name'] for e in data['errors']] == ['breadcrumbs', 'extra context']
+        assert len(json.dumps(data)) < 300
+
 
 class GetHashesFromEventTest(TestCase):
     @patch('sentry.interfaces.stacktrace.Stacktrace.compute_hashes')